@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from accounts.models import Address, ContactVersion, Country, CustomerAccount
+        from accounts.search import refreshSearchFromSignal, refreshSearchFromSoftDelete
+        from core.managers import softDeleted
+        from core.refdata import referenceData
+
+        referenceData.register(Country, keyFields=('internalKey', 'isoCode'))
+
+        for model in (CustomerAccount, Address, ContactVersion):
+            post_save.connect(refreshSearchFromSignal, sender=model, dispatch_uid=('accountSearch', model))
+            post_delete.connect(refreshSearchFromSignal, sender=model, dispatch_uid=('accountSearch', model))
+            softDeleted.connect(refreshSearchFromSoftDelete, sender=model, dispatch_uid=('accountSearch', model))
@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q, Sum
+
+from accounts.models import Component, ComponentGroup
+
+COMPONENT_TREE_CACHE_KEY = 'accounts:componentTree'
+
+ComponentNode = namedtuple(
+    'ComponentNode', ['id', 'internalKey', 'languageKey', 'code', 'icon', 'orderNo', 'versionNo']
+)
+ComponentGroupNode = namedtuple(
+    'ComponentGroupNode', ['id', 'internalKey', 'languageKey', 'code', 'icon', 'orderNo', 'versionNo', 'components']
+)
+
+
+def buildComponentTree():
+    groups = ComponentGroup.objects.order_by('orderNo', 'id').prefetch_related(
+        Prefetch('components', queryset=Component.objects.order_by('orderNo', 'id'))
+    )
+    return tuple(
+        ComponentGroupNode(
+            group.id, group.internalKey, group.languageKey, group.code, group.icon, group.orderNo, group.versionNo,
+            tuple(
+                ComponentNode(
+                    component.id, component.internalKey, component.languageKey, component.code, component.icon,
+                    component.orderNo, component.versionNo,
+                )
+                for component in group.components.all()
+            ),
+        )
+        for group in groups
+    )
+
+
+def getComponentTreeSignature():
+    # (row count, soft deleted count, sum of versionNo) of both tables, the same kind of signal the reference data
+    # cache uses, so a change made by any process moves it.
+    aggregates = {'count': Count('id'), 'deleted': Count('id', filter=Q(deleteFl=True)), 'versionSum': Sum('versionNo')}
+    return tuple(
+        tuple(model.allWithDeleted.aggregate(**aggregates).values()) for model in (ComponentGroup, Component)
+    )
+
+
+def getComponentTree():
+    # The cached tree is only served while its signature still matches the tables; the cache may be process local.
+    signature = getComponentTreeSignature()
+    cached = cache.get(COMPONENT_TREE_CACHE_KEY)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    tree = buildComponentTree()
+    cache.set(COMPONENT_TREE_CACHE_KEY, (signature, tree), settings.COMPONENT_TREE_CACHE_TIMEOUT)
+    return tree
+
+
+def getComponentGroup(internalKey):
+    for group in getComponentTree():
+        if group.internalKey == internalKey:
+            return group
+    return None
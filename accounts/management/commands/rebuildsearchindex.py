@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.search import DEFAULT_CHUNK_SIZE, rebuildSearchIndex
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild AccountSearchDocument rows and the search backend index from every CustomerAccount. Needed after '
+        'bulk_create() or queryset.update() on accounts, addresses or contacts, which bypass the signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunkSize'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        verbosity = options['verbosity']
+
+        def onChunk(indexed, total):
+            if verbosity > 1:
+                self.stdout.write('{} of {} accounts indexed'.format(indexed, total))
+
+        indexed = rebuildSearchIndex(options['chunkSize'], onChunk)
+        self.stdout.write(self.style.SUCCESS('Indexed {} accounts.'.format(indexed)))
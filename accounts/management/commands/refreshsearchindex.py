@@ -0,0 +1,24 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.search import DEFAULT_CHUNK_SIZE, refreshEffectiveChanges
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the search documents of accounts whose contact versions took effect or lapsed in the last --hours. '
+        'Run it from cron at least that often; saves and soft deletes refresh the index as they happen.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=25)
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['hours'] < 1 or options['chunkSize'] < 1:
+            raise CommandError('--hours and --chunk-size must be positive')
+        now = timezone.now()
+        refreshed = refreshEffectiveChanges(now - datetime.timedelta(hours=options['hours']), now, options['chunkSize'])
+        self.stdout.write(self.style.SUCCESS('Refreshed {} accounts.'.format(refreshed)))
@@ -0,0 +1,170 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:52
+
+import core.references
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Address',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address1', models.CharField(blank=True, max_length=2048, null=True)),
+                ('address2', models.CharField(blank=True, max_length=2048, null=True)),
+                ('address3', models.CharField(blank=True, max_length=2048, null=True)),
+                ('address4', models.CharField(blank=True, max_length=2048, null=True)),
+                ('address5', models.CharField(blank=True, max_length=2048, null=True)),
+                ('postcode', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=2048, null=True)),
+                ('sortCode', models.CharField(blank=True, max_length=2048, null=True)),
+                ('accountNo', models.PositiveBigIntegerField()),
+                ('accountName', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Component',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internalKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('languageKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('code', models.CharField(blank=True, max_length=2048, null=True)),
+                ('icon', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Component',
+                'ordering': ['componentGroup', 'orderNo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ComponentGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internalKey', models.CharField(blank=True, max_length=2048, null=True, unique=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('languageKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('code', models.CharField(blank=True, max_length=2048, null=True)),
+                ('icon', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'ComponentGroup',
+            },
+        ),
+        migrations.CreateModel(
+            name='Contact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internalKey', models.CharField(blank=True, max_length=2048, null=True, unique=True)),
+                ('description', models.TextField()),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContactVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fromDttm', models.DateTimeField(default=datetime.date.today)),
+                ('toDttm', models.DateTimeField(default=datetime.datetime(9999, 12, 31, 23, 59, 59, 999999))),
+                ('title', models.CharField(choices=[('DR', 'Dr'), ('MISS', 'Miss'), ('MR', 'Mr'), ('MRS', 'Mrs'), ('MS', 'Ms'), ('PROF', 'Prof')], default='MR', max_length=32)),
+                ('initials', models.CharField(blank=True, max_length=2048, null=True)),
+                ('firstName', models.CharField(blank=True, max_length=2048, null=True)),
+                ('lastName', models.CharField(blank=True, max_length=2048, null=True)),
+                ('jobTitle', models.CharField(blank=True, max_length=2048, null=True)),
+                ('number1', models.CharField(blank=True, max_length=2048, null=True)),
+                ('number2', models.CharField(blank=True, max_length=2048, null=True)),
+                ('number3', models.CharField(blank=True, max_length=2048, null=True)),
+                ('email', models.EmailField(max_length=254)),
+                ('webBrowser', models.CharField(blank=True, max_length=2048, null=True)),
+                ('careOf', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Country',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internalKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('languageKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('isoCode', models.CharField(blank=True, max_length=2048, null=True)),
+                ('dialCode', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Employee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.BigIntegerField(default=core.references.ReferenceNumber('accounts.Employee.number'), editable=False, unique=True)),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('fromDttm', models.DateTimeField(default=datetime.date.today)),
+                ('toDttm', models.DateTimeField(default=datetime.datetime(9999, 12, 31, 23, 59, 59, 999999))),
+                ('modifiedDttm', models.DateTimeField(auto_now=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.address')),
+                ('createdUser', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('terminatedUser', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='employee', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CustomerAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.BigIntegerField(default=core.references.ReferenceNumber('accounts.CustomerAccount.number'), editable=False, unique=True)),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('fromDttm', models.DateTimeField(default=datetime.date.today)),
+                ('toDttm', models.DateTimeField(default=datetime.datetime(9999, 12, 31, 23, 59, 59, 999999))),
+                ('salesTaxExempt', models.BooleanField(default=False)),
+                ('companyName', models.CharField(blank=True, max_length=2048, null=True)),
+                ('companyNumber', models.BigIntegerField()),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.address')),
+            ],
+        ),
+    ]
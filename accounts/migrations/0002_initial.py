@@ -0,0 +1,70 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('payment', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('energy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customeraccount',
+            name='billingCycle',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='energy.billingcycle'),
+        ),
+        migrations.AddField(
+            model_name='customeraccount',
+            name='createdUser',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='customeraccount',
+            name='currency',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.currency'),
+        ),
+        migrations.AddField(
+            model_name='customeraccount',
+            name='terminatedUser',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='customeraccount',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='customerAccounts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='contactversion',
+            name='address',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.address'),
+        ),
+        migrations.AddField(
+            model_name='contactversion',
+            name='contact',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.contact'),
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='componentGroup',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='components', to='accounts.componentgroup'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='address',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.address'),
+        ),
+        migrations.AddField(
+            model_name='address',
+            name='country',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.country'),
+        ),
+    ]
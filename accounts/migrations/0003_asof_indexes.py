@@ -0,0 +1,25 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactversion',
+            index=models.Index(fields=['contact', 'fromDttm', 'toDttm', 'deleteFl'], name='accounts_contactver_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customeraccount',
+            index=models.Index(fields=['billingCycle', 'fromDttm', 'toDttm', 'deleteFl'], name='accounts_account_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['user', 'fromDttm', 'toDttm', 'deleteFl'], name='accounts_employee_asof_idx'),
+        ),
+    ]
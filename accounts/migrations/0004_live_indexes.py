@@ -0,0 +1,41 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_asof_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contactversion',
+            name='accounts_contactver_asof_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customeraccount',
+            name='accounts_account_asof_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='employee',
+            name='accounts_employee_asof_idx',
+        ),
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['componentGroup', 'orderNo'], name='accounts_component_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactversion',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['contact', 'fromDttm', 'toDttm'], name='accounts_contactver_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customeraccount',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['billingCycle', 'fromDttm', 'toDttm'], name='accounts_account_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['user', 'fromDttm', 'toDttm'], name='accounts_employee_asof_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_live_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('postcodes', models.CharField(blank=True, max_length=255)),
+                ('modifiedDttm', models.DateTimeField(auto_now=True)),
+                ('customerAccount', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='searchDocument', to='accounts.customeraccount')),
+            ],
+        ),
+    ]
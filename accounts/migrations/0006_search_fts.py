@@ -0,0 +1,28 @@
+from django.db import migrations
+
+TABLE = 'accounts_search_fts'
+
+
+def createSearchTable(apps, schemaEditor):
+    # The FTS5 index used by accounts.search.Fts5SearchBackend; other databases use DatabaseSearchBackend.
+    if schemaEditor.connection.vendor == 'sqlite':
+        schemaEditor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5('
+            "content, postcodes, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')".format(TABLE)
+        )
+
+
+def dropSearchTable(apps, schemaEditor):
+    if schemaEditor.connection.vendor == 'sqlite':
+        schemaEditor.execute('DROP TABLE IF EXISTS {}'.format(TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_accountsearchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(createSearchTable, dropSearchTable),
+    ]
@@ -1,30 +1,19 @@
-import datetime
-import random
-
 from django.contrib.auth.models import User
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from energy.models import BillingCycle
-from payment.models import Currency
-
+from core.models import EffectiveDatedModel, SoftDeleteModel, asOfIndex, liveIndex
+from core.references import ReferenceNumber
 
-def generateReferenceNumber():
-    return random.randint(1000000000, 9999999999)
 
-
-class Country(models.Model):
+class Country(SoftDeleteModel):
     internalKey = models.CharField(max_length=2048, blank=True, null=True)
     languageKey = models.CharField(max_length=2048, blank=True, null=True)
     isoCode = models.CharField(max_length=2048, blank=True, null=True)
     dialCode = models.CharField(max_length=2048, blank=True, null=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class Address(models.Model):
+class Address(SoftDeleteModel):
     address1 = models.CharField(max_length=2048, blank=True, null=True)
     address2 = models.CharField(max_length=2048, blank=True, null=True)
     address3 = models.CharField(max_length=2048, blank=True, null=True)
@@ -32,70 +21,56 @@ class Address(models.Model):
     address5 = models.CharField(max_length=2048, blank=True, null=True)
     postcode = models.CharField(max_length=2048, blank=True, null=True)
     country = models.ForeignKey(Country, on_delete=models.PROTECT)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
-
-
-class Employee(models.Model):
-    user = models.OneToOneField(User, on_delete=models.SET_NULL, related_name='employee')
-    number = models.BigIntegerField(max_length=10, editable=False, unique=True, default=generateReferenceNumber)
-    address = models.ForeignKey(Address, on_delete=models.SET_NULL)
-    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL)
-    terminatedUser = models.ForeignKey(User, on_delete=models.SET_NULL)
+
+
+class Employee(EffectiveDatedModel):
+    user = models.OneToOneField(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='employee')
+    number = models.BigIntegerField(
+        editable=False, unique=True, default=ReferenceNumber('accounts.Employee.number')
+    )
+    address = models.ForeignKey(Address, on_delete=models.SET_NULL, blank=True, null=True)
+    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    terminatedUser = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
     createdDttm = models.DateTimeField(auto_now_add=True)
-    fromDttm = models.DateTimeField(default=datetime.date.today)
-    toDttm = models.DateTimeField(default=datetime.datetime.max)
     modifiedDttm = models.DateTimeField(auto_now=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+
+    class Meta:
+        indexes = [asOfIndex('user', 'accounts_employee_asof_idx')]
 
 
-class CustomerAccount(models.Model):
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='customerAccounts')
-    number = models.BigIntegerField(max_length=10, editable=False, unique=True, default=generateReferenceNumber)
-    address = models.ForeignKey(Address, on_delete=models.SET_NULL)
+class CustomerAccount(EffectiveDatedModel):
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='customerAccounts')
+    number = models.BigIntegerField(
+        editable=False, unique=True, default=ReferenceNumber('accounts.CustomerAccount.number')
+    )
+    address = models.ForeignKey(Address, on_delete=models.SET_NULL, blank=True, null=True)
     createdDttm = models.DateTimeField(auto_now_add=True)
-    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL)
-    fromDttm = models.DateTimeField(default=datetime.date.today)
-    toDttm = models.DateTimeField(default=datetime.datetime.max)
-    currency = models.ForeignKey(Currency, on_delete=models.PROTECT)
+    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    currency = models.ForeignKey('payment.Currency', on_delete=models.PROTECT)
     salesTaxExempt = models.BooleanField(default=False)
-    terminatedUser = models.ForeignKey(User, on_delete=models.SET_NULL)
+    terminatedUser = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
     companyName = models.CharField(max_length=2048, blank=True, null=True)
     companyNumber = models.BigIntegerField()
-    billingCycle = models.ForeignKey(BillingCycle, on_delete=models.PROTECT)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+    billingCycle = models.ForeignKey('energy.BillingCycle', on_delete=models.PROTECT)
+
+    class Meta:
+        indexes = [asOfIndex('billingCycle', 'accounts_account_asof_idx')]
 
 
-class Company(models.Model):
+class Company(SoftDeleteModel):
     name = models.CharField(max_length=2048, blank=True, null=True)
     sortCode = models.CharField(max_length=2048, blank=True, null=True)
     accountNo = models.PositiveBigIntegerField()
     accountName = models.CharField(max_length=2048, blank=True, null=True)
-    address = models.ForeignKey(Address, on_delete=models.SET_NULL)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+    address = models.ForeignKey(Address, on_delete=models.SET_NULL, blank=True, null=True)
 
 
-class Contact(models.Model):
+class Contact(SoftDeleteModel):
     internalKey = models.CharField(max_length=2048, blank=True, null=True, unique=True)
     description = models.TextField()
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class ContactVersion(models.Model):
+class ContactVersion(EffectiveDatedModel):
     class Title(models.TextChoices):
         DR = 'DR', _('Dr')
         MISS = 'MISS', _('Miss')
@@ -105,9 +80,7 @@ class ContactVersion(models.Model):
         PROF = 'PROF', _('Prof')
 
     contact = models.ForeignKey(Contact, on_delete=models.PROTECT)
-    fromDttm = models.DateTimeField(default=datetime.date.today)
-    toDttm = models.DateTimeField(default=datetime.datetime.max)
-    title = models.CharField(choices=Title.choices, default=Title.MR)
+    title = models.CharField(max_length=32, choices=Title.choices, default=Title.MR)
     initials = models.CharField(max_length=2048, blank=True, null=True)
     firstName = models.CharField(max_length=2048, blank=True, null=True)
     lastName = models.CharField(max_length=2048, blank=True, null=True)
@@ -119,21 +92,16 @@ class ContactVersion(models.Model):
     webBrowser = models.CharField(max_length=2048, blank=True, null=True)
     careOf = models.CharField(max_length=2048, blank=True, null=True)
     address = models.ForeignKey(Address, on_delete=models.PROTECT)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+
+    class Meta:
+        indexes = [asOfIndex('contact', 'accounts_contactver_asof_idx')]
 
 
-class ComponentGroup(models.Model):
+class ComponentGroup(SoftDeleteModel):
     internalKey = models.CharField(max_length=2048, blank=True, null=True, unique=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
     languageKey = models.CharField(max_length=2048, blank=True, null=True)
     code = models.CharField(max_length=2048, blank=True, null=True)
     icon = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
     class Meta:
         verbose_name_plural = "ComponentGroup"
@@ -142,23 +110,29 @@ class ComponentGroup(models.Model):
         return self.internalKey
 
     def getRelatedFeatureComponentByOrderNo(self):
+        # Navigation is rendered from accounts.components.getComponentTree(), which is cached.
         return self.components.all().order_by('orderNo')
 
 
-class Component(models.Model):
+class Component(SoftDeleteModel):
     componentGroup = models.ForeignKey(ComponentGroup, on_delete=models.CASCADE, related_name="components")
     internalKey = models.CharField(max_length=2048, blank=True, null=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
     languageKey = models.CharField(max_length=2048, blank=True, null=True)
     code = models.CharField(max_length=2048, blank=True, null=True)
     icon = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
     class Meta:
         ordering = ['componentGroup', 'orderNo']
         verbose_name_plural = "Component"
+        indexes = [liveIndex(['componentGroup', 'orderNo'], 'accounts_component_live_idx')]
 
     def __str__(self):
         return self.internalKey
+
+
+class AccountSearchDocument(models.Model):
+    # Normalized text of an account, its address and the contacts at that address, maintained by accounts.search.
+    customerAccount = models.OneToOneField(CustomerAccount, on_delete=models.CASCADE, related_name='searchDocument')
+    content = models.TextField()
+    postcodes = models.CharField(max_length=255, blank=True)
+    modifiedDttm = models.DateTimeField(auto_now=True)
@@ -0,0 +1,277 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.models import AccountSearchDocument, Address, ContactVersion, CustomerAccount
+from core.files import chunked
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_LIMIT = 20
+POSTCODE_PREFIX = re.compile(r'^[a-z]{1,2}[0-9][a-z0-9]?(?:[0-9][a-z]{0,2})?$')
+TOKEN = re.compile(r'\w+')
+
+
+def normalize(value):
+    # Lower case ASCII-folded text, so 'Zoë' and 'zoe' index and match the same.
+    value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode()
+    return value.lower()
+
+
+def tokenize(value):
+    return TOKEN.findall(normalize(value)) if value else []
+
+
+def normalizePostcode(value):
+    return ''.join(tokenize(value))
+
+
+def postcodeTerms(postcode):
+    # The whole postcode without spaces and its outward code, e.g. 'sw1a1aa sw1a'.
+    compact = normalizePostcode(postcode)
+    if not compact:
+        return []
+    return [compact, compact[:-3]] if len(compact) > 4 else [compact]
+
+
+class SearchDocument:
+
+    def __init__(self, accountId, content, postcodes):
+        self.accountId = accountId
+        self.content = content
+        self.postcodes = postcodes
+
+
+def buildDocuments(accountIds):
+    # Three queries per batch: accounts, their addresses and the current contact versions at those addresses.
+    accounts = list(
+        CustomerAccount.objects.filter(id__in=accountIds).values_list('id', 'number', 'companyName', 'address_id')
+    )
+    addressIds = {account[3] for account in accounts}
+    addresses = {
+        row[0]: row[1:] for row in Address.objects.filter(id__in=addressIds).values_list(
+            'id', 'address1', 'address2', 'address3', 'address4', 'address5', 'postcode'
+        )
+    }
+    contacts = defaultdict(list)
+    for addressId, *fields in ContactVersion.objects.asOf(timezone.now()).filter(address_id__in=addressIds).values_list(
+        'address_id', 'firstName', 'lastName', 'email'
+    ):
+        contacts[addressId].extend(fields)
+
+    documents = []
+    for accountId, number, companyName, addressId in accounts:
+        address = addresses.get(addressId, ())
+        terms = [str(number)]
+        for value in (companyName, *address, *contacts.get(addressId, [])):
+            terms.extend(tokenize(value))
+        postcodes = postcodeTerms(address[-1] if address else None)
+        documents.append(SearchDocument(accountId, ' '.join(terms), ' '.join(postcodes)))
+    return documents
+
+
+class SearchBackend:
+    # Stores and queries the index over AccountSearchDocument; search() returns account ids, best match first.
+
+    def index(self, documents):
+        raise NotImplementedError
+
+    def remove(self, accountIds):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Portable fallback that queries AccountSearchDocument directly: every query term must start a word of the
+    document, or the query must prefix a postcode. Scans the narrow document table instead of the wide source
+    tables, but is not indexed; use a full-text backend for large datasets.
+    """
+
+    def index(self, documents):
+        pass
+
+    def remove(self, accountIds):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        documents = AccountSearchDocument.objects.all()
+        for term in terms:
+            documents = documents.filter(Q(content__startswith=term) | Q(content__contains=' ' + term))
+        postcode = normalizePostcode(query)
+        ids = list(documents.order_by('customerAccount_id').values_list('customerAccount_id', flat=True)[:limit])
+        if POSTCODE_PREFIX.match(postcode) and len(ids) < limit:
+            ids.extend(
+                accountId for accountId in AccountSearchDocument.objects.filter(
+                    postcodes__startswith=postcode
+                ).exclude(customerAccount_id__in=ids).order_by('customerAccount_id').values_list(
+                    'customerAccount_id', flat=True
+                )[:limit - len(ids)]
+            )
+        return ids
+
+
+class Fts5SearchBackend(SearchBackend):
+    """
+    SQLite FTS5 index keyed by account id, with prefix indexes so partial words and postcodes are index lookups.
+    Results are ranked by bm25 with postcode matches weighted above the rest of the document.
+    """
+
+    def __init__(self, table='accounts_search_fts', postcodeWeight=5.0):
+        # The table is created by the accounts migrations.
+        self.table = table
+        self.postcodeWeight = postcodeWeight
+
+    def getConnection(self, write=False):
+        route = router.db_for_write if write else router.db_for_read
+        return connections[route(AccountSearchDocument)]
+
+    def index(self, documents):
+        connection = self.getConnection(write=True)
+        with connection.cursor() as cursor:
+            self.delete(cursor, [document.accountId for document in documents])
+            cursor.executemany(
+                'INSERT INTO {} (rowid, content, postcodes) VALUES (%s, %s, %s)'.format(self.table),
+                [(document.accountId, document.content, document.postcodes) for document in documents],
+            )
+
+    def delete(self, cursor, accountIds):
+        for chunk in chunked(accountIds, 500):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute('DELETE FROM {} WHERE rowid IN ({})'.format(self.table, placeholders), chunk)
+
+    def remove(self, accountIds):
+        with self.getConnection(write=True).cursor() as cursor:
+            self.delete(cursor, list(accountIds))
+
+    def clear(self):
+        with self.getConnection(write=True).cursor() as cursor:
+            cursor.execute('DELETE FROM {}'.format(self.table))
+
+    def buildMatch(self, query):
+        terms = tokenize(query)
+        if not terms:
+            return None
+        match = ' AND '.join('"{}"*'.format(term) for term in terms)
+        postcode = normalizePostcode(query)
+        if POSTCODE_PREFIX.match(postcode):
+            match = '(postcodes : "{}"*) OR ({})'.format(postcode, match)
+        return match
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        match = self.buildMatch(query)
+        if match is None:
+            return []
+        with self.getConnection().cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM {0} WHERE {0} MATCH %s ORDER BY bm25({0}, 1.0, %s) LIMIT %s'.format(self.table),
+                [match, self.postcodeWeight, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+backends = {}
+
+
+def getSearchBackend():
+    if settings.SEARCH_BACKEND not in backends:
+        backends[settings.SEARCH_BACKEND] = import_string(settings.SEARCH_BACKEND)(**settings.SEARCH_BACKEND_OPTIONS)
+    return backends[settings.SEARCH_BACKEND]
+
+
+def refreshSearchDocuments(accountIds, backend=None):
+    # Rebuilds the documents of the given accounts; accounts that no longer exist or are deleted drop out.
+    backend = backend or getSearchBackend()
+    accountIds = set(accountIds)
+    documents = buildDocuments(accountIds)
+    removed = accountIds - {document.accountId for document in documents}
+    with transaction.atomic():
+        AccountSearchDocument.objects.filter(customerAccount_id__in=accountIds).delete()
+        AccountSearchDocument.objects.bulk_create([
+            AccountSearchDocument(
+                customerAccount_id=document.accountId, content=document.content, postcodes=document.postcodes
+            )
+            for document in documents
+        ])
+        backend.index(documents)
+        if removed:
+            backend.remove(removed)
+    return len(documents)
+
+
+def rebuildSearchIndex(chunkSize=DEFAULT_CHUNK_SIZE, onChunk=None):
+    backend = getSearchBackend()
+    with transaction.atomic():
+        AccountSearchDocument.objects.all().delete()
+        backend.clear()
+    accountIds = list(CustomerAccount.objects.order_by('id').values_list('id', flat=True))
+    indexed = 0
+    for chunk in chunked(accountIds, chunkSize):
+        indexed += refreshSearchDocuments(chunk, backend)
+        if onChunk is not None:
+            onChunk(indexed, len(accountIds))
+    return indexed
+
+
+def searchAccounts(query, limit=DEFAULT_LIMIT):
+    return getSearchBackend().search(query, limit)
+
+
+def getAffectedAccountIds(sender, instance):
+    if sender is CustomerAccount:
+        return [instance.pk]
+    addressId = instance.pk if sender is Address else instance.address_id
+    return list(CustomerAccount.allWithDeleted.filter(address_id=addressId).values_list('id', flat=True))
+
+
+def refreshSearchFromSignal(sender, instance, **kwargs):
+    # Deferred to commit so a rolled back change is never indexed and a transaction is only indexed once it lands.
+    accountIds = getAffectedAccountIds(sender, instance)
+    if accountIds:
+        transaction.on_commit(lambda: refreshSearchDocuments(accountIds))
+
+
+def refreshSearchFromSoftDelete(sender, pks, **kwargs):
+    if sender is CustomerAccount:
+        accountIds = list(pks)
+    else:
+        addressIds = pks if sender is Address else ContactVersion.allWithDeleted.filter(pk__in=pks).values('address_id')
+        accountIds = list(CustomerAccount.allWithDeleted.filter(address_id__in=addressIds).values_list('id', flat=True))
+    if accountIds:
+        transaction.on_commit(lambda: refreshAccounts(accountIds))
+
+
+def refreshAccounts(accountIds, chunkSize=DEFAULT_CHUNK_SIZE):
+    refreshed = 0
+    for chunk in chunked(accountIds, chunkSize):
+        refreshed += refreshSearchDocuments(chunk)
+    return refreshed
+
+
+def refreshEffectiveChanges(fromDttm, toDttm=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    """
+    Refreshes the accounts at addresses where a ContactVersion took effect or lapsed in (fromDttm, toDttm]. Nothing
+    is written when that happens, so no signal fires; run it at least as often as the window is long.
+    """
+    toDttm = toDttm or timezone.now()
+    addressIds = ContactVersion.objects.filter(
+        Q(fromDttm__gt=fromDttm, fromDttm__lte=toDttm) | Q(toDttm__gt=fromDttm, toDttm__lte=toDttm)
+    ).values('address_id')
+    accountIds = list(CustomerAccount.objects.filter(address_id__in=addressIds).values_list('id', flat=True))
+    return refreshAccounts(accountIds, chunkSize)
@@ -1,3 +1,90 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import Contact, ContactVersion, CustomerAccount
+from accounts.search import (
+    DatabaseSearchBackend, Fts5SearchBackend, normalize, normalizePostcode, postcodeTerms, refreshEffectiveChanges,
+    refreshSearchDocuments, searchAccounts, tokenize,
+)
+from core.synthetic import generateSyntheticData
+
+
+class SearchTermTests(SimpleTestCase):
+
+    def testNormalize(self):
+        self.assertEqual(normalize('Zoë BRONTË'), 'zoe bronte')
+        self.assertEqual(normalize(42), '42')
+
+    def testTokenize(self):
+        self.assertEqual(tokenize('Flat 3, 12 Crème-Brûlée St.'), ['flat', '3', '12', 'creme', 'brulee', 'st'])
+        self.assertEqual(tokenize(None), [])
+
+    def testPostcodeTerms(self):
+        self.assertEqual(postcodeTerms('SW1A 1AA'), ['sw1a1aa', 'sw1a'])
+        self.assertEqual(postcodeTerms('m1 1ae'), ['m11ae', 'm1'])
+        self.assertEqual(postcodeTerms('SW1A'), ['sw1a'])
+        self.assertEqual(postcodeTerms(None), [])
+        self.assertEqual(normalizePostcode(' sw1a 1aa '), 'sw1a1aa')
+
+
+class BuildMatchTests(SimpleTestCase):
+
+    def setUp(self):
+        self.backend = Fts5SearchBackend()
+
+    def testTerms(self):
+        self.assertEqual(self.backend.buildMatch('Acme Widgets'), '"acme"* AND "widgets"*')
+
+    def testPostcode(self):
+        self.assertEqual(self.backend.buildMatch('SW1A 1'), '(postcodes : "sw1a1"*) OR ("sw1a"* AND "1"*)')
+
+    def testQuotesCannotEscape(self):
+        self.assertEqual(self.backend.buildMatch('"smith" OR'), '"smith"* AND "or"*')
+
+    def testEmpty(self):
+        self.assertIsNone(self.backend.buildMatch('  ,. '))
+
+
+class SearchBackendTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generateSyntheticData(5, 1, datetime.date(2021, 1, 1), 1)
+        cls.account = CustomerAccount.objects.select_related('address').order_by('id').first()
+
+    def testBackends(self):
+        postcode = self.account.address.postcode
+        for backend in (Fts5SearchBackend(), DatabaseSearchBackend()):
+            with self.subTest(backend=type(backend).__name__):
+                refreshSearchDocuments(CustomerAccount.objects.values_list('id', flat=True), backend)
+                self.assertIn(self.account.pk, backend.search(postcode))
+                self.assertIn(self.account.pk, backend.search(postcode.split()[0].lower()))
+                self.assertEqual(backend.search(str(self.account.number)), [self.account.pk])
+                self.assertEqual(backend.search('zzzzzz'), [])
+
+
+class SearchSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generateSyntheticData(2, 1, datetime.date(2021, 1, 1), 1)
+        cls.account = CustomerAccount.objects.order_by('id').first()
+        refreshSearchDocuments(CustomerAccount.objects.values_list('id', flat=True))
+
+    def testSoftDelete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomerAccount.objects.filter(pk=self.account.pk).softDelete()
+        self.assertEqual(searchAccounts(str(self.account.number)), [])
+
+    def testContactTakingEffect(self):
+        # bulk_create fires no signal, like a version that was saved earlier and has only now taken effect.
+        contact = Contact.objects.create(description='Billing contact')
+        ContactVersion.objects.bulk_create([ContactVersion(
+            contact=contact, firstName='Philippa', lastName='Quixote', email='pq@example.com',
+            address_id=self.account.address_id, fromDttm=timezone.now() - datetime.timedelta(minutes=5),
+        )])
+        self.assertEqual(searchAccounts('quixote'), [])
+        self.assertEqual(refreshEffectiveChanges(timezone.now() - datetime.timedelta(hours=1)), 1)
+        self.assertEqual(searchAccounts('quixote'), [self.account.pk])
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from accounts import views
+
+urlpatterns = [
+    path('navigation/', views.navigation, name='navigation'),
+    path('search/', views.search, name='search'),
+    path('<int:accountNumber>/', views.account, name='account'),
+]
@@ -1,3 +1,69 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
 
-# Create your views here.
+from accounts.components import getComponentTree
+from accounts.models import CustomerAccount, Employee
+from accounts.search import searchAccounts
+from core.conditional import conditionalResponse, versionSignature
+from core.instrumentation import queryBudget
+from core.pagination import parsePageSize
+from core.routers import replicaReads
+
+
+def isEmployee(user):
+    return user.is_staff or Employee.objects.filter(user=user).exists()
+
+
+def getVisibleAccounts(request):
+    # Customers only see their own accounts; employees see any account.
+    if isEmployee(request.user):
+        return CustomerAccount.objects.all()
+    return CustomerAccount.objects.filter(user=request.user)
+
+
+def getCustomerAccount(request, accountNumber, fields=('id', 'number', 'user_id', 'currency_id')):
+    return get_object_or_404(getVisibleAccounts(request).only(*fields), number=accountNumber)
+
+
+@queryBudget(5)
+@login_required
+def account(request, accountNumber):
+    accounts = getVisibleAccounts(request).filter(number=accountNumber)
+
+    def render():
+        return JsonResponse(get_object_or_404(
+            accounts.values(
+                'number', 'companyName', 'companyNumber', 'salesTaxExempt', 'fromDttm', 'toDttm',
+                'currency__isoCode', 'billingCycle__name',
+            )
+        ))
+
+    return conditionalResponse(request, [versionSignature(accounts)], render)
+
+
+@queryBudget(5)
+@login_required
+@replicaReads()
+def search(request):
+    # Call-centre lookup by postcode, street, company or contact name; results are in rank order.
+    if not isEmployee(request.user):
+        raise PermissionDenied
+    accountIds = searchAccounts(request.GET.get('q', ''), parsePageSize(request.GET.get('limit'), 20))
+    accounts = {
+        account['id']: account for account in CustomerAccount.objects.filter(id__in=accountIds).values(
+            'id', 'number', 'companyName', 'address__address1', 'address__postcode',
+        )
+    }
+    return JsonResponse({'results': [accounts[accountId] for accountId in accountIds if accountId in accounts]})
+
+
+@queryBudget(6)
+@login_required
+def navigation(request):
+    # The component groups and their components, in display order, for building the navigation menu.
+    return JsonResponse({'groups': [
+        dict(group._asdict(), components=[component._asdict() for component in group.components])
+        for group in getComponentTree()
+    ]})
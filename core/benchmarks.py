@@ -0,0 +1,225 @@
+import datetime
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from accounts.models import CustomerAccount
+from core.instrumentation import recordQueries
+from core.pagination import keysetPaginate
+from core.synthetic import SYNTHETIC_BILLING_CYCLE
+from energy.billing import generateBills, priceMeterReadings
+from energy.ingestion import ingestMeterReadings
+from energy.models import Bill, BillingCycle, MeterPoint
+from payment.models import Charges
+
+DEFAULT_SAMPLES = 200
+DEFAULT_INGEST_ROWS = 50000
+
+
+class BenchmarkContext:
+
+    def __init__(self, samples=DEFAULT_SAMPLES, ingestRows=DEFAULT_INGEST_ROWS, seed=1):
+        self.rng = random.Random(seed)
+        self.samples = samples
+        self.ingestRows = ingestRows
+        self.billingCycle = BillingCycle.objects.get(name=SYNTHETIC_BILLING_CYCLE)
+        bills = Bill.objects.filter(customerAccount__billingCycle=self.billingCycle)
+        self.historyEnd = bills.aggregate(historyEnd=Max('billedToDttm'))['historyEnd']
+        accountIds = list(
+            CustomerAccount.objects.filter(billingCycle=self.billingCycle).order_by('id').values_list('id', flat=True)
+        )
+        self.accountCount = len(accountIds)
+        self.accountIds = self.rng.sample(accountIds, min(samples, len(accountIds)))
+
+
+def gitCommit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarise(samples):
+    samples = sorted(samples)
+
+    def percentile(fraction):
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+    return {
+        'count': len(samples),
+        'meanMs': statistics.mean(samples) * 1000,
+        'p50Ms': percentile(0.50),
+        'p95Ms': percentile(0.95),
+        'p99Ms': percentile(0.99),
+        'maxMs': samples[-1] * 1000,
+    }
+
+
+@contextmanager
+def rolledBack():
+    # Write benchmarks leave the dataset as they found it, so runs stay comparable.
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def timeEach(function, arguments):
+    samples = []
+    with recordQueries() as recorder:
+        for argument in arguments:
+            start = time.perf_counter()
+            function(argument)
+            samples.append(time.perf_counter() - start)
+    return dict(summarise(samples), queriesPerCall=recorder.queryCount / max(len(samples), 1))
+
+
+def benchReadingIngest(context):
+    identifiers = list(
+        MeterPoint.objects.filter(customerAccount_id__in=context.accountIds).values_list('identifier', flat=True)
+    )
+    if not identifiers:
+        return {'rows': 0}
+    fileObject = io.StringIO()
+    fileObject.write('identifier,value,fromDttm\n')
+    for i in range(context.ingestRows):
+        fromDttm = context.historyEnd + datetime.timedelta(hours=1 + i // len(identifiers))
+        fileObject.write('{},{},{}\n'.format(
+            identifiers[i % len(identifiers)], 100000 + i, fromDttm.isoformat()
+        ))
+    fileObject.seek(0)
+
+    with rolledBack(), recordQueries() as recorder:
+        result = ingestMeterReadings(fileObject, 'csv')
+    return {
+        'rows': result.rowsRead,
+        'seconds': result.elapsed,
+        'rowsPerSecond': result.rowsPerSecond,
+        'queries': recorder.queryCount,
+    }
+
+
+def benchBillRun(context):
+    fromDttm = context.historyEnd
+    toDttm = fromDttm + datetime.timedelta(days=30)
+    with rolledBack(), recordQueries() as recorder:
+        start = time.perf_counter()
+        result = generateBills(context.billingCycle, fromDttm, toDttm)
+        elapsed = time.perf_counter() - start
+    return {
+        'accounts': result.accountsProcessed,
+        'billsCreated': result.billsCreated,
+        'seconds': elapsed,
+        'accountsPerSecond': result.accountsProcessed / elapsed if elapsed else 0.0,
+        'queries': recorder.queryCount,
+    }
+
+
+def benchAsOfCharges(context):
+    asOfDttm = context.historyEnd - datetime.timedelta(days=400)
+    return timeEach(
+        lambda accountId: Charges.objects.asOf(asOfDttm).filter(customerAccount_id=accountId).values_list(
+            'standingCharge', 'unitRate'
+        ).first(),
+        context.accountIds,
+    )
+
+
+def benchStatementPages(context):
+    def statement(accountId):
+        queryset = Bill.objects.filter(customerAccount_id=accountId).values(
+            'id', 'number', 'status', 'billedFromDttm', 'billedToDttm', 'grossAmount', 'createdDttm',
+        )
+        page = keysetPaginate(queryset, ['createdDttm', 'id'], limit=12)
+        if page.nextCursor:
+            keysetPaginate(queryset, ['createdDttm', 'id'], page.nextCursor, limit=12)
+
+    return timeEach(statement, context.accountIds)
+
+
+def benchChargePricing(context):
+    meterPointIds = list(
+        MeterPoint.objects.filter(customerAccount_id__in=context.accountIds).values_list('id', flat=True)
+    )
+    fromDttm = context.historyEnd - datetime.timedelta(days=365)
+    with recordQueries() as recorder:
+        start = time.perf_counter()
+        priced = priceMeterReadings(meterPointIds, fromDttm, context.historyEnd)
+        elapsed = time.perf_counter() - start
+    intervals = sum(len(rows) for rows in priced.values())
+    return {
+        'meterPoints': len(meterPointIds),
+        'intervals': intervals,
+        'seconds': elapsed,
+        'intervalsPerSecond': intervals / elapsed if elapsed else 0.0,
+        'queries': recorder.queryCount,
+    }
+
+
+BENCHMARKS = {
+    'readingIngest': benchReadingIngest,
+    'billRun': benchBillRun,
+    'asOfCharges': benchAsOfCharges,
+    'statementPages': benchStatementPages,
+    'chargePricing': benchChargePricing,
+}
+
+
+def runBenchmarks(names=None, samples=DEFAULT_SAMPLES, ingestRows=DEFAULT_INGEST_ROWS, seed=1):
+    context = BenchmarkContext(samples, ingestRows, seed)
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = BENCHMARKS[name](context)
+    return {'accounts': context.accountCount, 'results': results}
+
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+seconds = time.perf_counter() - start
+apps = ('core', 'accounts', 'energy', 'payment', 'onepower')
+print(json.dumps({
+    'seconds': seconds,
+    'modules': len(sys.modules),
+    'projectModules': sorted(name for name in sys.modules if name.split('.')[0] in apps),
+}))
+"""
+
+
+def measureStartup(runs=10):
+    # django.setup() in fresh interpreters, as a short-lived worker or pooled process pays it on every start.
+    environment = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'onepower.settings'))
+    results = [
+        json.loads(subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+            env=environment,
+        ).stdout)
+        for _ in range(runs)
+    ]
+    return dict(
+        summarise([result['seconds'] for result in results]),
+        modules=results[-1]['modules'],
+        projectModules=results[-1]['projectModules'],
+    )
+
+
+def benchmarkEnvironment(seed):
+    return {
+        'commit': gitCommit(),
+        'createdDttm': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'vendor': connection.vendor,
+        'seed': seed,
+    }
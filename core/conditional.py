@@ -0,0 +1,53 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+RESOURCE_CACHE_KEY = 'resource:{}'
+
+
+def versionSignature(queryset, related=(), appendOnly=False):
+    """
+    One aggregate query standing in for the rows behind a response. Row count and max id catch inserts and
+    deletes; the sum of versionNo catches in-place updates, which bump it through save(), queryset update() and
+    bulk_update() alike. related names foreign keys whose rows are rendered too. appendOnly leaves out the versionNo
+    sum for tables that are only ever inserted into, so the aggregate can be answered from the index.
+    """
+    aggregates = {'count': Count('pk'), 'lastId': Max('pk')}
+    if not appendOnly:
+        aggregates['versionSum'] = Sum('versionNo')
+    for name in related:
+        aggregates[name + 'IdSum'] = Sum(name + '__id')
+        aggregates[name + 'VersionSum'] = Sum(name + '__versionNo')
+    signature = queryset.order_by().aggregate(**aggregates)
+    return tuple(signature[name] for name in aggregates)
+
+
+def conditionalResponse(request, signatures, render):
+    """
+    The ETag is a hash of the full path and the signatures, so it changes whenever the underlying rows do. A
+    matching If-None-Match gets a 304 without rendering; otherwise the rendered body is served from the cache under
+    the ETag, and render() only runs on a miss. Non-200 responses are neither cached nor tagged.
+    """
+    digest = hashlib.sha1(repr((request.get_full_path(), signatures)).encode()).hexdigest()
+    etag = quote_etag(digest)
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        key = RESOURCE_CACHE_KEY.format(digest)
+        cached = cache.get(key)
+        if cached is not None:
+            content, contentType = cached
+            response = HttpResponse(content, content_type=contentType)
+        else:
+            response = render()
+            if response.status_code != 200:
+                return response
+            cache.set(key, (response.content, response['Content-Type']), settings.RESOURCE_CACHE_TIMEOUT)
+    response['ETag'] = etag
+    # Browsers keep the body but revalidate on every use, which is the cheap path above.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,38 @@
+import csv
+import itertools
+import json
+
+
+def detectFileFormat(path):
+    lowered = str(path).lower()
+    if lowered.endswith('.jsonl') or lowered.endswith('.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def iterRows(fileObject, fileFormat):
+    # Yields (lineNo, row) one at a time so the file is never held in memory.
+    if fileFormat == 'csv':
+        reader = csv.DictReader(fileObject)
+        for row in reader:
+            yield reader.line_num, row
+    elif fileFormat == 'jsonl':
+        for lineNo, line in enumerate(fileObject, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield lineNo, json.loads(line)
+            except ValueError:
+                yield lineNo, None
+    else:
+        raise ValueError('Unsupported file format: {}'.format(fileFormat))
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,222 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+logger = logging.getLogger('onepower.instrumentation')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_LOGGED_DUPLICATES = 5
+MAX_LOGGED_SQL_LENGTH = 500
+
+WHITESPACE = re.compile(r'\s+')
+PLACEHOLDERS = r'(?:%s, )*%s'
+IN_LIST = re.compile(r'IN \({}\)'.format(PLACEHOLDERS))
+VALUES_LIST = re.compile(r'VALUES \({0}\)(?:, \({0}\))*'.format(PLACEHOLDERS))
+UNION_LIST = re.compile(r'SELECT {0}(?: UNION ALL SELECT {0})+'.format(PLACEHOLDERS))
+
+
+def fingerprint(sql):
+    # Parameters are already placeholders; only IN lists and the rows of bulk inserts vary in shape between
+    # otherwise identical queries.
+    sql = WHITESPACE.sub(' ', sql).strip()
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = VALUES_LIST.sub('VALUES (...)', sql)
+    return UNION_LIST.sub('SELECT ... UNION ALL ...', sql)
+
+
+def shorten(sql):
+    return sql if len(sql) <= MAX_LOGGED_SQL_LENGTH else sql[:MAX_LOGGED_SQL_LENGTH] + '...'
+
+
+class QueryRecorder:
+
+    def __init__(self, name=None, budget=None):
+        self.name = name
+        self.budget = budget
+        self.queryCount = 0
+        self.dbTime = 0.0
+        self.wallTime = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.dbTime += time.perf_counter() - start
+            self.queryCount += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.most_common() if count > 1}
+
+    @property
+    def duplicateCount(self):
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+    @property
+    def overBudget(self):
+        return self.budget is not None and self.queryCount > self.budget
+
+    def asDict(self):
+        duplicates = {}
+        for sql, count in list(self.duplicates.items())[:MAX_LOGGED_DUPLICATES]:
+            duplicates[shorten(sql)] = duplicates.get(shorten(sql), 0) + count
+        return {
+            'name': self.name,
+            'queryCount': self.queryCount,
+            'queryBudget': self.budget,
+            'duplicateQueryCount': self.duplicateCount,
+            'dbMs': round(self.dbTime * 1000, 3),
+            'wallMs': round(self.wallTime * 1000, 3),
+            'duplicates': duplicates,
+        }
+
+
+@contextmanager
+def recordQueries(name=None, budget=None):
+    """
+    Counts and times every query run on this thread, on any alias, inside the block. Queries issued while a
+    streaming response is consumed happen after the block and are not included.
+    """
+    recorder = QueryRecorder(name, budget)
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        try:
+            yield recorder
+        finally:
+            recorder.wallTime = time.perf_counter() - start
+
+
+class TargetMetrics:
+
+    def __init__(self):
+        self.count = 0
+        self.queries = 0
+        self.duplicateQueries = 0
+        self.dbSeconds = 0.0
+        self.wallSeconds = 0.0
+        self.overBudget = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+class MetricsRegistry:
+    # Per-process totals; each worker process serves its own /metrics.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.targets = {}
+
+    def observe(self, kind, recorder):
+        with self.lock:
+            metrics = self.targets.setdefault((kind, recorder.name), TargetMetrics())
+            metrics.count += 1
+            metrics.queries += recorder.queryCount
+            metrics.duplicateQueries += recorder.duplicateCount
+            metrics.dbSeconds += recorder.dbTime
+            metrics.wallSeconds += recorder.wallTime
+            metrics.overBudget += recorder.overBudget
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if recorder.wallTime <= bound:
+                    metrics.buckets[i] += 1
+
+    def render(self):
+        with self.lock:
+            targets = sorted(self.targets.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            counters = [
+                ('onepower_runs_total', 'Instrumented view requests and command runs.', 'count'),
+                ('onepower_queries_total', 'Database queries issued.', 'queries'),
+                ('onepower_duplicate_queries_total', 'Queries repeating an earlier SQL fingerprint.',
+                 'duplicateQueries'),
+                ('onepower_db_seconds_total', 'Time spent in database queries.', 'dbSeconds'),
+                ('onepower_query_budget_exceeded_total', 'Runs that exceeded their declared query budget.',
+                 'overBudget'),
+            ]
+            lines = []
+            for metricName, helpText, attribute in counters:
+                lines.append('# HELP {} {}'.format(metricName, helpText))
+                lines.append('# TYPE {} counter'.format(metricName))
+                for (kind, name), metrics in targets:
+                    lines.append('{}{{{}}} {}'.format(
+                        metricName, formatLabels(kind, name), getattr(metrics, attribute)
+                    ))
+
+            lines.append('# HELP onepower_duration_seconds Wall time per view or command.')
+            lines.append('# TYPE onepower_duration_seconds histogram')
+            for (kind, name), metrics in targets:
+                labels = formatLabels(kind, name)
+                for bound, count in zip(DURATION_BUCKETS, metrics.buckets):
+                    lines.append('onepower_duration_seconds_bucket{{{},le="{}"}} {}'.format(labels, bound, count))
+                lines.append('onepower_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(labels, metrics.count))
+                lines.append('onepower_duration_seconds_sum{{{}}} {}'.format(labels, metrics.wallSeconds))
+                lines.append('onepower_duration_seconds_count{{{}}} {}'.format(labels, metrics.count))
+        return '\n'.join(lines) + '\n'
+
+
+def escapeLabel(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def formatLabels(kind, name):
+    return 'kind="{}",name="{}"'.format(escapeLabel(kind), escapeLabel(name))
+
+
+registry = MetricsRegistry()
+
+
+def report(kind, recorder, **fields):
+    registry.observe(kind, recorder)
+    record = dict(recorder.asDict(), kind=kind, **fields)
+    level = logging.WARNING if recorder.overBudget else logging.INFO
+    logger.log(level, json.dumps(record, default=str), extra={'instrumentation': record})
+
+
+@contextmanager
+def instrument(name, kind='command', budget=None):
+    recorder = None
+    try:
+        with recordQueries(name, budget) as recorder:
+            yield recorder
+    finally:
+        # Reported even when the command fails or exits, which is when the numbers are most wanted. recorder is
+        # still None if recordQueries itself failed to start.
+        if recorder is not None:
+            report(kind, recorder)
+
+
+def queryBudget(maxQueries):
+    # Declares the most queries a view may issue per request; checked by the middleware and assertQueryBudget.
+    def decorator(view):
+        view.queryBudget = maxQueries
+        return view
+    return decorator
+
+
+def getQueryBudget(view):
+    return getattr(view, 'queryBudget', None)
+
+
+class QueryInstrumentationMiddleware:
+    # Outermost, so session and authentication queries count against the view.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with recordQueries() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        # Labelled by view name rather than path so the metric series stay bounded.
+        recorder.name = match.view_name if match else 'unresolved'
+        recorder.budget = getQueryBudget(match.func) if match else None
+        report('view', recorder, method=request.method, status=response.status_code)
+        return response
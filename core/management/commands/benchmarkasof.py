@@ -0,0 +1,79 @@
+import datetime
+import random
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Min
+from django.utils import timezone
+
+from core.benchmarks import rolledBack, summarise
+from core.models import EffectiveDatedModel
+
+
+def getAsOfIndex(model):
+    for index in model._meta.indexes:
+        if index.fields[1:] == ['fromDttm', 'toDttm']:
+            return index
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure "valid at T" lookup latency through a model\'s asOf() manager on the current dataset, with its '
+        'partial (owner, fromDttm, toDttm) index and with the index dropped inside a transaction that is rolled '
+        'back, so lookups fall back to the other indexes on the owner. Run generatesyntheticdata first to benchmark at '
+        'a given size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default='payment.Charges', help='app_label.Model of an effective-dated model')
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError):
+            raise CommandError('Unknown model {}'.format(options['model']))
+        index = getAsOfIndex(model) if issubclass(model, EffectiveDatedModel) else None
+        if index is None:
+            raise CommandError('{} has no as-of index'.format(options['model']))
+
+        ownerField = model._meta.get_field(index.fields[0]).attname
+        ownerIds = list(model.allWithDeleted.order_by().values_list(ownerField, flat=True).distinct())
+        earliest = model.allWithDeleted.aggregate(earliest=Min('fromDttm'))['earliest']
+        if not ownerIds:
+            raise CommandError('No {} rows; run generatesyntheticdata first'.format(options['model']))
+
+        generator = random.Random(options['seed'])
+        span = (timezone.now() - earliest).total_seconds()
+        lookups = [
+            (generator.choice(ownerIds), earliest + datetime.timedelta(seconds=generator.uniform(0, span)))
+            for _ in range(max(1, options['queries']))
+        ]
+
+        def lookup(ownerId, asOfDttm):
+            return model.objects.asOf(asOfDttm).filter(**{ownerField: ownerId})
+
+        self.stdout.write('{} rows, {} owners'.format(model.allWithDeleted.count(), len(ownerIds)))
+        # Dropping the index inside a rolled back transaction leaves the table as it was. The unindexed run goes
+        # first because SQLite keeps using statements prepared before the drop.
+        with rolledBack():
+            with connection.cursor() as cursor:
+                cursor.execute(str(index.remove_sql(model, connection.schema_editor())))
+            unindexed = self.measure(lookup, lookups)
+        indexed = self.measure(lookup, lookups)
+
+        for label, timings in (('unindexed', unindexed), ('indexed', indexed)):
+            self.stdout.write('{:>9}: p50 {p50Ms:.3f}ms  p95 {p95Ms:.3f}ms  max {maxMs:.3f}ms'.format(label, **timings))
+
+    def measure(self, lookup, lookups):
+        self.stdout.write(lookup(*lookups[0]).explain())
+        timings = []
+        for ownerId, asOfDttm in lookups:
+            started = time.perf_counter()
+            list(lookup(ownerId, asOfDttm))
+            timings.append(time.perf_counter() - started)
+        return summarise(timings)
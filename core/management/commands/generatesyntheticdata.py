@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import DEFAULT_CHUNK_SIZE, DEFAULT_START_DT, DEFAULT_YEARS, generateSyntheticData
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic dataset of N accounts with addresses, meter points, readings, charges, '
+        'bills, payment requests and payments, posted to the ledger. Tops up an existing synthetic dataset rather '
+        'than starting again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('accounts', type=int)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--start', default=DEFAULT_START_DT.isoformat(), help='YYYY-MM-DD, first billed month')
+        parser.add_argument('--years', type=int, default=DEFAULT_YEARS)
+        parser.add_argument('--readings-per-month', dest='readingsPerMonth', type=int, default=1)
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunkSize'] < 1 or options['years'] < 1 or options['readingsPerMonth'] < 1:
+            raise CommandError('--chunk-size, --years and --readings-per-month must be positive')
+        try:
+            startDt = datetime.date.fromisoformat(options['start'])
+        except ValueError:
+            raise CommandError('--start must be YYYY-MM-DD')
+
+        verbosity = options['verbosity']
+
+        def onChunk(accountCount, result):
+            if verbosity > 1:
+                self.stdout.write('{} accounts, {} readings'.format(accountCount, result.readingsCreated))
+
+        result = generateSyntheticData(
+            options['accounts'], options['seed'], startDt, options['years'], options['readingsPerMonth'],
+            options['chunkSize'], onChunk,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Created {accountsCreated} accounts, {meterPointsCreated} meter points, {readingsCreated} readings, '
+            '{billsCreated} bills, {paymentRequestsCreated} payment requests, {paymentsCreated} payments and '
+            '{ledgerEntriesCreated} ledger entries.'.format(**result.asDict())
+        ))
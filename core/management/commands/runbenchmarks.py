@@ -0,0 +1,58 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import (
+    BENCHMARKS, DEFAULT_INGEST_ROWS, DEFAULT_SAMPLES, benchmarkEnvironment, measureStartup, runBenchmarks
+)
+from core.synthetic import DEFAULT_START_DT, DEFAULT_YEARS, generateSyntheticData
+
+
+class Command(BaseCommand):
+    help = (
+        'Time django.setup(), then reading ingest, a bill run, as-of charge lookups, statement pages and charge '
+        'pricing at each --scales account count, topping up the synthetic dataset between scales, and write the '
+        'results as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='10000,100000,1000000', help='comma separated account counts')
+        parser.add_argument('--only', default=None, help='comma separated subset of ' + ', '.join(BENCHMARKS))
+        parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES)
+        parser.add_argument('--ingest-rows', dest='ingestRows', type=int, default=DEFAULT_INGEST_ROWS)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--start', default=DEFAULT_START_DT.isoformat())
+        parser.add_argument('--years', type=int, default=DEFAULT_YEARS)
+        parser.add_argument('--no-generate', dest='generate', action='store_false',
+                            help='benchmark the current dataset as it is')
+        parser.add_argument('--startup-runs', dest='startupRuns', type=int, default=10,
+                            help='time django.setup() in this many fresh processes, 0 to skip')
+        parser.add_argument('--output', default=None, help='write JSON here instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+            startDt = datetime.date.fromisoformat(options['start'])
+        except ValueError:
+            raise CommandError('--scales must be integers and --start YYYY-MM-DD')
+        names = options['only'].split(',') if options['only'] else None
+        unknown = set(names or []).difference(BENCHMARKS)
+        if unknown:
+            raise CommandError('Unknown benchmarks: {}'.format(', '.join(sorted(unknown))))
+
+        report = dict(benchmarkEnvironment(options['seed']), runs=[])
+        if options['startupRuns'] > 0:
+            report['startup'] = measureStartup(options['startupRuns'])
+        for scale in (sorted(scales) if options['generate'] else [None]):
+            if scale is not None:
+                generateSyntheticData(scale, options['seed'], startDt, options['years'])
+            report['runs'].append(runBenchmarks(names, options['samples'], options['ingestRows'], options['seed']))
+            self.stderr.write('Finished benchmarks at {} accounts'.format(report['runs'][-1]['accounts']))
+
+        output = json.dumps(report, indent=2, default=str)
+        if options['output']:
+            with open(options['output'], 'w') as outputFile:
+                outputFile.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = 'Copy the default SQLite database over each SQLite replica alias, standing in for replication locally.'
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('syncreplicas only supports SQLite; use the database\'s own replication instead')
+
+        source = sqlite3.connect(str(primary['NAME']))
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                replica = settings.DATABASES[alias]
+                if replica['ENGINE'] != 'django.db.backends.sqlite3':
+                    raise CommandError('{} is not a SQLite database'.format(alias))
+                target = sqlite3.connect(str(replica['NAME']))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS('Copied {} to {}.'.format(primary['NAME'], alias)))
+        finally:
+            source.close()
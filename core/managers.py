@@ -0,0 +1,160 @@
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.files import chunked
+
+CAS_BATCH_SIZE = 100
+
+# Sent by softDelete() with the pks it marked deleted, since a queryset update fires neither post_save nor post_delete.
+softDeleted = Signal()
+
+
+class VersionConflict(Exception):
+    # conflicts maps pk -> (expected versionNo, current versionNo or None when the row is gone).
+
+    def __init__(self, model, conflicts):
+        self.model = model
+        self.conflicts = conflicts
+        super().__init__('{} rows changed by another writer: {}'.format(
+            model.__name__, ', '.join(str(pk) for pk in list(conflicts)[:20])
+        ))
+
+
+class CasResult:
+
+    def __init__(self, model):
+        self.model = model
+        self.updated = {}
+        self.conflicts = {}
+
+    def raiseForConflicts(self):
+        if self.conflicts:
+            raise VersionConflict(self.model, self.conflicts)
+
+
+class RowsMoved(Exception):
+    pass
+
+
+def asExpression(value, field):
+    # Plain values in When(then=...) would be read as field names.
+    return value if hasattr(value, 'resolve_expression') else Value(value, output_field=field)
+
+
+def versionMatch(expected):
+    condition = Q()
+    for pk, versionNo in expected.items():
+        condition |= Q(pk=pk, versionNo=versionNo)
+    return condition
+
+
+def nextVersion():
+    return Coalesce(F('versionNo'), 0) + 1
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # Every write moves versionNo, bulk_update() included, so version signatures and CAS readers see it.
+        kwargs.setdefault('versionNo', nextVersion())
+        return super().update(**kwargs)
+
+    def active(self):
+        return self.filter(deleteFl=False)
+
+    def deleted(self):
+        return self.filter(deleteFl=True)
+
+    def softDelete(self):
+        # The pks are only read when something listens for this model.
+        pks = list(self.values_list('pk', flat=True)) if softDeleted.has_listeners(self.model) else None
+        count = self.update(deleteFl=True)
+        if pks:
+            softDeleted.send(sender=self.model, pks=pks)
+        return count
+
+    def currentVersions(self, pks):
+        return dict(self.filter(pk__in=pks).values_list('pk', 'versionNo'))
+
+    def casUpdate(self, pk, versionNo, **fields):
+        # UPDATE ... WHERE id = pk AND versionNo = versionNo; returns the new versionNo or raises VersionConflict.
+        if not self.filter(pk=pk, versionNo=versionNo).update(versionNo=F('versionNo') + 1, **fields):
+            raise VersionConflict(self.model, {pk: (versionNo, self.currentVersions([pk]).get(pk))})
+        return versionNo + 1
+
+    def casUpdateMany(self, changes, batchSize=CAS_BATCH_SIZE):
+        """
+        Compare-and-swap for many rows: changes are (pk, expected versionNo, {field: value}). Each batch is one
+        SELECT and one UPDATE with per-row values in CASE expressions. Rows whose version moved are left untouched
+        and reported in result.conflicts instead of failing the batch.
+        """
+        result = CasResult(self.model)
+        for batch in chunked(changes, batchSize):
+            expected = {pk: versionNo for pk, versionNo, _ in batch}
+            try:
+                self.casBatch(batch, expected, result)
+            except RowsMoved:
+                # Only reachable without row locks (SQLite): fall back to one CAS per row for this batch.
+                for pk, versionNo, fields in batch:
+                    try:
+                        result.updated[pk] = self.casUpdate(pk, versionNo, **fields)
+                    except VersionConflict as e:
+                        result.conflicts.update(e.conflicts)
+        return result
+
+    def casBatch(self, batch, expected, result):
+        with transaction.atomic(using=self.db):
+            matched = set(self.filter(versionMatch(expected)).select_for_update().values_list('pk', flat=True))
+            rows = [change for change in batch if change[0] in matched]
+            if rows:
+                assignments = {}
+                for name in {name for _, _, fields in rows for name in fields}:
+                    field = self.model._meta.get_field(name)
+                    whens = [
+                        When(pk=pk, then=asExpression(fields[name], field)) for pk, _, fields in rows if name in fields
+                    ]
+                    assignments[field.attname] = Case(*whens, default=F(field.attname), output_field=field)
+                updated = self.filter(versionMatch({pk: expected[pk] for pk in matched})).update(
+                    versionNo=F('versionNo') + 1, **assignments
+                )
+                if updated != len(rows):
+                    raise RowsMoved
+        for pk in matched:
+            result.updated[pk] = expected[pk] + 1
+        missed = [pk for pk in expected if pk not in matched]
+        if missed:
+            current = self.currentVersions(missed)
+            result.conflicts.update({pk: (expected[pk], current.get(pk)) for pk in missed})
+
+
+class EffectiveDatedQuerySet(SoftDeleteQuerySet):
+
+    def asOf(self, dttm=None):
+        # Rows valid at dttm: fromDttm <= dttm < toDttm, with datetime.max as the open end.
+        dttm = dttm or timezone.now()
+        return self.filter(fromDttm__lte=dttm, toDttm__gt=dttm, deleteFl=False)
+
+    def overlapping(self, fromDttm, toDttm):
+        return self.filter(fromDttm__lt=toDttm, toDttm__gt=fromDttm, deleteFl=False)
+
+
+class ActiveManagerMixin:
+    # Hides soft deleted rows; the unfiltered rows stay reachable through allWithDeleted.
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleteFl=False)
+
+
+class ActiveManager(ActiveManagerMixin, models.Manager.from_queryset(SoftDeleteQuerySet)):
+    pass
+
+
+class ActiveEffectiveDatedManager(ActiveManagerMixin, models.Manager.from_queryset(EffectiveDatedQuerySet)):
+    pass
+
+
+SoftDeleteManager = models.Manager.from_queryset(SoftDeleteQuerySet)
+EffectiveDatedManager = models.Manager.from_queryset(EffectiveDatedQuerySet)
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('nextValue', models.BigIntegerField()),
+            ],
+        ),
+    ]
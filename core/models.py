@@ -0,0 +1,64 @@
+import datetime
+
+from django.db import models
+from django.db.models import Q
+
+from core.managers import ActiveEffectiveDatedManager, ActiveManager, EffectiveDatedManager, SoftDeleteManager
+
+
+class SoftDeleteModel(models.Model):
+    # Columns every table in the project carries.
+    reference = models.CharField(max_length=2048, blank=True, null=True)
+    deleteFl = models.BooleanField(default=False)
+    orderNo = models.IntegerField(default=1, blank=True, null=True)
+    versionNo = models.IntegerField(default=1, blank=True, null=True)
+
+    objects = ActiveManager()
+    allWithDeleted = SoftDeleteManager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Updates through save() bump versionNo the same way queryset updates do.
+        if not self._state.adding:
+            self.versionNo = (self.versionNo or 0) + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'versionNo'}
+        super().save(*args, **kwargs)
+
+    def casSave(self, *fieldNames):
+        # Writes fieldNames only if the row is still at this instance's versionNo; raises VersionConflict otherwise.
+        fields = {name: getattr(self, self._meta.get_field(name).attname) for name in fieldNames}
+        self.versionNo = type(self).allWithDeleted.casUpdate(self.pk, self.versionNo, **fields)
+
+
+class EffectiveDatedModel(SoftDeleteModel):
+    fromDttm = models.DateTimeField(default=datetime.date.today)
+    toDttm = models.DateTimeField(default=datetime.datetime.max)
+
+    objects = ActiveEffectiveDatedManager()
+    allWithDeleted = EffectiveDatedManager()
+
+    class Meta:
+        abstract = True
+
+
+def liveIndex(fields, name):
+    # Partial index over rows that are not soft deleted, so it does not grow with deleted history.
+    # Backends without partial index support skip it.
+    return models.Index(fields=fields, name=name, condition=Q(deleteFl=False))
+
+
+def asOfIndex(ownerField, name):
+    # Serves "valid at T" lookups for one owner: equality on the owner, range on fromDttm/toDttm.
+    return liveIndex([ownerField, 'fromDttm', 'toDttm'], name)
+
+
+class ReferenceSequence(models.Model):
+    # High-water mark for a reference number series; processes claim blocks from it.
+    name = models.CharField(max_length=255, unique=True)
+    nextValue = models.BigIntegerField()
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,103 @@
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+
+    def default(self, o):
+        # DjangoJSONEncoder truncates datetimes to milliseconds, which would skip rows on the next page.
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encodeCursor(values):
+    payload = json.dumps(list(values), cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decodeCursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Malformed cursor')
+    return values
+
+
+def parsePageSize(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def afterCursor(orderFields, values, descending):
+    # Rows strictly after values in (field1, field2, ...) order, written as a lexicographic OR of ANDs.
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for i, field in enumerate(orderFields):
+        equal = {orderFields[j]: values[j] for j in range(i)}
+        equal['{}__{}'.format(field, lookup)] = values[i]
+        condition |= Q(**equal)
+    return condition
+
+
+class KeysetPage:
+
+    def __init__(self, rows, nextCursor):
+        self.rows = rows
+        self.nextCursor = nextCursor
+
+
+def fetchAfter(queryset, orderFields, afterValues, limit, descending):
+    queryset = queryset.order_by(*[('-' if descending else '') + field for field in orderFields])
+    if afterValues is not None:
+        queryset = queryset.filter(afterCursor(orderFields, afterValues, descending))
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def keysetPaginate(queryset, orderFields, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    """
+    Cursor pagination over a values() queryset. The last column of orderFields must be unique (normally id)
+    and the queryset should be backed by an index on the same columns so each page is an index range scan.
+    """
+    orderFields = list(orderFields)
+    afterValues = decodeCursor(cursor, len(orderFields)) if cursor else None
+    rows, hasMore = fetchAfter(queryset, orderFields, afterValues, limit, descending)
+    nextCursor = encodeCursor(rows[-1][field] for field in orderFields) if hasMore else None
+    return KeysetPage(rows, nextCursor)
+
+
+def iterKeyset(queryset, orderFields, chunkSize=2000, descending=False):
+    # Walks the whole queryset page by page, e.g. for streaming exports, without OFFSET or a long-lived cursor.
+    orderFields = list(orderFields)
+    afterValues = None
+    while True:
+        rows, hasMore = fetchAfter(queryset, orderFields, afterValues, chunkSize, descending)
+        yield from rows
+        if not hasMore:
+            return
+        afterValues = [rows[-1][field] for field in orderFields]
+
+
+def keysetResponse(request, queryset, orderFields):
+    try:
+        page = keysetPaginate(queryset, orderFields, request.GET.get('cursor'), parsePageSize(request.GET.get('limit')))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'results': page.rows, 'next': page.nextCursor})
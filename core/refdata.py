@@ -0,0 +1,99 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.signals import post_delete, post_save
+
+
+class ReferenceDataSnapshot:
+
+    def __init__(self, rows, keyFields, signature):
+        self.byId = {row.pk: row for row in rows}
+        self.byKey = {}
+        for keyField in keyFields:
+            self.byKey[keyField] = {
+                getattr(row, keyField): row for row in rows if not row.deleteFl and getattr(row, keyField) is not None
+            }
+        self.rows = tuple(row for row in rows if not row.deleteFl)
+        self.signature = signature
+        self.checkedAt = time.monotonic()
+
+
+class ReferenceDataCache:
+    """
+    Per-process cache of small, rarely changing lookup tables.
+
+    A table is loaded on first use and served from memory afterwards. Saves in this process drop the
+    snapshot straight away through signals; changes made by other processes are picked up when the
+    (row count, sum of versionNo) signature moves, checked at most every REFERENCE_DATA_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self.keyFields = {}
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    def register(self, model, keyFields=('internalKey',)):
+        self.keyFields[model] = tuple(keyFields)
+        post_save.connect(self.invalidateFromSignal, sender=model, dispatch_uid=('referenceData', model))
+        post_delete.connect(self.invalidateFromSignal, sender=model, dispatch_uid=('referenceData', model))
+
+    def invalidate(self, model=None):
+        with self.lock:
+            if model is None:
+                self.snapshots.clear()
+            else:
+                self.snapshots.pop(model, None)
+
+    def invalidateFromSignal(self, sender, **kwargs):
+        self.invalidate(sender)
+
+    def getSignature(self, model):
+        signature = model.allWithDeleted.aggregate(count=Count('id'), versionSum=Sum('versionNo'))
+        return signature['count'], signature['versionSum']
+
+    def load(self, model):
+        signature = self.getSignature(model)
+        rows = list(model.allWithDeleted.order_by('orderNo', 'id'))
+        return ReferenceDataSnapshot(rows, self.keyFields[model], signature)
+
+    def getSnapshot(self, model):
+        if model not in self.keyFields:
+            raise LookupError('{} is not registered as reference data'.format(model.__name__))
+
+        snapshot = self.snapshots.get(model)
+        if snapshot is not None and time.monotonic() - snapshot.checkedAt < settings.REFERENCE_DATA_REFRESH_SECONDS:
+            return snapshot
+
+        if snapshot is not None and self.getSignature(model) == snapshot.signature:
+            snapshot.checkedAt = time.monotonic()
+            return snapshot
+
+        snapshot = self.load(model)
+        with self.lock:
+            self.snapshots[model] = snapshot
+        return snapshot
+
+    def get(self, model, pk):
+        try:
+            return self.getSnapshot(model).byId[pk]
+        except KeyError:
+            raise model.DoesNotExist('{} {} does not exist'.format(model.__name__, pk))
+
+    def getByKey(self, model, value, keyField=None):
+        keyField = keyField or self.keyFields[model][0]
+        try:
+            return self.getSnapshot(model).byKey[keyField][value]
+        except KeyError:
+            raise model.DoesNotExist('{} with {}={!r} does not exist'.format(model.__name__, keyField, value))
+
+    def all(self, model):
+        return self.getSnapshot(model).rows
+
+    def warmUp(self):
+        for model in list(self.keyFields):
+            self.getSnapshot(model)
+
+
+referenceData = ReferenceDataCache()
@@ -0,0 +1,170 @@
+import os
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils.deconstruct import deconstructible
+
+# Ten digit sequence values plus a check digit give eleven digit reference numbers, so they never overlap the ten digit
+# random numbers issued before the allocator existed.
+FIRST_SEQUENCE_VALUE = 1000000000
+LAST_SEQUENCE_VALUE = 9999999999
+
+
+def checkDigit(value):
+    # Luhn check digit for value.
+    total = 0
+    for position, digit in enumerate(reversed(str(value))):
+        digit = int(digit)
+        if position % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return (10 - total % 10) % 10
+
+
+def isValidReferenceNumber(number):
+    number = str(number)
+    return number.isdigit() and len(number) > 1 and checkDigit(number[:-1]) == int(number[-1])
+
+
+def toReferenceNumber(sequenceValue):
+    return sequenceValue * 10 + checkDigit(sequenceValue)
+
+
+class ReferenceBlock:
+
+    def __init__(self, start, end):
+        self.next = start
+        self.end = end
+        self.taken = set()
+        self.pid = os.getpid()
+        self.confirmed = True
+        self.onCommit = None
+
+    @property
+    def remaining(self):
+        return self.end - self.next
+
+    def isUsable(self, connection):
+        if self.pid != os.getpid():
+            # Inherited through fork: the parent may hand out the same numbers.
+            return False
+        if not self.confirmed and not any(func is self.onCommit for _, func in connection.run_on_commit):
+            # The transaction that claimed this block rolled back, so the claim was undone.
+            return False
+        return self.remaining > 0
+
+    def take(self, count):
+        # Up to count sequence values from the block, skipping those whose number is already stored.
+        values = []
+        while self.next < self.end and len(values) < count:
+            if self.next not in self.taken:
+                values.append(self.next)
+            self.next += 1
+        return values
+
+
+def getSeriesFields(name):
+    series = ReferenceNumber(name)
+    return [
+        (model, field) for model in apps.get_models() for field in model._meta.concrete_fields
+        if field.default == series
+    ]
+
+
+class ReferenceNumberAllocator:
+
+    def __init__(self):
+        self.blocks = {}
+        self.lock = threading.Lock()
+
+    def getTakenValues(self, name, start, end, using):
+        # Sequence values in [start, end) whose number is already stored in a field drawing from the series, e.g. one
+        # imported from another system.
+        taken = set()
+        for model, field in getSeriesFields(name):
+            numbers = model._base_manager.using(using).filter(**{
+                '{}__range'.format(field.attname): (toReferenceNumber(start), toReferenceNumber(end - 1))
+            }).values_list(field.attname, flat=True)
+            taken.update(number // 10 for number in numbers if isValidReferenceNumber(number))
+        return taken
+
+    def claimBlock(self, name, size):
+        from core.models import ReferenceSequence
+
+        connection = transaction.get_connection()
+        # Inside a transaction the claim goes through its own connection when one is configured, so it commits at
+        # once instead of keeping the sequence row locked until the caller commits.
+        using = settings.REFERENCE_NUMBER_CLAIM_DATABASE if connection.in_atomic_block else None
+        using = using or DEFAULT_DB_ALIAS
+        sequences = ReferenceSequence.objects.using(using)
+        with transaction.atomic(using=using):
+            # Greatest() moves a series started below the current range up to it.
+            nextValue = Greatest(F('nextValue'), Value(FIRST_SEQUENCE_VALUE)) + size
+            if not sequences.filter(name=name).update(nextValue=nextValue):
+                try:
+                    with transaction.atomic(using=using):
+                        sequences.create(name=name, nextValue=FIRST_SEQUENCE_VALUE + size)
+                except IntegrityError:
+                    sequences.filter(name=name).update(nextValue=nextValue)
+            end = sequences.values_list('nextValue', flat=True).get(name=name)
+
+        if end - 1 > LAST_SEQUENCE_VALUE:
+            raise OverflowError('Reference number series {} is exhausted'.format(name))
+
+        block = ReferenceBlock(end - size, end)
+        block.taken = self.getTakenValues(name, block.next, block.end, using)
+        if connection.in_atomic_block and using == DEFAULT_DB_ALIAS:
+            block.confirmed = False
+
+            def confirm():
+                block.confirmed = True
+
+            block.onCommit = confirm
+            transaction.on_commit(confirm)
+        return block
+
+    def allocate(self, name, count):
+        # Checks the local block, claims new ones as needed and takes count values under one hold of the lock, so
+        # concurrent threads never both pass the check and run past the end of the block.
+        connection = transaction.get_connection()
+        values = []
+        with self.lock:
+            while len(values) < count:
+                block = self.blocks.get(name)
+                if block is None or not block.isUsable(connection):
+                    block = self.claimBlock(name, max(count - len(values), settings.REFERENCE_NUMBER_BLOCK_SIZE))
+                    self.blocks[name] = block
+                values.extend(block.take(count - len(values)))
+        return values
+
+    def next(self, name):
+        return toReferenceNumber(self.allocate(name, 1)[0])
+
+    def take(self, name, count):
+        return [toReferenceNumber(value) for value in self.allocate(name, count)]
+
+
+allocator = ReferenceNumberAllocator()
+
+
+@deconstructible
+class ReferenceNumber:
+    # Field default drawing the next number of a named series, e.g. ReferenceNumber('energy.Bill.number').
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self):
+        return allocator.next(self.name)
+
+    def __eq__(self, other):
+        return isinstance(other, ReferenceNumber) and other.name == self.name
+
+    def __hash__(self):
+        return hash(self.name)
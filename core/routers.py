@@ -0,0 +1,86 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_PIN_COOKIE = 'replicaPinned'
+
+replicaReadsEnabled = contextvars.ContextVar('replicaReadsEnabled', default=False)
+requestRouting = contextvars.ContextVar('requestRouting', default=None)
+
+
+class RequestRouting:
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def replicaReads():
+    """
+    Lets reads inside the block go to a replica. Usable as a decorator on reporting views. Reads still go to the
+    primary after the current request has written, while the client holds the pin cookie, or inside a transaction.
+    """
+    token = replicaReadsEnabled.set(True)
+    try:
+        yield
+    finally:
+        replicaReadsEnabled.reset(token)
+
+
+def isPinnedToPrimary():
+    routing = requestRouting.get()
+    if routing is not None and (routing.pinned or routing.wrote):
+        return True
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not replicaReadsEnabled.get() or isPinnedToPrimary():
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = requestRouting.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary, never from migrate.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    # Sticky-after-write: once a request writes, the rest of it and the client's next requests for
+    # REPLICA_STICKY_SECONDS read from the primary, so nobody reads their own write from a lagging replica.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = RequestRouting(pinned=REPLICA_PIN_COOKIE in request.COOKIES)
+        token = requestRouting.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            requestRouting.reset(token)
+        if routing.wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,353 @@
+import datetime
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from accounts.models import Address, Country, CustomerAccount, Employee
+from core.references import allocator
+from energy.models import Bill, BillingCycle, BillPeriod, IconTbl, MeterPoint, MeterReading, UtilityMarket
+from payment.ledger import rebuildAccounts
+from payment.models import Charges, Currency, DirectDebit, Payment, PaymentMethod, PaymentMethodType, PaymentRequest
+
+SYNTHETIC_BILLING_CYCLE = 'SYNTHETIC'
+SYNTHETIC_USERNAME = 'synthetic'
+DEFAULT_START_DT = datetime.date(2021, 1, 1)
+DEFAULT_YEARS = 3
+DEFAULT_CHUNK_SIZE = 500
+INSERT_BATCH_SIZE = 5000
+LOOKUP_BATCH_SIZE = 900
+
+# Probability an account has a meter point on the market, and the mean monthly consumption there.
+MARKETS = (('ELECTRICITY', 1.0, 280.0), ('GAS', 0.7, 950.0))
+
+PENNY = Decimal('0.01')
+
+
+class SyntheticDataResult:
+
+    def __init__(self):
+        self.accountsCreated = 0
+        self.meterPointsCreated = 0
+        self.readingsCreated = 0
+        self.billsCreated = 0
+        self.paymentRequestsCreated = 0
+        self.paymentsCreated = 0
+        self.ledgerEntriesCreated = 0
+
+    def asDict(self):
+        return dict(vars(self))
+
+
+class ReferenceRows:
+    # The shared lookup rows every synthetic account points at, created once and reused by later runs.
+
+    def __init__(self):
+        self.country = getOrCreate(Country, internalKey='GB', defaults={'isoCode': 'GB'})
+        self.user, _ = User.objects.get_or_create(username=SYNTHETIC_USERNAME)
+        self.employee = Employee.objects.filter(user=self.user).first() or Employee.objects.create(
+            user=self.user, address=self.address('synthetic:address:employee'), createdUser=self.user,
+            terminatedUser=self.user,
+        )
+        self.currency = getOrCreate(Currency, internalKey='GBP', defaults={'languageKey': 'GBP', 'isoCode': 'GBP'})
+        self.billingCycle = getOrCreate(BillingCycle, name=SYNTHETIC_BILLING_CYCLE)
+        icon = getOrCreate(IconTbl, name='synthetic', defaults={'file': 'icons/synthetic.png'})
+        self.markets = [
+            (getOrCreate(UtilityMarket, internalKey=key, defaults={'iconTbl': icon}).pk, probability, meanUsage)
+            for key, probability, meanUsage in MARKETS
+        ]
+        self.directDebit = getOrCreate(PaymentMethodType, internalKey='DIRECT_DEBIT', defaults={'iconTbl': icon})
+
+    def address(self, reference):
+        return getOrCreate(Address, reference=reference, defaults={'country': self.country})
+
+
+def getOrCreate(model, defaults=None, **lookup):
+    return model.objects.get_or_create(defaults=defaults or {}, **lookup)[0]
+
+
+def bulkCreateKeyed(model, objects, keyField):
+    # Returns {key: pk}. Backends that cannot return ids from a bulk insert are read back by the unique key.
+    model.objects.bulk_create(objects, batch_size=INSERT_BATCH_SIZE)
+    if all(obj.pk is not None for obj in objects):
+        return {getattr(obj, keyField): obj.pk for obj in objects}
+    keys = [getattr(obj, keyField) for obj in objects]
+    ids = {}
+    for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+        ids.update(
+            model.allWithDeleted.filter(**{keyField + '__in': keys[start:start + LOOKUP_BATCH_SIZE]}).values_list(
+                keyField, 'id'
+            )
+        )
+    return ids
+
+
+def takeNumbers(model, fieldName, count):
+    return allocator.take(model._meta.get_field(fieldName).default.name, count)
+
+
+def addMonths(day, months):
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def aware(day):
+    return datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+
+
+def toMoney(value):
+    return Decimal(value).quantize(PENNY)
+
+
+class AccountPlan:
+    """
+    Everything random about one synthetic account, drawn from a generator seeded by the account's index so the
+    dataset does not depend on chunk size or on how many runs it took to reach a given size.
+    """
+
+    def __init__(self, index, seed, reference, months, years):
+        rng = random.Random(seed * 1000003 + index)
+        self.index = index
+        self.salesTaxExempt = rng.random() < 0.05
+        self.meterPoints = []
+        for marketId, probability, meanUsage in reference.markets:
+            if rng.random() < probability:
+                scale = rng.lognormvariate(0, 0.4)
+                register = rng.uniform(0, 50000)
+                registers = [register]
+                for month in range(months):
+                    # Winter months use more; a small share of months have no reading growth at all.
+                    seasonal = 1.3 if month % 12 in (0, 1, 10, 11) else 0.8
+                    register += 0.0 if rng.random() < 0.02 else meanUsage * scale * seasonal * rng.uniform(0.7, 1.3)
+                    registers.append(round(register, 3))
+                self.meterPoints.append((marketId, registers))
+        self.charges = [
+            (toMoney(rng.uniform(0.20, 0.60)), toMoney(rng.uniform(0.15, 0.40))) for _ in range(years)
+        ]
+        self.sortCode = '{:06d}'.format(rng.randrange(10 ** 6))
+        self.bankAccountNo = rng.randrange(10 ** 7, 10 ** 8)
+
+
+class SyntheticDataGenerator:
+
+    def __init__(self, seed=1, startDt=DEFAULT_START_DT, years=DEFAULT_YEARS, readingsPerMonth=1, result=None):
+        self.seed = seed
+        self.startDt = startDt
+        self.years = years
+        self.months = years * 12
+        self.readingsPerMonth = readingsPerMonth
+        self.result = result or SyntheticDataResult()
+        self.reference = ReferenceRows()
+
+    def existingAccountCount(self):
+        return CustomerAccount.allWithDeleted.filter(billingCycle=self.reference.billingCycle).count()
+
+    def generate(self, accounts, chunkSize=DEFAULT_CHUNK_SIZE, onChunk=None):
+        # Tops the dataset up to `accounts` synthetic accounts, so 10k -> 100k -> 1M reuses the earlier rows.
+        for start in range(self.existingAccountCount(), accounts, chunkSize):
+            plans = [
+                AccountPlan(index, self.seed, self.reference, self.months, self.years)
+                for index in range(start, min(start + chunkSize, accounts))
+            ]
+            with transaction.atomic():
+                self.createAccounts(plans)
+            if onChunk is not None:
+                onChunk(start + len(plans), self.result)
+        return self.result
+
+    def createAccounts(self, plans):
+        reference = self.reference
+        startDttm = aware(self.startDt)
+
+        addressIds = bulkCreateKeyed(Address, [
+            Address(
+                address1='{} Synthetic Street'.format(plan.index + 1), postcode='SY{} {}AA'.format(
+                    plan.index % 100, plan.index % 10
+                ), country=reference.country, reference='synthetic:address:{}'.format(plan.index),
+            )
+            for plan in plans
+        ], 'reference')
+
+        accountNumbers = takeNumbers(CustomerAccount, 'number', len(plans))
+        accountIds = bulkCreateKeyed(CustomerAccount, [
+            CustomerAccount(
+                user=reference.user, number=number, address_id=addressIds['synthetic:address:{}'.format(plan.index)],
+                createdUser=reference.user, terminatedUser=reference.user, currency=reference.currency,
+                salesTaxExempt=plan.salesTaxExempt, companyName='Synthetic {}'.format(plan.index + 1),
+                companyNumber=plan.index + 1, billingCycle=reference.billingCycle, fromDttm=startDttm,
+            )
+            for plan, number in zip(plans, accountNumbers)
+        ], 'number')
+        accountIds = [accountIds[number] for number in accountNumbers]
+
+        self.createMeterPoints(plans, accountIds, addressIds)
+        self.createCharges(plans, accountIds)
+        paymentMethodIds = self.createPaymentMethods(plans, accountIds)
+        self.createBills(plans, accountIds, paymentMethodIds)
+        # The new accounts have no ledger yet, so replaying their bills and payments posts everything in order.
+        self.result.ledgerEntriesCreated += rebuildAccounts(accountIds)
+        self.result.accountsCreated += len(plans)
+
+    def createMeterPoints(self, plans, accountIds, addressIds):
+        startDttm = aware(self.startDt)
+        meterPoints = [
+            (plan, accountId, marketId, registers)
+            for plan, accountId in zip(plans, accountIds) for marketId, registers in plan.meterPoints
+        ]
+        identifiers = takeNumbers(MeterPoint, 'identifier', len(meterPoints))
+        meterPointIds = bulkCreateKeyed(MeterPoint, [
+            MeterPoint(
+                utilityMarket_id=marketId, identifier=identifier, lastPublishDttm=startDttm,
+                nextPublishDttm=startDttm, address_id=addressIds['synthetic:address:{}'.format(plan.index)],
+                customerAccount_id=accountId,
+            )
+            for (plan, accountId, marketId, _), identifier in zip(meterPoints, identifiers)
+        ], 'identifier')
+
+        readings = []
+        for (_, _, _, registers), identifier in zip(meterPoints, identifiers):
+            meterPointId = meterPointIds[identifier]
+            for month in range(self.months):
+                monthStart = aware(addMonths(self.startDt, month))
+                monthDays = (aware(addMonths(self.startDt, month + 1)) - monthStart).days
+                opening, closing = registers[month], registers[month + 1]
+                for k in range(self.readingsPerMonth):
+                    fraction = k / self.readingsPerMonth
+                    readings.append(MeterReading(
+                        meterPoint_id=meterPointId, value=round(opening + (closing - opening) * fraction, 3),
+                        fromDttm=monthStart + datetime.timedelta(days=monthDays * fraction),
+                    ))
+            readings.append(MeterReading(
+                meterPoint_id=meterPointId, value=registers[-1], fromDttm=aware(addMonths(self.startDt, self.months))
+            ))
+            if len(readings) >= INSERT_BATCH_SIZE:
+                MeterReading.objects.bulk_create(readings, batch_size=INSERT_BATCH_SIZE)
+                self.result.readingsCreated += len(readings)
+                readings = []
+        MeterReading.objects.bulk_create(readings, batch_size=INSERT_BATCH_SIZE)
+        self.result.readingsCreated += len(readings)
+        self.result.meterPointsCreated += len(meterPoints)
+
+    def createCharges(self, plans, accountIds):
+        # One price per year, each version closed by the next, so as-of lookups have history to search through.
+        charges = []
+        for plan, accountId in zip(plans, accountIds):
+            for year, (standingCharge, unitRate) in enumerate(plan.charges):
+                charge = Charges(
+                    customerAccount_id=accountId, standingCharge=standingCharge, unitRate=unitRate,
+                    createdUser=self.reference.user, fromDttm=aware(addMonths(self.startDt, year * 12)),
+                )
+                if year < len(plan.charges) - 1:
+                    charge.toDttm = aware(addMonths(self.startDt, (year + 1) * 12))
+                charges.append(charge)
+        Charges.objects.bulk_create(charges, batch_size=INSERT_BATCH_SIZE)
+
+    def createPaymentMethods(self, plans, accountIds):
+        paymentMethodIds = bulkCreateKeyed(PaymentMethod, [
+            PaymentMethod(
+                paymentMethodType=self.reference.directDebit, customerAccount_id=accountId,
+                paymentMethodStatus=PaymentMethod.PaymentMethodStatus.ACTIVE, fromDttm=aware(self.startDt),
+                reference='synthetic:paymentMethod:{}'.format(plan.index),
+            )
+            for plan, accountId in zip(plans, accountIds)
+        ], 'reference')
+        paymentMethodIds = [paymentMethodIds['synthetic:paymentMethod:{}'.format(plan.index)] for plan in plans]
+        DirectDebit.objects.bulk_create([
+            DirectDebit(
+                paymentMethod_id=paymentMethodId, sortCode=plan.sortCode, accountNo=plan.bankAccountNo,
+                accountName='Synthetic {}'.format(plan.index + 1), referenceNumber='SYN{:09d}'.format(plan.index),
+            )
+            for plan, paymentMethodId in zip(plans, paymentMethodIds)
+        ], batch_size=INSERT_BATCH_SIZE)
+        return paymentMethodIds
+
+    def createBills(self, plans, accountIds, paymentMethodIds):
+        # One accepted bill per month of history; all but the latest are paid by a successful direct debit, collected
+        # on the due date.
+        reference = self.reference
+        periodKeys = []
+        billPeriods = []
+        for plan, accountId in zip(plans, accountIds):
+            for month in range(self.months):
+                key = 'synthetic:period:{}:{}'.format(plan.index, month)
+                periodKeys.append(key)
+                billPeriods.append(BillPeriod(
+                    customerAccount_id=accountId, status=BillPeriod.Status.CLOSED,
+                    fromDttm=aware(addMonths(self.startDt, month)), toDttm=aware(addMonths(self.startDt, month + 1)),
+                    reference=key,
+                ))
+        periodIds = bulkCreateKeyed(BillPeriod, billPeriods, 'reference')
+
+        billNumbers = iter(takeNumbers(Bill, 'number', len(periodKeys)))
+        bills = []
+        requests = []
+        paid = []
+        requestIds = iter(takeNumbers(PaymentRequest, 'requestId', len(periodKeys)))
+        transactionIds = iter(takeNumbers(PaymentRequest, 'transactionId', len(periodKeys)))
+        for plan, accountId, paymentMethodId in zip(plans, accountIds, paymentMethodIds):
+            for month in range(self.months):
+                fromDttm = aware(addMonths(self.startDt, month))
+                toDttm = aware(addMonths(self.startDt, month + 1))
+                standingCharge, unitRate = plan.charges[month // 12]
+                consumption = sum(
+                    Decimal(str(registers[month + 1] - registers[month])) for _, registers in plan.meterPoints
+                )
+                netAmount = toMoney(consumption * unitRate + standingCharge * (toDttm - fromDttm).days)
+                salesTaxAmount = Decimal('0.00') if plan.salesTaxExempt else toMoney(netAmount * Decimal('0.20'))
+                grossAmount = netAmount + salesTaxAmount
+                latest = month == self.months - 1
+                issueDt = toDttm.date()
+                dueDt = issueDt + datetime.timedelta(days=14)
+                bills.append(Bill(
+                    customerAccount_id=accountId, billPeriod_id=periodIds['synthetic:period:{}:{}'.format(
+                        plan.index, month
+                    )], billedFromDttm=fromDttm, billedToDttm=toDttm, number=next(billNumbers),
+                    description='Energy bill for {:%d %b %Y} to {:%d %b %Y}'.format(fromDttm, toDttm),
+                    versionNumber=1, createdUser=reference.user, issueDt=issueDt, dueDt=dueDt,
+                    netAmount=netAmount, grossAmount=grossAmount, paidAmount=Decimal('0.00') if latest else grossAmount,
+                    currency=reference.currency, salesTaxAmount=salesTaxAmount, status=Bill.Status.ACCEPTED,
+                    acceptedDttm=toDttm,
+                ))
+                requests.append(PaymentRequest(
+                    paymentMethodType=reference.directDebit, requestId=next(requestIds),
+                    transactionId=next(transactionIds), paymentMethod_id=paymentMethodId,
+                    createdUser=reference.employee, postedDt=issueDt, collectionDt=dueDt,
+                    status=PaymentRequest.Status.PENDING if latest else PaymentRequest.Status.SUCCESSFUL,
+                    currency=reference.currency, amount=grossAmount, payee_id=accountId,
+                ))
+                if not latest:
+                    paid.append((bills[-1], requests[-1], aware(dueDt)))
+        billIds = bulkCreateKeyed(Bill, bills, 'number')
+        requestIds = bulkCreateKeyed(PaymentRequest, requests, 'requestId')
+        self.createPayments(paid, billIds, requestIds)
+        self.result.billsCreated += len(bills)
+        self.result.paymentRequestsCreated += len(requests)
+
+    def createPayments(self, paid, billIds, requestIds):
+        Payment.objects.bulk_create([
+            Payment(
+                paymentMethodType=self.reference.directDebit, paymentRequest_id=requestIds[request.requestId],
+                bill_id=billIds[bill.number], transactionId=request.transactionId,
+                customerAccount_id=bill.customerAccount_id, currency=self.reference.currency, amount=request.amount,
+            )
+            for bill, request, _ in paid
+        ], batch_size=INSERT_BATCH_SIZE)
+        # createdDttm is stamped on insert; one UPDATE per collection day moves the payments back to when they were
+        # collected, which is where the ledger posts them.
+        collected = defaultdict(list)
+        for bill, _, collectedDttm in paid:
+            collected[collectedDttm].append(billIds[bill.number])
+        for collectedDttm, ids in collected.items():
+            for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+                Payment.objects.filter(bill_id__in=ids[start:start + LOOKUP_BATCH_SIZE]).update(
+                    createdDttm=collectedDttm
+                )
+        self.result.paymentsCreated += len(paid)
+
+
+def generateSyntheticData(accounts, seed=1, startDt=DEFAULT_START_DT, years=DEFAULT_YEARS, readingsPerMonth=1,
+                          chunkSize=DEFAULT_CHUNK_SIZE, onChunk=None):
+    generator = SyntheticDataGenerator(seed, startDt, years, readingsPerMonth)
+    return generator.generate(accounts, chunkSize, onChunk)
@@ -0,0 +1,26 @@
+from urllib.parse import urlsplit
+
+from django.urls import resolve
+
+from core.instrumentation import getQueryBudget, recordQueries
+
+
+def assertQueryBudget(client, path, budget=None, method='get', **kwargs):
+    """
+    Requests path with the test client and fails if the view issues more queries than its @queryBudget, or
+    than budget when given. Returns the response for further assertions.
+    """
+    match = resolve(urlsplit(path).path)
+    if budget is None:
+        budget = getQueryBudget(match.func)
+    if budget is None:
+        raise AssertionError('{} declares no query budget'.format(match.view_name))
+
+    with recordQueries(match.view_name, budget) as recorder:
+        response = getattr(client, method)(path, **kwargs)
+    if recorder.overBudget:
+        duplicates = ''.join('\n  {}x {}'.format(count, sql) for sql, count in recorder.duplicates.items())
+        raise AssertionError('{} issued {} queries, budget is {}.{}'.format(
+            match.view_name, recorder.queryCount, budget, duplicates and '\nRepeated queries:' + duplicates
+        ))
+    return response
@@ -0,0 +1,209 @@
+import random
+
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from accounts.models import Employee
+from core.conditional import conditionalResponse, versionSignature
+from core.instrumentation import MAX_LOGGED_SQL_LENGTH, QueryRecorder, fingerprint
+from core.managers import VersionConflict
+from core.models import ReferenceSequence
+from core.pagination import InvalidCursor, iterKeyset, keysetPaginate
+from core.references import (
+    FIRST_SEQUENCE_VALUE, ReferenceNumberAllocator, checkDigit, isValidReferenceNumber, toReferenceNumber
+)
+from payment.models import Currency
+
+
+class ReferenceNumberTests(TestCase):
+
+    def testCheckDigit(self):
+        self.assertEqual(checkDigit(7992739871), 3)
+        self.assertEqual(checkDigit(100000000), 8)
+
+    def testValidReferenceNumber(self):
+        number = toReferenceNumber(123456789)
+        self.assertTrue(isValidReferenceNumber(number))
+        self.assertFalse(isValidReferenceNumber(number + 1))
+        self.assertFalse(isValidReferenceNumber('12a'))
+
+    @override_settings(REFERENCE_NUMBER_BLOCK_SIZE=5)
+    def testAllocatorClaimsBlocks(self):
+        allocator = ReferenceNumberAllocator()
+        numbers = [allocator.next('tests.series') for _ in range(7)]
+        self.assertEqual(numbers, [toReferenceNumber(FIRST_SEQUENCE_VALUE + i) for i in range(7)])
+        # Seven numbers from blocks of five: two blocks claimed.
+        self.assertEqual(ReferenceSequence.objects.get(name='tests.series').nextValue, FIRST_SEQUENCE_VALUE + 10)
+
+    @override_settings(REFERENCE_NUMBER_BLOCK_SIZE=5)
+    def testAllocatorTakeLargerThanBlock(self):
+        allocator = ReferenceNumberAllocator()
+        first = allocator.next('tests.series')
+        numbers = allocator.take('tests.series', 8)
+        self.assertEqual(len(set(numbers)), 8)
+        self.assertNotIn(first, numbers)
+        self.assertTrue(all(isValidReferenceNumber(number) for number in numbers))
+
+    @override_settings(REFERENCE_NUMBER_BLOCK_SIZE=5)
+    def testAllocatorsDoNotShareNumbers(self):
+        # Two allocators stand in for two processes drawing from the same series.
+        first, second = ReferenceNumberAllocator(), ReferenceNumberAllocator()
+        numbers = first.take('tests.series', 3) + second.take('tests.series', 3) + first.take('tests.series', 3)
+        self.assertEqual(len(set(numbers)), 9)
+
+    @override_settings(REFERENCE_NUMBER_BLOCK_SIZE=5)
+    def testAllocatorSkipsStoredNumbers(self):
+        # Legacy numbers were random ten digit ones, up to the very top of that range.
+        generator = random.Random(6)
+        legacy = {generator.randint(1000000000, 9999999999) for _ in range(200)} | {9999999999}
+        stored = toReferenceNumber(FIRST_SEQUENCE_VALUE + 2)
+        Employee.objects.bulk_create([Employee(number=number) for number in legacy | {stored}])
+        numbers = ReferenceNumberAllocator().take('accounts.Employee.number', 6)
+        self.assertEqual(numbers, [toReferenceNumber(FIRST_SEQUENCE_VALUE + i) for i in (0, 1, 3, 4, 5, 6)])
+
+    def testAllocatorMovesOldSeriesIntoRange(self):
+        ReferenceSequence.objects.create(name='tests.series', nextValue=999999990)
+        self.assertEqual(ReferenceNumberAllocator().next('tests.series'), toReferenceNumber(FIRST_SEQUENCE_VALUE))
+
+
+class CasUpdateTests(TestCase):
+
+    def setUp(self):
+        self.gbp = Currency.objects.create(internalKey='GBP', languageKey='GBP', isoCode='GBP')
+        self.eur = Currency.objects.create(internalKey='EUR', languageKey='EUR', isoCode='EUR')
+
+    def testCasUpdate(self):
+        versionNo = Currency.objects.casUpdate(self.gbp.pk, self.gbp.versionNo, languageKey='Pound')
+        self.assertEqual(versionNo, self.gbp.versionNo + 1)
+        self.gbp.refresh_from_db()
+        self.assertEqual((self.gbp.languageKey, self.gbp.versionNo), ('Pound', versionNo))
+
+    def testCasUpdateConflict(self):
+        staleVersionNo = self.gbp.versionNo
+        Currency.objects.filter(pk=self.gbp.pk).update(languageKey='Sterling', versionNo=F('versionNo') + 1)
+        with self.assertRaises(VersionConflict) as raised:
+            Currency.objects.casUpdate(self.gbp.pk, staleVersionNo, languageKey='Pound')
+        self.assertEqual(raised.exception.conflicts, {self.gbp.pk: (staleVersionNo, staleVersionNo + 1)})
+        self.assertEqual(Currency.objects.get(pk=self.gbp.pk).languageKey, 'Sterling')
+
+    def testCasUpdateManyReportsConflicts(self):
+        staleVersionNo = self.eur.versionNo
+        Currency.objects.filter(pk=self.eur.pk).update(languageKey='Euro', versionNo=F('versionNo') + 1)
+        result = Currency.objects.casUpdateMany([
+            (self.gbp.pk, self.gbp.versionNo, {'languageKey': 'Pound'}),
+            (self.eur.pk, staleVersionNo, {'languageKey': 'Euros'}),
+        ])
+        self.assertEqual(list(result.updated), [self.gbp.pk])
+        self.assertEqual(list(result.conflicts), [self.eur.pk])
+        self.assertEqual(Currency.objects.get(pk=self.gbp.pk).languageKey, 'Pound')
+        self.assertEqual(Currency.objects.get(pk=self.eur.pk).languageKey, 'Euro')
+        with self.assertRaises(VersionConflict):
+            result.raiseForConflicts()
+
+    def testCasUpdateManyMissingRow(self):
+        result = Currency.objects.casUpdateMany([(0, 1, {'languageKey': 'None'})])
+        self.assertEqual(result.conflicts, {0: (1, None)})
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Currency.objects.bulk_create([
+            Currency(internalKey=key, languageKey=key, isoCode=key) for key in ('AAA', 'BBB', 'BBB', 'CCC', 'DDD')
+        ])
+
+    def testPagesCoverEveryRowOnce(self):
+        queryset = Currency.objects.values('isoCode', 'id')
+        rows = []
+        cursor = None
+        while True:
+            page = keysetPaginate(queryset, ['isoCode', 'id'], cursor, limit=2, descending=False)
+            rows.extend(page.rows)
+            cursor = page.nextCursor
+            if cursor is None:
+                break
+        self.assertEqual(rows, list(queryset.order_by('isoCode', 'id')))
+
+    def testDescending(self):
+        queryset = Currency.objects.values('isoCode', 'id')
+        page = keysetPaginate(queryset, ['isoCode', 'id'], limit=3)
+        following = keysetPaginate(queryset, ['isoCode', 'id'], page.nextCursor, limit=3)
+        self.assertEqual(page.rows + following.rows, list(queryset.order_by('-isoCode', '-id')))
+        self.assertIsNone(following.nextCursor)
+
+    def testIterKeyset(self):
+        queryset = Currency.objects.values('isoCode', 'id')
+        rows = list(iterKeyset(queryset, ['isoCode', 'id'], chunkSize=2))
+        self.assertEqual(rows, list(queryset.order_by('isoCode', 'id')))
+
+    def testMalformedCursor(self):
+        with self.assertRaises(InvalidCursor):
+            keysetPaginate(Currency.objects.values('isoCode', 'id'), ['isoCode', 'id'], 'not-a-cursor')
+
+
+class FingerprintTests(TestCase):
+
+    def testInListsCollapse(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'), fingerprint('SELECT * FROM t WHERE id IN (%s)')
+        )
+
+    def testWhitespaceCollapses(self):
+        self.assertEqual(fingerprint('SELECT  *\n FROM t '), 'SELECT * FROM t')
+
+    def testDifferentQueriesDiffer(self):
+        self.assertNotEqual(fingerprint('SELECT a FROM t'), fingerprint('SELECT b FROM t'))
+
+    def testBulkInsertRowsCollapse(self):
+        self.assertEqual(
+            fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s) RETURNING id'),
+            'INSERT INTO t (a, b) VALUES (...) RETURNING id',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO t (a, b) SELECT %s, %s UNION ALL SELECT %s, %s UNION ALL SELECT %s, %s'),
+            'INSERT INTO t (a, b) SELECT ... UNION ALL ...',
+        )
+
+    def testLoggedSqlIsCapped(self):
+        recorder = QueryRecorder()
+        sql = 'SELECT {} FROM t'.format(', '.join('c{}'.format(i) for i in range(200)))
+        recorder.fingerprints[fingerprint(sql)] = 3
+        (logged, count), = recorder.asDict()['duplicates'].items()
+        self.assertEqual((len(logged), count), (MAX_LOGGED_SQL_LENGTH + 3, 3))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ConditionalResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.renders = 0
+        Currency.objects.create(internalKey='GBP', languageKey='GBP', isoCode='GBP')
+
+    def render(self):
+        self.renders += 1
+        return HttpResponse('body', content_type='text/plain')
+
+    def get(self, **headers):
+        signatures = [versionSignature(Currency.objects.all())]
+        return conditionalResponse(self.factory.get('/tests/conditional/', **headers), signatures, self.render)
+
+    def testNotModified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        notModified = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(notModified.status_code, 304)
+        self.assertEqual(notModified['ETag'], response['ETag'])
+        self.assertEqual(self.renders, 1)
+
+    def testUpdateChangesEtag(self):
+        etag = self.get()['ETag']
+        Currency.objects.update(languageKey=F('isoCode'))
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.renders, 2)
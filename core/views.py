@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from core.instrumentation import registry
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
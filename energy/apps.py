@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class EnergyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'energy'
+
+    def ready(self):
+        from core.refdata import referenceData
+        from energy.models import IconTbl, UtilityMarket
+
+        referenceData.register(IconTbl, keyFields=('name',))
+        referenceData.register(UtilityMarket)
@@ -0,0 +1,381 @@
+import datetime
+import heapq
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from numpy.lib.format import open_memmap
+
+from core.files import chunked
+from energy.models import ArchivedReadingMonth, MeterReading
+
+COLUMNS = ('meterPointIds', 'offsets', 'times', 'values', 'estimated')
+ROW_COLUMNS = ('times', 'values', 'estimated')
+CONVERT_CHUNK_SIZE = 1000000
+DEFAULT_CHUNK_SIZE = 10000
+DELETE_BATCH_SIZE = 500
+MICROSECOND = datetime.timedelta(microseconds=1)
+MICROSECONDS_PER_SECOND = 1000000
+
+
+def addMonths(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def monthStart(month):
+    return timezone.make_aware(datetime.datetime(month.year, month.month, 1))
+
+
+def monthOf(dttm):
+    return timezone.localtime(dttm).date().replace(day=1)
+
+
+def getArchiveCutoff(now=None):
+    # First month that is still open; everything before it may be archived.
+    return addMonths(monthOf(now or timezone.now()), -settings.METER_READING_ARCHIVE_AFTER_MONTHS)
+
+
+class ArchiveSegment:
+    """
+    One archived month as memory-mapped .npy columns sorted by (meterPointId, time). The readings of
+    meterPointIds[i] are rows offsets[i]:offsets[i + 1]. Times are stored relative to the start of the month, as
+    uint32 seconds, or int64 microseconds when the month has sub-second readings.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        meta = json.loads((self.path / 'meta.json').read_text())
+        self.month = datetime.date.fromisoformat(meta['month'])
+        self.unit = MICROSECOND if meta['unit'] == 'us' else datetime.timedelta(seconds=1)
+        self.readingCount = meta['readingCount']
+        self.start = monthStart(self.month)
+        for column in COLUMNS:
+            setattr(self, column, np.load(self.path / '{}.npy'.format(column), mmap_mode='r'))
+        # Row columns are sized before the month is read and may have unused space at the end.
+        for column in ROW_COLUMNS:
+            setattr(self, column, getattr(self, column)[:self.readingCount])
+
+    def toOffset(self, dttm, roundUp=False):
+        if roundUp:
+            return -((self.start - dttm) // self.unit)
+        return (dttm - self.start) // self.unit
+
+    def toEpoch(self, times):
+        return self.start.timestamp() + times.astype(np.float64) * self.unit.total_seconds()
+
+    def toDttm(self, time):
+        return self.start + int(time) * self.unit
+
+    def runs(self, meterPointIds):
+        # (meter point ids present in the segment, first row, end row) for the requested ids.
+        wanted = np.unique(np.asarray(list(meterPointIds), dtype=np.int64))
+        positions = np.searchsorted(self.meterPointIds, wanted)
+        found = positions < len(self.meterPointIds)
+        found[found] = self.meterPointIds[positions[found]] == wanted[found]
+        positions = positions[found]
+        return wanted[found], np.asarray(self.offsets[positions]), np.asarray(self.offsets[positions + 1])
+
+    def timeMask(self, times, fromDttm, toDttm):
+        mask = np.ones(len(times), dtype=bool)
+        if fromDttm is not None:
+            mask &= times >= self.toOffset(fromDttm, roundUp=True)
+        if toDttm is not None:
+            mask &= times <= self.toOffset(toDttm)
+        return mask
+
+    def rows(self, meterPointId, fromDttm=None, toDttm=None):
+        ids, starts, ends = self.runs([meterPointId])
+        if not len(ids):
+            return
+        times = self.times[starts[0]:ends[0]]
+        for i in np.flatnonzero(self.timeMask(times, fromDttm, toDttm)) + starts[0]:
+            yield meterPointId, self.toDttm(self.times[i]), float(self.values[i]), bool(self.estimated[i])
+
+    def rowIndex(self, meterPointIds):
+        # (meter point id of each row, row positions) for every row of the given meter points, in segment order.
+        ids, starts, ends = self.runs(meterPointIds)
+        lengths = ends - starts
+        index = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.repeat(ids, lengths), index
+
+    def arrays(self, meterPointIds, fromDttm=None, toDttm=None):
+        # (meterPointIds, epoch seconds, values) for every archived reading of the given meter points.
+        ids, index = self.rowIndex(meterPointIds)
+        times = self.times[index]
+        mask = self.timeMask(times, fromDttm, toDttm)
+        return ids[mask], self.toEpoch(times[mask]), np.asarray(self.values[index][mask])
+
+    def select(self, meterPointIds):
+        # (meterPointIds, microseconds from the month start, values, estimated) for the given meter points.
+        ids, index = self.rowIndex(meterPointIds)
+        return (
+            ids,
+            np.asarray(self.times[index], dtype=np.int64) * (self.unit // MICROSECOND),
+            np.asarray(self.values[index]),
+            np.asarray(self.estimated[index]),
+        )
+
+
+class SegmentWriter:
+    """
+    Builds a segment a chunk at a time. Row columns are filled through memory-mapped .npy files sized up front to
+    capacity rows, so memory stays flat however large the month is; only the meter point ids and their row counts
+    are held in memory. Chunks must arrive sorted by (meterPointId, time), each after the meter points before it.
+    """
+
+    def __init__(self, directory, month, capacity):
+        self.month = month
+        self.name = '{:%Y-%m}.{}'.format(month, uuid.uuid4().hex[:12])
+        self.directory = Path(directory)
+        self.temporary = self.directory / '.{}'.format(self.name)
+        self.temporary.mkdir(parents=True)
+        self.capacity = capacity
+        self.rowCount = 0
+        self.wholeSeconds = True
+        self.meterPointIds = []
+        self.counts = []
+        self.columns = {
+            column: open_memmap(self.temporary / '{}.npy'.format(column), mode='w+', dtype=dtype, shape=(capacity,))
+            for column, dtype in (('times', np.int64), ('values', np.float64), ('estimated', bool))
+        }
+
+    def append(self, meterPointIds, microseconds, values, estimated):
+        end = self.rowCount + len(values)
+        if end > self.capacity:
+            raise ValueError('{:%Y-%m} gained readings while it was being archived'.format(self.month))
+        self.columns['times'][self.rowCount:end] = microseconds
+        self.columns['values'][self.rowCount:end] = values
+        self.columns['estimated'][self.rowCount:end] = estimated
+        self.wholeSeconds = self.wholeSeconds and bool(np.all(microseconds % MICROSECONDS_PER_SECOND == 0))
+        ids, counts = np.unique(meterPointIds, return_counts=True)
+        self.meterPointIds.append(ids)
+        self.counts.append(counts)
+        self.rowCount = end
+
+    def finish(self):
+        # Written under a hidden name and renamed into place, so a half-written segment is never opened.
+        for column in self.columns.values():
+            column.flush()
+        unit = 's' if self.wholeSeconds else 'us'
+        if unit == 's':
+            seconds = open_memmap(self.temporary / '.times.npy', mode='w+', dtype=np.uint32, shape=(self.capacity,))
+            for start in range(0, self.rowCount, CONVERT_CHUNK_SIZE):
+                end = min(start + CONVERT_CHUNK_SIZE, self.rowCount)
+                seconds[start:end] = self.columns['times'][start:end] // MICROSECONDS_PER_SECOND
+            seconds.flush()
+            del seconds
+        self.columns.clear()
+        if unit == 's':
+            os.replace(self.temporary / '.times.npy', self.temporary / 'times.npy')
+
+        ids = np.concatenate(self.meterPointIds) if self.meterPointIds else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate(self.counts) if self.counts else np.zeros(0, dtype=np.int64)
+        np.save(self.temporary / 'meterPointIds.npy', ids.astype(np.int64))
+        np.save(self.temporary / 'offsets.npy', np.append(0, np.cumsum(counts)).astype(np.int64))
+        (self.temporary / 'meta.json').write_text(json.dumps({
+            'month': self.month.isoformat(), 'unit': unit, 'readingCount': self.rowCount, 'meterPointCount': len(ids),
+        }))
+        self.temporary.rename(self.directory / self.name)
+        return self.name
+
+    def discard(self):
+        self.columns.clear()
+        shutil.rmtree(self.temporary, ignore_errors=True)
+
+
+class ReadingArchive:
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.segments = {}
+
+    def open(self, name):
+        # Segments are never modified after they are written, so an opened one is kept for the process.
+        if name not in self.segments:
+            self.segments[name] = ArchiveSegment(self.directory / name)
+        return self.segments[name]
+
+    def writer(self, month, capacity):
+        return SegmentWriter(self.directory, month, capacity)
+
+    def remove(self, name):
+        self.segments.pop(name, None)
+        shutil.rmtree(self.directory / name, ignore_errors=True)
+
+
+archives = {}
+
+
+def getReadingArchive():
+    directory = Path(settings.METER_READING_ARCHIVE_DIR)
+    if directory not in archives:
+        archives[directory] = ReadingArchive(directory)
+    return archives[directory]
+
+
+def getArchivedSegments(fromDttm=None, toDttm=None, archive=None):
+    archive = archive or getReadingArchive()
+    months = ArchivedReadingMonth.objects.order_by('month')
+    if fromDttm is not None:
+        months = months.filter(month__gte=monthOf(fromDttm))
+    if toDttm is not None:
+        months = months.filter(month__lte=monthOf(toDttm))
+    return [archive.open(segment) for segment in months.values_list('segment', flat=True)]
+
+
+def liveReadings(meterPointIds, fromDttm=None, toDttm=None, now=None):
+    readings = MeterReading.objects.asOf(now or timezone.now()).filter(meterPoint_id__in=meterPointIds)
+    if fromDttm is not None:
+        readings = readings.filter(fromDttm__gte=fromDttm)
+    if toDttm is not None:
+        readings = readings.filter(fromDttm__lte=toDttm)
+    return readings
+
+
+def iterReadings(meterPointIds, fromDttm=None, toDttm=None, now=None):
+    """
+    Current readings of the given meter points from the table and the archive, as (meterPointId, fromDttm, value,
+    estimated) sorted by meter point then time. fromDttm and toDttm are inclusive bounds on the reading time.
+    """
+    segments = getArchivedSegments(fromDttm, toDttm)
+
+    def archived():
+        for meterPointId in sorted(set(meterPointIds)):
+            for segment in segments:
+                yield from segment.rows(meterPointId, fromDttm, toDttm)
+
+    live = liveReadings(meterPointIds, fromDttm, toDttm, now).order_by('meterPoint_id', 'fromDttm', 'id').values_list(
+        'meterPoint_id', 'fromDttm', 'value', 'estimated'
+    )
+    # On equal times archived rows come first; they were written before anything still in the table.
+    return heapq.merge(archived(), live.iterator(), key=lambda row: (row[0], row[1]))
+
+
+def getReadingArrays(meterPointIds, fromDttm=None, toDttm=None, now=None):
+    # (meterPointIds, epoch seconds, values) arrays over the table and the archive, in no particular order.
+    rows = list(liveReadings(meterPointIds, fromDttm, toDttm, now).values_list('meterPoint_id', 'fromDttm', 'value'))
+    parts = [(
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([row[1].timestamp() for row in rows], dtype=np.float64),
+        np.array([row[2] for row in rows], dtype=np.float64),
+    )]
+    parts.extend(segment.arrays(meterPointIds, fromDttm, toDttm) for segment in getArchivedSegments(fromDttm, toDttm))
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+class ArchiveResult:
+
+    def __init__(self, month):
+        self.month = month
+        self.segment = None
+        self.meterPoints = 0
+        self.readingsArchived = 0
+        self.readingsKept = 0
+
+
+def archiveMonth(month, archive=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    """
+    Moves a closed month's current readings into an archive segment and deletes them from the table. Each meter
+    point's last reading of the month stays in the table, so "latest reading before T" lookups in billing, rollups
+    and estimates still find their opening value without reading the archive. Superseded and soft deleted rows are
+    not archived and stay in the table. Run again on an archived month, late readings are folded into a replacement
+    segment. The month is streamed a chunk of meter points at a time, so memory does not grow with its size.
+    """
+    archive = archive or getReadingArchive()
+    month = month.replace(day=1)
+    if month >= getArchiveCutoff():
+        raise ValueError('{:%Y-%m} is not closed yet'.format(month))
+    fromDttm, toDttm = monthStart(month), monthStart(addMonths(month, 1))
+    now = timezone.now()
+    result = ArchiveResult(month)
+    existing = ArchivedReadingMonth.objects.filter(month=month).first()
+    existingSegment = archive.open(existing.segment) if existing else None
+    result.segment = existing.segment if existing else None
+
+    # Readings inserted while the month is archived are left for the next run.
+    lastId = MeterReading.allWithDeleted.order_by('-id').values_list('id', flat=True).first() or 0
+    live = MeterReading.objects.asOf(now).filter(fromDttm__gte=fromDttm, fromDttm__lt=toDttm, id__lte=lastId)
+    meterPointIds = list(live.order_by('meterPoint_id').values_list('meterPoint_id', flat=True).distinct())
+    movable = live.count() - len(meterPointIds)
+    if movable <= 0:
+        return result
+    if existingSegment is not None:
+        meterPointIds = sorted(set(meterPointIds).union(existingSegment.meterPointIds.tolist()))
+
+    writer = archive.writer(month, movable + (existingSegment.readingCount if existingSegment else 0))
+    # The ids of archived rows go to disk too, and are deleted from there once the segment is in place.
+    idsPath = archive.directory / '.{}.ids.npy'.format(writer.name)
+    archivedIds = open_memmap(idsPath, mode='w+', dtype=np.int64, shape=(movable,))
+    try:
+        for chunk in chunked(meterPointIds, chunkSize):
+            rows = list(live.filter(meterPoint_id__gte=chunk[0], meterPoint_id__lte=chunk[-1]).order_by(
+                'meterPoint_id', 'fromDttm', 'id'
+            ).values_list('id', 'meterPoint_id', 'fromDttm', 'value', 'estimated').iterator())
+            chunkMeterPointIds = np.array([row[1] for row in rows], dtype=np.int64)
+            isLast = np.append(chunkMeterPointIds[1:] != chunkMeterPointIds[:-1], True) if rows else np.zeros(0, bool)
+            moved = ~isLast
+            ids = np.array([row[0] for row in rows], dtype=np.int64)[moved]
+            if result.readingsArchived + len(ids) > movable:
+                raise ValueError('{:%Y-%m} gained readings while it was being archived'.format(month))
+            archivedIds[result.readingsArchived:result.readingsArchived + len(ids)] = ids
+            result.readingsArchived += len(ids)
+            result.readingsKept += int(isLast.sum())
+
+            parts = [existingSegment.select(chunk)] if existingSegment is not None else []
+            parts.append((
+                chunkMeterPointIds[moved],
+                np.array([(row[2] - fromDttm) // MICROSECOND for row in rows], dtype=np.int64)[moved],
+                np.array([row[3] for row in rows], dtype=np.float64)[moved],
+                np.array([row[4] for row in rows], dtype=bool)[moved],
+            ))
+            chunkIds, microseconds, values, estimated = (np.concatenate(column) for column in zip(*parts))
+            # Stable, so existing archived rows stay ahead of newly archived ones at the same time.
+            order = np.lexsort((microseconds, chunkIds))
+            writer.append(chunkIds[order], microseconds[order], values[order], estimated[order])
+        archivedIds.flush()
+        result.segment = writer.finish()
+    except Exception:
+        writer.discard()
+        idsPath.unlink(missing_ok=True)
+        raise
+
+    result.meterPoints = sum(len(ids) for ids in writer.meterPointIds)
+    try:
+        with transaction.atomic():
+            # Only rows written to the segment are deleted.
+            for start in range(0, result.readingsArchived, DELETE_BATCH_SIZE):
+                batch = archivedIds[start:min(start + DELETE_BATCH_SIZE, result.readingsArchived)].tolist()
+                MeterReading.allWithDeleted.filter(id__in=batch).delete()
+            ArchivedReadingMonth.objects.update_or_create(month=month, defaults={
+                'segment': result.segment, 'readingCount': writer.rowCount, 'meterPointCount': result.meterPoints,
+            })
+    except Exception:
+        archive.remove(result.segment)
+        raise
+    finally:
+        idsPath.unlink(missing_ok=True)
+    if existing:
+        transaction.on_commit(lambda: archive.remove(existing.segment))
+    return result
+
+
+def getArchivableMonths(now=None):
+    cutoff = getArchiveCutoff(now)
+    return list(MeterReading.allWithDeleted.filter(fromDttm__lt=monthStart(cutoff)).dates('fromDttm', 'month'))
+
+
+def archiveClosedMonths(archive=None, chunkSize=DEFAULT_CHUNK_SIZE, onMonth=None):
+    results = []
+    for month in getArchivableMonths():
+        result = archiveMonth(month, archive, chunkSize)
+        results.append(result)
+        if onMonth is not None:
+            onMonth(result)
+    return results
@@ -0,0 +1,287 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import CustomerAccount
+from core.references import allocator
+from energy.archive import iterReadings
+from energy.models import Bill, BillPeriod, MeterPoint, MeterReading
+from payment.charges import getChargeTimelines, priceInterval, priceReadings
+from payment.ledger import postBills
+
+DEFAULT_CHUNK_SIZE = 2000
+PENNY = Decimal('0.01')
+
+
+class BillGenerationResult:
+
+    def __init__(self):
+        self.accountsProcessed = 0
+        self.billsCreated = 0
+        self.alreadyBilled = 0
+        self.missingCharges = []
+
+    def merge(self, other):
+        self.accountsProcessed += other.accountsProcessed
+        self.billsCreated += other.billsCreated
+        self.alreadyBilled += other.alreadyBilled
+        self.missingCharges.extend(other.missingCharges)
+        return self
+
+
+def toMoney(value):
+    return value.quantize(PENNY, rounding=ROUND_HALF_UP)
+
+
+def getBillableAccounts(billingCycle, fromDttm, toDttm):
+    return CustomerAccount.objects.filter(billingCycle=billingCycle).overlapping(fromDttm, toDttm).order_by('id')
+
+
+def liveReadingValueAt(dttm, field='value'):
+    # Latest current register value (or another field of that reading) for OuterRef('pk') taken at or before dttm.
+    return Subquery(
+        MeterReading.objects.asOf(timezone.now()).filter(
+            meterPoint=OuterRef('pk'), fromDttm__lte=dttm
+        ).order_by('-fromDttm', '-id').values(field)[:1]
+    )
+
+
+def firstLiveReadingValueAfter(dttm, toDttm, field='value'):
+    # Earliest current reading for OuterRef('pk') taken after dttm, up to toDttm.
+    return Subquery(
+        MeterReading.objects.asOf(timezone.now()).filter(
+            meterPoint=OuterRef('pk'), fromDttm__gt=dttm, fromDttm__lte=toDttm
+        ).order_by('fromDttm', 'id').values(field)[:1]
+    )
+
+
+def annotateWindowReadings(meterPoints, fromDttm, toDttm):
+    """
+    Adds the opening and closing reading of a billing window to a MeterPoint queryset. The opening is the latest
+    reading at or before fromDttm or, for a meter first read inside the window, its first reading there; the
+    register is never assumed to have started from zero.
+    """
+    return meterPoints.annotate(
+        openingValue=Coalesce(liveReadingValueAt(fromDttm), firstLiveReadingValueAfter(fromDttm, toDttm)),
+        openingDttm=Coalesce(
+            liveReadingValueAt(fromDttm, 'fromDttm'), firstLiveReadingValueAfter(fromDttm, toDttm, 'fromDttm')
+        ),
+        closingValue=liveReadingValueAt(toDttm),
+        closingDttm=liveReadingValueAt(toDttm, 'fromDttm'),
+    )
+
+
+def windowConsumption(openingValue, closingValue):
+    # None when the meter has no reading in or before the window; negative deltas (rollover, bad reads) are not charged.
+    if openingValue is None or closingValue is None:
+        return None
+    return max(Decimal(str(closingValue)) - Decimal(str(openingValue)), Decimal(0))
+
+
+def getWindowReadings(accountIds, fromDttm, toDttm):
+    """
+    {accountId: {meterPointId: [(dttm, value), ...]}} holding each meter point's opening reading of the window (as in
+    annotateWindowReadings) followed by its current readings up to toDttm, in time order. Two queries for the list.
+    """
+    meterPoints = MeterPoint.objects.filter(customerAccount_id__in=accountIds)
+    openings = meterPoints.annotate(
+        openingValue=Coalesce(liveReadingValueAt(fromDttm), firstLiveReadingValueAfter(fromDttm, toDttm)),
+        openingDttm=Coalesce(
+            liveReadingValueAt(fromDttm, 'fromDttm'), firstLiveReadingValueAfter(fromDttm, toDttm, 'fromDttm')
+        ),
+    ).filter(openingDttm__isnull=False).values_list('id', 'customerAccount_id', 'openingDttm', 'openingValue')
+
+    readings = defaultdict(dict)
+    byMeterPoint = {}
+    for meterPointId, accountId, openingDttm, openingValue in openings:
+        byMeterPoint[meterPointId] = readings[accountId][meterPointId] = [(openingDttm, openingValue)]
+
+    rows = MeterReading.objects.asOf(timezone.now()).filter(
+        meterPoint__in=meterPoints, fromDttm__gt=fromDttm, fromDttm__lte=toDttm
+    ).order_by('meterPoint_id', 'fromDttm', 'id').values_list('meterPoint_id', 'fromDttm', 'value')
+    for meterPointId, dttm, value in rows.iterator():
+        meterReadings = byMeterPoint[meterPointId]
+        if dttm < meterReadings[-1][0]:
+            continue
+        if dttm == meterReadings[-1][0]:
+            # The latest id wins between readings taken at the same time, as in liveReadingValueAt.
+            meterReadings[-1] = (dttm, value)
+        else:
+            meterReadings.append((dttm, value))
+    return readings
+
+
+def priceMeterReadings(meterPointIds, fromDttm=None, toDttm=None):
+    """
+    {meterPointId: [PricedInterval, ...]} for every interval between consecutive readings in the range, archived
+    months included, against each account's charge timeline with splits at tariff changes.
+    """
+    accounts = dict(MeterPoint.allWithDeleted.filter(id__in=meterPointIds).values_list('id', 'customerAccount_id'))
+    timelines = getChargeTimelines(accounts.values())
+    readings = defaultdict(list)
+    for meterPointId, dttm, value, _ in iterReadings(meterPointIds, fromDttm, toDttm):
+        readings[meterPointId].append((dttm, value))
+    return {
+        meterPointId: priceReadings(timelines[accounts[meterPointId]], rows) for meterPointId, rows in readings.items()
+    }
+
+
+def hasCharges(timeline, fromDttm, toDttm):
+    return any(charge is not None for _, _, charge in timeline.pieces(fromDttm, toDttm))
+
+
+def priceWindow(timeline, meterReadings, fromDttm, toDttm):
+    """
+    Net (unitAmount, standingAmount) of one account for a billing window. Units between consecutive readings are
+    charged at the unit rates in force over that interval, and the standing charge accrues for each part of the
+    window at the rate in force there, so a tariff change inside the window is prorated.
+    """
+    unitAmount = sum(
+        (priced.unitAmount for rows in meterReadings.values() for priced in priceReadings(timeline, rows)),
+        Decimal(0),
+    )
+    return unitAmount, priceInterval(timeline, fromDttm, toDttm, Decimal(0)).standingAmount
+
+
+def getOrCreateBillPeriods(accountIds, fromDttm, toDttm):
+    def existing():
+        return dict(
+            BillPeriod.objects.filter(
+                customerAccount_id__in=accountIds, fromDttm=fromDttm, toDttm=toDttm
+            ).values_list('customerAccount_id', 'id')
+        )
+
+    periods = existing()
+    missing = [accountId for accountId in accountIds if accountId not in periods]
+    if missing:
+        BillPeriod.objects.bulk_create(
+            [BillPeriod(customerAccount_id=accountId, fromDttm=fromDttm, toDttm=toDttm) for accountId in missing]
+        )
+        periods = existing()
+    return periods
+
+
+def calculateBillAmounts(unitAmount, standingAmount, salesTaxExempt, salesTaxRate):
+    netAmount = toMoney(unitAmount + standingAmount)
+    salesTaxAmount = Decimal('0.00') if salesTaxExempt else toMoney(netAmount * salesTaxRate)
+    return netAmount, salesTaxAmount, netAmount + salesTaxAmount
+
+
+def generateBillsForAccounts(accounts, fromDttm, toDttm, createdUser=None):
+    # accounts is a list of (id, currency_id, salesTaxExempt); every lookup below is one query for the whole list.
+    result = BillGenerationResult()
+    accountIds = [account[0] for account in accounts]
+    result.accountsProcessed = len(accountIds)
+
+    billed = set(
+        Bill.objects.filter(
+            customerAccount_id__in=accountIds, billedFromDttm=fromDttm, billedToDttm=toDttm
+        ).values_list('customerAccount_id', flat=True)
+    )
+    result.alreadyBilled = len(billed)
+
+    accounts = [account for account in accounts if account[0] not in billed]
+    if not accounts:
+        return result
+
+    accountIds = [account[0] for account in accounts]
+    timelines = getChargeTimelines(accountIds)
+
+    salesTaxRate = Decimal(settings.SALES_TAX_RATE)
+    issueDt = datetime.date.today()
+    dueDt = issueDt + datetime.timedelta(days=settings.BILL_PAYMENT_TERMS_DAYS)
+    description = 'Energy bill for {:%d %b %Y} to {:%d %b %Y}'.format(fromDttm, toDttm)
+
+    result.missingCharges = [
+        account[0] for account in accounts if not hasCharges(timelines[account[0]], fromDttm, toDttm)
+    ]
+    missing = set(result.missingCharges)
+    accounts = [account for account in accounts if account[0] not in missing]
+    if not accounts:
+        return result
+    readings = getWindowReadings([account[0] for account in accounts], fromDttm, toDttm)
+
+    # Claimed outside the transaction in one round trip instead of one allocation per Bill.
+    billNumbers = allocator.take(Bill._meta.get_field('number').default.name, len(accounts))
+
+    with transaction.atomic():
+        billPeriods = getOrCreateBillPeriods([account[0] for account in accounts], fromDttm, toDttm)
+
+        bills = []
+        for (accountId, currencyId, salesTaxExempt), number in zip(accounts, billNumbers):
+            unitAmount, standingAmount = priceWindow(timelines[accountId], readings[accountId], fromDttm, toDttm)
+            netAmount, salesTaxAmount, grossAmount = calculateBillAmounts(
+                unitAmount, standingAmount, salesTaxExempt, salesTaxRate
+            )
+            bills.append(
+                Bill(
+                    customerAccount_id=accountId,
+                    billPeriod_id=billPeriods[accountId],
+                    billedFromDttm=fromDttm,
+                    billedToDttm=toDttm,
+                    number=number,
+                    description=description,
+                    versionNumber=1,
+                    createdUser=createdUser,
+                    issueDt=issueDt,
+                    dueDt=dueDt,
+                    netAmount=netAmount,
+                    grossAmount=grossAmount,
+                    currency_id=currencyId,
+                    salesTaxAmount=salesTaxAmount,
+                )
+            )
+
+        Bill.objects.bulk_create(bills)
+
+    result.billsCreated = len(bills)
+    return result
+
+
+def generateBills(billingCycle, fromDttm, toDttm, createdUser=None, accounts=None, chunkSize=DEFAULT_CHUNK_SIZE,
+                  onChunk=None):
+    if accounts is None:
+        accounts = getBillableAccounts(billingCycle, fromDttm, toDttm)
+
+    result = BillGenerationResult()
+    accounts = accounts.values_list('id', 'currency_id', 'salesTaxExempt').order_by('id')
+    lastId = None
+    while True:
+        # Keyset pagination keeps each chunk query cheap and does not hold a cursor open across writes.
+        page = accounts if lastId is None else accounts.filter(id__gt=lastId)
+        chunk = list(page[:chunkSize])
+        if not chunk:
+            return result
+        chunkResult = generateBillsForAccounts(chunk, fromDttm, toDttm, createdUser)
+        result.merge(chunkResult)
+        lastId = chunk[-1][0]
+        if onChunk is not None:
+            onChunk(lastId, chunkResult)
+
+
+def acceptBills(billIds, acceptedDttm=None):
+    """
+    Accepting a bill is what posts it to the customer's ledger; bills already accepted are left alone. Bills are
+    accepted by compare-and-swap on versionNo instead of being locked up front, so concurrent acceptors and other
+    writers do not queue on each other. Bills that changed underneath are re-read and retried; one that another
+    acceptor got to first is then skipped.
+    """
+    acceptedDttm = acceptedDttm or timezone.now()
+    fields = {'status': Bill.Status.ACCEPTED, 'acceptedDttm': acceptedDttm}
+    accepted = []
+    with transaction.atomic():
+        while billIds:
+            versions = Bill.objects.filter(id__in=billIds).exclude(status=Bill.Status.ACCEPTED).values_list(
+                'id', 'versionNo'
+            )
+            result = Bill.objects.casUpdateMany([(billId, versionNo, fields) for billId, versionNo in versions])
+            accepted.extend(result.updated)
+            billIds = list(result.conflicts)
+        postBills(accepted)
+    return len(accepted)
@@ -0,0 +1,118 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from energy.billing import DEFAULT_CHUNK_SIZE, generateBills, getBillableAccounts
+from energy.models import BillRun, BillRunShard
+
+
+def splitAccountRanges(accounts, shardCount):
+    # Boundaries are taken from the actual id distribution so shards hold a similar number of accounts.
+    accountIds = accounts.order_by('id').values_list('id', flat=True)
+    total = accountIds.count()
+    if not total:
+        return []
+
+    shardCount = max(1, min(shardCount, total))
+    starts = [accountIds[total * i // shardCount] for i in range(shardCount)]
+    lastId = accountIds[total - 1]
+    return [
+        (start, starts[i + 1] - 1 if i + 1 < shardCount else lastId)
+        for i, start in enumerate(starts)
+    ]
+
+
+def getOrCreateBillRun(billingCycle, fromDttm, toDttm, shardCount):
+    # An unfinished run for the same cycle and period is resumed rather than started again.
+    billRun = BillRun.objects.filter(
+        billingCycle=billingCycle, fromDttm=fromDttm, toDttm=toDttm
+    ).exclude(status=BillRun.Status.COMPLETED).order_by('-id').first()
+    if billRun is not None:
+        return billRun
+
+    billRun = BillRun.objects.create(billingCycle=billingCycle, fromDttm=fromDttm, toDttm=toDttm)
+    accounts = getBillableAccounts(billingCycle, fromDttm, toDttm)
+    BillRunShard.objects.bulk_create([
+        BillRunShard(billRun=billRun, fromAccountId=fromAccountId, toAccountId=toAccountId, orderNo=orderNo)
+        for orderNo, (fromAccountId, toAccountId) in enumerate(splitAccountRanges(accounts, shardCount), start=1)
+    ])
+    return billRun
+
+
+def initWorker():
+    if not apps.ready:
+        django.setup()
+    # Never share a connection inherited from the parent process.
+    for connection in connections.all():
+        connection.connection = None
+
+
+def runShard(shardId, createdUserId=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    shard = BillRunShard.objects.select_related('billRun__billingCycle').get(pk=shardId)
+    billRun = shard.billRun
+    createdUser = None if createdUserId is None else User.objects.get(pk=createdUserId)
+
+    BillRunShard.objects.filter(pk=shard.pk).update(status=BillRunShard.Status.RUNNING, startedDttm=timezone.now())
+
+    accounts = getBillableAccounts(billRun.billingCycle, billRun.fromDttm, billRun.toDttm).filter(
+        id__gte=shard.fromAccountId, id__lte=shard.toAccountId
+    )
+    if shard.lastAccountId is not None:
+        accounts = accounts.filter(id__gt=shard.lastAccountId)
+
+    def checkpoint(lastAccountId, chunkResult):
+        BillRunShard.objects.filter(pk=shard.pk).update(
+            lastAccountId=lastAccountId, billsCreated=F('billsCreated') + chunkResult.billsCreated
+        )
+
+    try:
+        result = generateBills(
+            billRun.billingCycle, billRun.fromDttm, billRun.toDttm, createdUser, accounts, chunkSize, checkpoint
+        )
+    except Exception as e:
+        BillRunShard.objects.filter(pk=shard.pk).update(status=BillRunShard.Status.FAILED, error=repr(e))
+        raise
+
+    BillRunShard.objects.filter(pk=shard.pk).update(
+        status=BillRunShard.Status.COMPLETED, completedDttm=timezone.now(), error=None
+    )
+    return shard.pk, result.billsCreated, result.missingCharges
+
+
+def runBillRun(billRun, workers=1, createdUserId=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    shardIds = list(
+        billRun.shards.exclude(status=BillRunShard.Status.COMPLETED).values_list('id', flat=True)
+    )
+    BillRun.objects.filter(pk=billRun.pk).update(status=BillRun.Status.RUNNING)
+
+    failures = []
+    missingCharges = []
+    if workers > 1 and len(shardIds) > 1:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=initWorker) as executor:
+            futures = {
+                executor.submit(runShard, shardId, createdUserId, chunkSize): shardId for shardId in shardIds
+            }
+            for future in as_completed(futures):
+                try:
+                    missingCharges.extend(future.result()[2])
+                except Exception as e:
+                    failures.append((futures[future], e))
+    else:
+        for shardId in shardIds:
+            try:
+                missingCharges.extend(runShard(shardId, createdUserId, chunkSize)[2])
+            except Exception as e:
+                failures.append((shardId, e))
+
+    status = BillRun.Status.FAILED if failures else BillRun.Status.COMPLETED
+    BillRun.objects.filter(pk=billRun.pk).update(
+        status=status, completedDttm=None if failures else timezone.now()
+    )
+    billRun.refresh_from_db()
+    return billRun, failures, missingCharges
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Exists, F, OuterRef
+from django.template.loader import render_to_string
+
+from core.files import chunked
+from energy.billing import annotateWindowReadings, windowConsumption
+from energy.billrun import initWorker
+from energy.models import Bill, BillDocument, MeterPoint
+
+ADDRESS_FIELDS = ('address1', 'address2', 'address3', 'address4', 'address5', 'postcode')
+DEFAULT_CHUNK_SIZE = 500
+RENDER_CHUNK_SIZE = 20
+
+
+class DocumentStore:
+    """
+    Rendered documents stored once per distinct content under the sha256 of their bytes, sharded two levels deep so
+    no directory grows past a few thousand entries. Files are never modified once written.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, digest):
+        return self.directory / digest[:2] / digest[2:4] / digest
+
+    def put(self, content):
+        # Returns (digest, written); identical content is only written once. The file is renamed into place, so a
+        # reader never sees a partial document.
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.parent / '.{}.{}'.format(digest, uuid.uuid4().hex[:12])
+        with open(temporary, 'wb') as documentFile:
+            documentFile.write(content)
+            documentFile.flush()
+            os.fsync(documentFile.fileno())
+        os.replace(temporary, path)
+        return digest, True
+
+
+stores = {}
+
+
+def getDocumentStore():
+    directory = Path(settings.BILL_DOCUMENT_DIR)
+    if directory not in stores:
+        stores[directory] = DocumentStore(directory)
+    return stores[directory]
+
+
+class RenderResult:
+
+    def __init__(self):
+        self.billsRendered = 0
+        self.documentsWritten = 0
+        self.billsPending = 0
+
+
+def getPendingBillIds(billIds=None, force=False):
+    # Accepted bills whose current version has no document yet; force includes those that have one.
+    bills = Bill.objects.filter(status=Bill.Status.ACCEPTED)
+    if billIds is not None:
+        bills = bills.filter(id__in=billIds)
+    if not force:
+        bills = bills.exclude(
+            Exists(BillDocument.objects.filter(bill=OuterRef('pk'), versionNumber=OuterRef('versionNumber')))
+        )
+    return list(bills.order_by('id').values_list('id', flat=True))
+
+
+def loadMeterPoints(windows):
+    # windows maps (fromDttm, toDttm) to the account ids billed over it; one query per distinct billing window.
+    meterPoints = defaultdict(list)
+    for (fromDttm, toDttm), accountIds in windows.items():
+        rows = annotateWindowReadings(
+            MeterPoint.objects.filter(customerAccount_id__in=accountIds), fromDttm, toDttm
+        ).order_by('customerAccount_id', 'identifier').values(
+            'customerAccount_id', 'identifier', 'utilityMarket__internalKey', 'openingValue', 'openingDttm',
+            'closingValue', 'closingDttm',
+        )
+        for row in rows:
+            key = (row.pop('customerAccount_id'), fromDttm, toDttm)
+            row['utilityMarket'] = row.pop('utilityMarket__internalKey')
+            # The same units the bill run charged for.
+            row['consumption'] = windowConsumption(row['openingValue'], row['closingValue'])
+            meterPoints[key].append(row)
+    return meterPoints
+
+
+def loadBillContexts(billIds):
+    """
+    Template contexts for a batch of bills from one query for the bills with their account, address and currency,
+    and one per billing window for the meter points with their opening and closing readings. Contexts are plain
+    data, so they can be handed to worker processes. They only hold what the bill's versionNumber covers; paidAmount
+    changes without a new version, so it stays out of the stored document.
+    """
+    bills = list(Bill.objects.filter(id__in=billIds).order_by('id').values(
+        'id', 'number', 'versionNumber', 'description', 'billedFromDttm', 'billedToDttm', 'issueDt', 'dueDt',
+        'netAmount', 'salesTaxAmount', 'grossAmount', 'currency__isoCode', 'customerAccount_id',
+        'customerAccount__number', 'customerAccount__companyName',
+        *('customerAccount__address__' + field for field in ADDRESS_FIELDS),
+    ))
+    windows = defaultdict(set)
+    for bill in bills:
+        windows[(bill['billedFromDttm'], bill['billedToDttm'])].add(bill['customerAccount_id'])
+    meterPoints = loadMeterPoints(windows)
+
+    contexts = []
+    for bill in bills:
+        accountId = bill.pop('customerAccount_id')
+        address = [bill.pop('customerAccount__address__' + field) for field in ADDRESS_FIELDS]
+        account = {
+            'number': bill.pop('customerAccount__number'),
+            'companyName': bill.pop('customerAccount__companyName'),
+            'address': [line for line in address if line],
+        }
+        bill['currency'] = bill.pop('currency__isoCode')
+        contexts.append({
+            'bill': bill,
+            'account': account,
+            'meterPoints': meterPoints.get((accountId, bill['billedFromDttm'], bill['billedToDttm']), []),
+        })
+    return contexts
+
+
+def renderBillDocument(context):
+    # Runs in the worker processes: renders and stores one document, touching neither the database nor the cache.
+    content = render_to_string(settings.BILL_DOCUMENT_TEMPLATE, context).encode()
+    digest, written = getDocumentStore().put(content)
+    return context['bill']['id'], context['bill']['versionNumber'], digest, len(content), written
+
+
+def recordBillDocuments(rendered, force=False):
+    documents = [
+        BillDocument(bill_id=billId, versionNumber=versionNumber, digest=digest, size=size)
+        for billId, versionNumber, digest, size, _ in rendered
+    ]
+    BillDocument.objects.bulk_create(documents, ignore_conflicts=True)
+    if force:
+        # A re-render after a template change keeps the row but points it at the new content.
+        for document in documents:
+            BillDocument.objects.filter(bill_id=document.bill_id, versionNumber=document.versionNumber).exclude(
+                digest=document.digest
+            ).update(digest=document.digest, size=document.size)
+
+
+def renderBillDocuments(billIds=None, workers=1, chunkSize=DEFAULT_CHUNK_SIZE, force=False, onChunk=None):
+    """
+    Renders the statements of accepted bills into the document store. Bills whose current versionNumber already has
+    a document are skipped unless force is set, so a re-run only renders new and re-issued bills. Contexts are loaded
+    here a chunk at a time and rendered by a pool of worker processes.
+    """
+    result = RenderResult()
+    pendingIds = getPendingBillIds(billIds, force)
+    result.billsPending = len(pendingIds)
+    if not pendingIds:
+        return result
+
+    executor = None
+    if workers > 1:
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=initWorker)
+    try:
+        for chunk in chunked(pendingIds, chunkSize):
+            contexts = loadBillContexts(chunk)
+            if executor is not None:
+                rendered = list(executor.map(renderBillDocument, contexts, chunksize=RENDER_CHUNK_SIZE))
+            else:
+                rendered = [renderBillDocument(context) for context in contexts]
+            recordBillDocuments(rendered, force)
+            result.billsRendered += len(rendered)
+            result.documentsWritten += sum(1 for row in rendered if row[4])
+            if onChunk is not None:
+                onChunk(result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return result
+
+
+def getBillDocumentDigest(customerAccount, number):
+    # The document of the bill's current version, or None if it has not been rendered yet.
+    return BillDocument.objects.filter(
+        bill__customerAccount=customerAccount, bill__number=number, bill__status=Bill.Status.ACCEPTED,
+        bill__deleteFl=False, versionNumber=F('bill__versionNumber'),
+    ).values_list('digest', flat=True).first()
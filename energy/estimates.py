@@ -0,0 +1,267 @@
+import datetime
+
+import numpy as np
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from energy.archive import getReadingArrays
+from energy.models import MeterPoint, MeterReading
+
+SECONDS_PER_DAY = 86400.0
+SPIKE_FACTOR = 5.0
+ROLLOVER_HIGH = 0.9
+ROLLOVER_LOW = 0.1
+MIN_INTERVAL_DAYS = 1.0 / 24
+
+NEGATIVE = 1
+ROLLOVER = 2
+SPIKE = 4
+
+FLAG_NAMES = ((NEGATIVE, 'negative delta'), (ROLLOVER, 'register rollover'), (SPIKE, 'consumption spike'))
+
+
+def toEpoch(dttm):
+    return dttm.timestamp()
+
+
+def fromEpoch(seconds):
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def describeFlags(flags):
+    return ', '.join(name for flag, name in FLAG_NAMES if flags & flag)
+
+
+class ReadingSeries:
+    """
+    Readings for many meter points as parallel arrays sorted by (meterPointId, time). Everything downstream works
+    on whole arrays, with group boundaries found from where meterPointIds changes.
+    """
+
+    def __init__(self, meterPointIds, times, values, ids=None):
+        order = np.lexsort((times, meterPointIds))
+        self.meterPointIds = np.asarray(meterPointIds, dtype=np.int64)[order]
+        self.times = np.asarray(times, dtype=np.float64)[order]
+        self.values = np.asarray(values, dtype=np.float64)[order]
+        self.ids = None if ids is None else np.asarray(ids, dtype=np.int64)[order]
+        self.order = order
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def sameMeter(self):
+        # Element i is True when reading i + 1 belongs to the same meter point as reading i.
+        return self.meterPointIds[1:] == self.meterPointIds[:-1]
+
+    def groups(self):
+        # (unique meter point ids, index of the group for every reading)
+        return np.unique(self.meterPointIds, return_inverse=True)
+
+
+def loadReadingSeries(meterPointIds, fromDttm=None, toDttm=None):
+    # Archived months are included; their readings have no row id, so the series carries none.
+    return ReadingSeries(*getReadingArrays(meterPointIds, fromDttm, toDttm))
+
+
+def groupMedian(groupIndex, values, groupCount):
+    # Median of values per group in one sort, NaN for groups with no values.
+    medians = np.full(groupCount, np.nan)
+    if len(values) == 0:
+        return medians
+    order = np.lexsort((values, groupIndex))
+    sortedGroups = groupIndex[order]
+    sortedValues = values[order]
+    starts = np.searchsorted(sortedGroups, np.arange(groupCount), side='left')
+    ends = np.searchsorted(sortedGroups, np.arange(groupCount), side='right')
+    present = ends > starts
+    lower = sortedValues[np.maximum((starts + ends - 1) // 2, 0)[present]]
+    upper = sortedValues[np.maximum((starts + ends) // 2, 0)[present]]
+    medians[present] = (lower + upper) / 2
+    return medians
+
+
+def flagAnomalies(series, spikeFactor=SPIKE_FACTOR):
+    """
+    Returns a flag bitmask per reading for the interval ending at that reading: NEGATIVE when the register went
+    backwards, ROLLOVER when it went backwards from near the top of its range to near zero, SPIKE when the daily
+    rate is more than spikeFactor times the meter's median rate.
+    """
+    flags = np.zeros(len(series), dtype=np.uint8)
+    if len(series) < 2:
+        return flags
+    meterIds, groupIndex = series.groups()
+    sameMeter = series.sameMeter
+
+    deltas = np.diff(series.values)
+    days = np.maximum(np.diff(series.times) / SECONDS_PER_DAY, MIN_INTERVAL_DAYS)
+    previous = series.values[:-1]
+    current = series.values[1:]
+
+    # Register size inferred from the largest value the meter has shown, e.g. 99999 -> 100000.
+    maxValues = np.zeros(len(meterIds))
+    np.maximum.at(maxValues, groupIndex, series.values)
+    registerMax = 10 ** np.ceil(np.log10(np.maximum(maxValues, 1.0) + 1))[groupIndex[1:]]
+
+    negative = sameMeter & (deltas < 0)
+    rollover = negative & (previous >= ROLLOVER_HIGH * registerMax) & (current <= ROLLOVER_LOW * registerMax)
+    # A rollover's real consumption is what was left to the top of the register plus the new value.
+    consumption = np.where(rollover, registerMax - previous + current, deltas)
+    rates = consumption / days
+
+    valid = sameMeter & ~negative
+    medians = groupMedian(groupIndex[1:][valid], rates[valid], len(meterIds))[groupIndex[1:]]
+    spike = sameMeter & (negative == rollover) & (rates > spikeFactor * np.nan_to_num(medians, nan=np.inf))
+
+    flags[1:] |= np.where(negative & ~rollover, NEGATIVE, 0).astype(np.uint8)
+    flags[1:] |= np.where(rollover, ROLLOVER, 0).astype(np.uint8)
+    flags[1:] |= np.where(spike & (medians > 0), SPIKE, 0).astype(np.uint8)
+    return flags
+
+
+class ConsumptionProfiles:
+    """
+    Average daily consumption per meter point and calendar month, fitted from the clean intervals of a
+    ReadingSeries. Months without data fall back to the meter's overall rate, then to zero.
+    """
+
+    def __init__(self, series, flags=None):
+        flags = flagAnomalies(series) if flags is None else flags
+        self.meterPointIds, groupIndex = series.groups()
+        meterCount = len(self.meterPointIds)
+
+        clean = series.sameMeter & (flags[1:] == 0)
+        intervalGroups = groupIndex[1:][clean]
+        startTimes = series.times[:-1][clean]
+        endTimes = series.times[1:][clean]
+        consumption = np.diff(series.values)[clean]
+        days = (endTimes - startTimes) / SECONDS_PER_DAY
+        months = monthOfYear((startTimes + endTimes) / 2)
+
+        usage = np.zeros((meterCount, 12))
+        elapsed = np.zeros((meterCount, 12))
+        np.add.at(usage, (intervalGroups, months), consumption)
+        np.add.at(elapsed, (intervalGroups, months), days)
+
+        totalUsage = usage.sum(axis=1)
+        totalDays = elapsed.sum(axis=1)
+        overall = np.divide(totalUsage, totalDays, out=np.zeros(meterCount), where=totalDays > 0)
+        self.rates = np.divide(usage, elapsed, out=np.repeat(overall[:, None], 12, axis=1), where=elapsed > 0)
+
+        # Estimates start from each meter's latest reading that is not itself suspect.
+        self.lastTimes = np.zeros(meterCount)
+        self.lastValues = np.zeros(meterCount)
+        if len(series):
+            trusted = np.where((flags & (NEGATIVE | SPIKE)) == 0, np.arange(len(series)), -1)
+            groupStarts = np.flatnonzero(np.append(True, ~series.sameMeter))
+            lastTrusted = np.maximum.reduceat(trusted, groupStarts)
+            self.lastTimes = series.times[lastTrusted]
+            self.lastValues = series.values[lastTrusted]
+
+    def estimate(self, targetDttm):
+        """
+        Estimated register value at targetDttm for every meter point: the last reading plus each calendar month's
+        fitted rate times the days of that month between the last reading and targetDttm.
+        """
+        target = toEpoch(targetDttm)
+        estimates = self.lastValues.copy()
+        if not len(estimates):
+            return estimates
+        monthStart = startOfMonth(fromEpoch(float(self.lastTimes.min())))
+        while toEpoch(monthStart) < target:
+            monthEnd = nextMonth(monthStart)
+            overlap = np.clip(
+                np.minimum(target, toEpoch(monthEnd)) - np.maximum(self.lastTimes, toEpoch(monthStart)), 0, None
+            ) / SECONDS_PER_DAY
+            estimates += overlap * self.rates[:, monthStart.month - 1]
+            monthStart = monthEnd
+        return estimates
+
+
+def startOfMonth(dttm):
+    return dttm.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def nextMonth(dttm):
+    return startOfMonth(dttm.replace(day=28) + datetime.timedelta(days=4))
+
+
+def monthOfYear(epochSeconds):
+    # Calendar month index 0-11 for UTC epoch seconds.
+    months = np.asarray(epochSeconds, dtype='datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    return months % 12
+
+
+def estimateReadings(meterPointIds, targetDttm, historyFromDttm=None):
+    # Returns {meterPointId: estimated value at targetDttm} for meter points that have any readings.
+    series = loadReadingSeries(meterPointIds, historyFromDttm, targetDttm)
+    profiles = ConsumptionProfiles(series)
+    return dict(zip(profiles.meterPointIds.tolist(), profiles.estimate(targetDttm).round(3).tolist()))
+
+
+def getMeterPointsNeedingEstimates(billingCycle, targetDttm, tolerance=datetime.timedelta(days=3)):
+    # Meter points in the cycle whose latest current reading is older than targetDttm - tolerance.
+    return list(
+        MeterPoint.objects.filter(customerAccount__billingCycle=billingCycle).annotate(
+            lastReadingDttm=Subquery(
+                MeterReading.objects.asOf(timezone.now()).filter(meterPoint=OuterRef('pk')).order_by(
+                    '-fromDttm', '-id'
+                ).values('fromDttm')[:1]
+            )
+        ).filter(lastReadingDttm__lt=targetDttm - tolerance).values_list('id', flat=True)
+    )
+
+
+def estimateCycleReadings(billingCycle, targetDttm, historyFromDttm=None, save=False, chunkSize=10000):
+    """
+    Estimates the register value at targetDttm for every meter point in the cycle that has no recent reading,
+    a chunk of meter points per query. With save=True the estimates are stored as MeterReading rows marked
+    estimated so billing picks them up like any other reading.
+    """
+    meterPointIds = getMeterPointsNeedingEstimates(billingCycle, targetDttm)
+    estimates = {}
+    for start in range(0, len(meterPointIds), chunkSize):
+        chunk = estimateReadings(meterPointIds[start:start + chunkSize], targetDttm, historyFromDttm)
+        if save:
+            MeterReading.objects.bulk_create([
+                MeterReading(meterPoint_id=meterPointId, value=value, fromDttm=targetDttm, estimated=True)
+                for meterPointId, value in chunk.items()
+            ])
+        estimates.update(chunk)
+    return estimates
+
+
+def getPreviousReadings(meterPointIds, beforeDttm):
+    # Latest current reading per meter point before beforeDttm, as (meterPointIds, times, values) arrays.
+    rows = MeterPoint.allWithDeleted.filter(id__in=meterPointIds).annotate(
+        **{
+            name: Subquery(
+                MeterReading.objects.asOf(timezone.now()).filter(
+                    meterPoint=OuterRef('pk'), fromDttm__lt=beforeDttm
+                ).order_by('-fromDttm', '-id').values(field)[:1]
+            )
+            for name, field in (('previousDttm', 'fromDttm'), ('previousValue', 'value'))
+        }
+    ).filter(previousDttm__isnull=False).values_list('id', 'previousDttm', 'previousValue')
+    rows = list(rows)
+    return [row[0] for row in rows], [toEpoch(row[1]) for row in rows], [row[2] for row in rows]
+
+
+def validateReadings(meterPointIds, fromDttms, values, spikeFactor=SPIKE_FACTOR):
+    """
+    Flags for incoming readings, in the order given, checked against each other and against the latest stored
+    reading of each meter point. One query and one vectorized pass regardless of how many readings there are.
+    """
+    count = len(values)
+    if not count:
+        return np.zeros(0, dtype=np.uint8)
+    previousIds, previousTimes, previousValues = getPreviousReadings(set(meterPointIds), min(fromDttms))
+    series = ReadingSeries(
+        list(meterPointIds) + previousIds,
+        [toEpoch(dttm) for dttm in fromDttms] + previousTimes,
+        list(values) + previousValues,
+    )
+    sortedFlags = flagAnomalies(series, spikeFactor)
+    flags = np.zeros(len(series), dtype=np.uint8)
+    flags[series.order] = sortedFlags
+    return flags[:count]
@@ -0,0 +1,161 @@
+import math
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.files import chunked, detectFileFormat, iterRows
+from energy.estimates import describeFlags, validateReadings
+from energy.models import MeterPoint, MeterReading
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_CACHED_METER_POINTS = 100000
+MAX_REPORTED_ERRORS = 100
+
+
+class MeterReadingIngestResult:
+
+    def __init__(self):
+        self.rowsRead = 0
+        self.rowsCreated = 0
+        self.rowsRejected = 0
+        self.rowsFlagged = 0
+        self.errors = []
+        self.warnings = []
+        self.startedAt = time.perf_counter()
+        self.elapsed = 0.0
+
+    def addError(self, lineNo, message):
+        self.rowsRejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((lineNo, message))
+
+    def addWarning(self, lineNo, message):
+        self.rowsFlagged += 1
+        if len(self.warnings) < MAX_REPORTED_ERRORS:
+            self.warnings.append((lineNo, message))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.startedAt
+        return self
+
+    @property
+    def rowsPerSecond(self):
+        elapsed = self.elapsed or (time.perf_counter() - self.startedAt)
+        return self.rowsRead / elapsed if elapsed else 0.0
+
+
+def parseDttm(value):
+    if not value:
+        return None
+    parsed = parse_datetime(str(value).strip())
+    if parsed is None:
+        raise ValueError('invalid datetime {!r}'.format(value))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parseRow(row):
+    if not isinstance(row, dict):
+        raise ValueError('malformed row')
+
+    try:
+        identifier = int(str(row.get('identifier', '')).strip())
+    except ValueError:
+        raise ValueError('invalid identifier {!r}'.format(row.get('identifier')))
+
+    try:
+        value = float(row.get('value'))
+    except (TypeError, ValueError):
+        raise ValueError('invalid value {!r}'.format(row.get('value')))
+    if not math.isfinite(value) or value < 0:
+        raise ValueError('value must be a non-negative number')
+
+    fromDttm = parseDttm(row.get('fromDttm'))
+    if fromDttm is None:
+        raise ValueError('fromDttm is required')
+    toDttm = parseDttm(row.get('toDttm'))
+    if toDttm is not None and toDttm <= fromDttm:
+        raise ValueError('toDttm must be after fromDttm')
+
+    return identifier, value, fromDttm, toDttm, row.get('reference') or None
+
+
+class MeterPointCache:
+    # Resolves MeterPoint.identifier to primary keys with one query per chunk for unseen identifiers.
+
+    def __init__(self, maxSize=MAX_CACHED_METER_POINTS):
+        self.maxSize = maxSize
+        self.pks = {}
+
+    def resolve(self, identifiers):
+        identifiers = set(identifiers)
+        missing = identifiers.difference(self.pks)
+        if missing:
+            if len(self.pks) + len(missing) > self.maxSize:
+                self.pks.clear()
+                missing = identifiers
+            found = dict(
+                MeterPoint.objects.filter(identifier__in=missing).values_list('identifier', 'id')
+            )
+            for identifier in missing:
+                self.pks[identifier] = found.get(identifier)
+        return self.pks
+
+
+def ingestMeterReadings(fileObject, fileFormat='csv', chunkSize=DEFAULT_CHUNK_SIZE, onChunk=None, validate=True):
+    result = MeterReadingIngestResult()
+    meterPointCache = MeterPointCache()
+
+    for chunk in chunked(iterRows(fileObject, fileFormat), chunkSize):
+        parsedRows = []
+        for lineNo, row in chunk:
+            result.rowsRead += 1
+            try:
+                parsedRows.append((lineNo, parseRow(row)))
+            except ValueError as e:
+                result.addError(lineNo, str(e))
+
+        meterPointPks = meterPointCache.resolve(parsed[0] for _, parsed in parsedRows)
+
+        readings = []
+        lineNos = []
+        for lineNo, (identifier, value, fromDttm, toDttm, reference) in parsedRows:
+            meterPointId = meterPointPks.get(identifier)
+            if meterPointId is None:
+                result.addError(lineNo, 'unknown meter point {}'.format(identifier))
+                continue
+
+            reading = MeterReading(meterPoint_id=meterPointId, value=value, fromDttm=fromDttm, reference=reference)
+            if toDttm is not None:
+                reading.toDttm = toDttm
+            readings.append(reading)
+            lineNos.append(lineNo)
+
+        if validate:
+            # Suspect readings are still stored (they may come with proof) but reported for review.
+            flags = validateReadings(
+                [reading.meterPoint_id for reading in readings], [reading.fromDttm for reading in readings],
+                [reading.value for reading in readings],
+            )
+            for lineNo, flag in zip(lineNos, flags.tolist()):
+                if flag:
+                    result.addWarning(lineNo, describeFlags(flag))
+
+        # One bounded transaction per chunk keeps lock time and rollback cost independent of file size.
+        with transaction.atomic():
+            MeterReading.objects.bulk_create(readings, batch_size=chunkSize)
+        result.rowsCreated += len(readings)
+
+        if onChunk is not None:
+            onChunk(result)
+
+    return result.finish()
+
+
+def ingestMeterReadingFile(path, fileFormat=None, chunkSize=DEFAULT_CHUNK_SIZE, onChunk=None, validate=True):
+    fileFormat = fileFormat or detectFileFormat(path)
+    with open(path, newline='', encoding='utf-8') as fileObject:
+        return ingestMeterReadings(fileObject, fileFormat, chunkSize, onChunk, validate)
@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from energy.archive import DEFAULT_CHUNK_SIZE, archiveClosedMonths, archiveMonth
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the MeterReading rows of closed months into the columnar archive, every closed month by default or '
+        'the months given with --month.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', dest='months', action='append', default=[], help='YYYY-MM, repeatable')
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            months = [datetime.date.fromisoformat(month + '-01') for month in options['months']]
+        except ValueError:
+            raise CommandError('--month must be YYYY-MM')
+
+        if not months:
+            results = archiveClosedMonths(chunkSize=options['chunkSize'], onMonth=self.writeResult)
+        else:
+            results = []
+            for month in months:
+                try:
+                    results.append(archiveMonth(month, chunkSize=options['chunkSize']))
+                except ValueError as e:
+                    raise CommandError(e)
+                self.writeResult(results[-1])
+        self.stdout.write(self.style.SUCCESS('{} months archived.'.format(len(results))))
+
+    def writeResult(self, result):
+        self.stdout.write('{:%Y-%m}: {} archived, {} kept as month-end readings'.format(
+            result.month, result.readingsArchived, result.readingsKept
+        ))
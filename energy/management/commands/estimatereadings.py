@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from energy.estimates import estimateCycleReadings
+from energy.ingestion import parseDttm
+from energy.models import BillingCycle
+
+
+class Command(BaseCommand):
+    help = 'Estimate register readings at a date for every meter point on a BillingCycle without a recent reading.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('billingCycle', type=int, help='BillingCycle id')
+        parser.add_argument('targetDttm')
+        parser.add_argument('--history-from', dest='historyFromDttm', default=None,
+                            help='only fit profiles on readings from this datetime onwards')
+        parser.add_argument('--save', action='store_true', help='store the estimates as estimated MeterReading rows')
+
+    def handle(self, *args, **options):
+        try:
+            billingCycle = BillingCycle.objects.get(pk=options['billingCycle'])
+        except BillingCycle.DoesNotExist:
+            raise CommandError('BillingCycle {} does not exist'.format(options['billingCycle']))
+        try:
+            targetDttm = parseDttm(options['targetDttm'])
+            historyFromDttm = parseDttm(options['historyFromDttm'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        estimates = estimateCycleReadings(billingCycle, targetDttm, historyFromDttm, save=options['save'])
+        if options['verbosity'] > 1:
+            for meterPointId, value in estimates.items():
+                self.stdout.write('{}\t{:.3f}'.format(meterPointId, value))
+        self.stdout.write(self.style.SUCCESS('{} {} meter point readings at {}.'.format(
+            'Saved' if options['save'] else 'Estimated', len(estimates), targetDttm
+        )))
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from energy.billing import DEFAULT_CHUNK_SIZE, generateBills
+from energy.ingestion import parseDttm
+from energy.models import BillingCycle
+
+
+class Command(BaseCommand):
+    help = 'Generate draft Bill rows for every CustomerAccount on a BillingCycle for the given period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('billingCycle', type=int, help='BillingCycle id')
+        parser.add_argument('fromDttm')
+        parser.add_argument('toDttm')
+        parser.add_argument('--user', dest='username', default=None, help='username recorded as createdUser')
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            billingCycle = BillingCycle.objects.get(pk=options['billingCycle'])
+        except BillingCycle.DoesNotExist:
+            raise CommandError('BillingCycle {} does not exist'.format(options['billingCycle']))
+
+        try:
+            fromDttm = parseDttm(options['fromDttm'])
+            toDttm = parseDttm(options['toDttm'])
+        except ValueError as e:
+            raise CommandError(e)
+        if fromDttm is None or toDttm is None or toDttm <= fromDttm:
+            raise CommandError('toDttm must be after fromDttm')
+
+        createdUser = None
+        if options['username']:
+            createdUser = User.objects.filter(username=options['username']).first()
+            if createdUser is None:
+                raise CommandError('User {} does not exist'.format(options['username']))
+
+        result = generateBills(billingCycle, fromDttm, toDttm, createdUser, chunkSize=options['chunkSize'])
+
+        if result.missingCharges:
+            self.stderr.write('{} accounts have no active Charges: {}'.format(
+                len(result.missingCharges), ', '.join(str(pk) for pk in result.missingCharges[:50])
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            '{} accounts processed, {} bills created, {} already billed.'.format(
+                result.accountsProcessed, result.billsCreated, result.alreadyBilled
+            )
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from energy.ingestion import DEFAULT_CHUNK_SIZE, ingestMeterReadingFile
+
+
+class Command(BaseCommand):
+    help = 'Bulk import MeterReading rows from a CSV or JSONL file (identifier, value, fromDttm[, toDttm, reference]).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='fileFormat', choices=['csv', 'jsonl'], default=None)
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--no-validate', dest='validate', action='store_false',
+                            help='skip flagging negative, rollover and spike readings')
+
+    def handle(self, *args, **options):
+        if options['chunkSize'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        verbosity = options['verbosity']
+
+        def onChunk(result):
+            if verbosity > 1:
+                self.stdout.write(
+                    '{} rows read, {} created, {} rejected ({:.0f} rows/sec)'.format(
+                        result.rowsRead, result.rowsCreated, result.rowsRejected, result.rowsPerSecond
+                    )
+                )
+
+        try:
+            result = ingestMeterReadingFile(
+                options['path'], options['fileFormat'], options['chunkSize'], onChunk, options['validate']
+            )
+        except OSError as e:
+            raise CommandError(e)
+
+        for lineNo, message in result.errors:
+            self.stderr.write('line {}: {}'.format(lineNo, message))
+        if result.rowsRejected > len(result.errors):
+            self.stderr.write('... {} more rejected rows'.format(result.rowsRejected - len(result.errors)))
+        for lineNo, message in result.warnings:
+            self.stderr.write('line {}: flagged {}'.format(lineNo, message))
+        if result.rowsFlagged > len(result.warnings):
+            self.stderr.write('... {} more flagged rows'.format(result.rowsFlagged - len(result.warnings)))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {} of {} rows in {:.2f}s ({:.0f} rows/sec), {} rejected, {} flagged.'.format(
+                result.rowsCreated, result.rowsRead, result.elapsed, result.rowsPerSecond, result.rowsRejected,
+                result.rowsFlagged,
+            )
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from energy.ingestion import parseDttm
+from energy.publishing import DEFAULT_BATCH_SIZE, publishMeterPoints
+
+
+class Command(BaseCommand):
+    help = (
+        'Publish new readings and usage to the configured sink for every MeterPoint whose nextPublishDttm passed '
+        'more than METER_POINT_PUBLISH_SAFETY_LAG_SECONDS ago.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', default=None, help='publish what is due at this datetime instead of now')
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--batch-size', dest='batchSize', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batchSize'] < 1:
+            raise CommandError('--workers and --batch-size must be positive')
+        try:
+            now = parseDttm(options['now'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        result = publishMeterPoints(now, options['workers'], options['batchSize'])
+
+        if result.releasedClaims:
+            self.stderr.write('{} stale claims released'.format(result.releasedClaims))
+        if result.error:
+            raise CommandError('Publishing stopped after {} meter points: {}'.format(result.published, result.error))
+        self.stdout.write(self.style.SUCCESS(
+            'Published {} meter points in {} batches.'.format(result.published, result.batches)
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from energy.documents import DEFAULT_CHUNK_SIZE, renderBillDocuments
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the statements of accepted bills into the document store across a pool of worker processes. Bills '
+        'whose current version was already rendered are skipped unless --force is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bill', dest='billIds', type=int, action='append', default=None, help='Bill id, repeatable'
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--force', action='store_true', help='render again even if a document exists')
+
+    def handle(self, *args, **options):
+        result = renderBillDocuments(
+            options['billIds'], max(1, options['workers']), options['chunkSize'], options['force'],
+            onChunk=lambda result: self.stderr.write(
+                'Rendered {} of {} bills'.format(result.billsRendered, result.billsPending)
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS('{} bills rendered, {} new documents written.'.format(
+            result.billsRendered, result.documentsWritten
+        )))
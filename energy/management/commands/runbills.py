@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from energy.billing import DEFAULT_CHUNK_SIZE
+from energy.billrun import getOrCreateBillRun, runBillRun
+from energy.ingestion import parseDttm
+from energy.models import BillingCycle
+
+
+class Command(BaseCommand):
+    help = 'Run (or resume) a sharded bill run for a BillingCycle across a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('billingCycle', type=int, help='BillingCycle id')
+        parser.add_argument('fromDttm')
+        parser.add_argument('toDttm')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--shards', type=int, default=None, help='defaults to four shards per worker')
+        parser.add_argument('--user', dest='username', default=None, help='username recorded as createdUser')
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            billingCycle = BillingCycle.objects.get(pk=options['billingCycle'])
+        except BillingCycle.DoesNotExist:
+            raise CommandError('BillingCycle {} does not exist'.format(options['billingCycle']))
+
+        try:
+            fromDttm = parseDttm(options['fromDttm'])
+            toDttm = parseDttm(options['toDttm'])
+        except ValueError as e:
+            raise CommandError(e)
+        if fromDttm is None or toDttm is None or toDttm <= fromDttm:
+            raise CommandError('toDttm must be after fromDttm')
+
+        workers = max(1, options['workers'])
+        createdUserId = None
+        if options['username']:
+            createdUserId = User.objects.filter(username=options['username']).values_list('id', flat=True).first()
+            if createdUserId is None:
+                raise CommandError('User {} does not exist'.format(options['username']))
+
+        billRun = getOrCreateBillRun(billingCycle, fromDttm, toDttm, options['shards'] or workers * 4)
+        billRun, failures, missingCharges = runBillRun(billRun, workers, createdUserId, options['chunkSize'])
+
+        for shardId, error in failures:
+            self.stderr.write('shard {} failed: {!r}'.format(shardId, error))
+        if missingCharges:
+            self.stderr.write('{} accounts have no active Charges'.format(len(missingCharges)))
+
+        shards = list(billRun.shards.all())
+        message = 'BillRun {} {}: {}/{} shards completed, {} bills created.'.format(
+            billRun.pk, billRun.status,
+            sum(shard.status == shard.Status.COMPLETED for shard in shards), len(shards),
+            sum(shard.billsCreated for shard in shards),
+        )
+        if failures:
+            raise CommandError(message + ' Re-run the same command to resume.')
+        self.stdout.write(self.style.SUCCESS(message))
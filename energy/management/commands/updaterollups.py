@@ -0,0 +1,47 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from energy.models import MeterPoint
+from energy.rollups import DEFAULT_CHUNK_SIZE, refreshMeterPoints, updateRollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold MeterReading rows inserted since the last watermark, up to ROLLUP_SAFETY_LAG_SECONDS ago, into the '
+        'daily/monthly usage rollups, or rebuild them from a given day with --from.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='fromDay', default=None, help='rebuild every bucket from this day (YYYY-MM-DD)'
+        )
+        parser.add_argument('--meter-point', dest='identifiers', type=int, action='append', default=[])
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['fromDay'] is None:
+            result = updateRollups(options['chunkSize'])
+            self.stdout.write(self.style.SUCCESS(
+                '{} readings folded into {} daily rows for {} meter points (watermark {}).'.format(
+                    result.readingsScanned, result.dailyRows, result.meterPointsRefreshed, result.lastReadingId
+                )
+            ))
+            return
+
+        try:
+            fromDay = datetime.date.fromisoformat(options['fromDay'])
+        except ValueError:
+            raise CommandError('--from must be YYYY-MM-DD')
+
+        meterPoints = MeterPoint.allWithDeleted.order_by('id')
+        if options['identifiers']:
+            meterPoints = meterPoints.filter(identifier__in=options['identifiers'])
+        meterPointIds = list(meterPoints.values_list('id', flat=True))
+
+        dailyRows = 0
+        for start in range(0, len(meterPointIds), options['chunkSize']):
+            dailyRows += refreshMeterPoints(meterPointIds[start:start + options['chunkSize']], fromDay)
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt {} daily rows for {} meter points from {}.'.format(dailyRows, len(meterPointIds), fromDay)
+        ))
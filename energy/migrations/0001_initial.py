@@ -0,0 +1,130 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:52
+
+import core.references
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingCycle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IconTbl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=2048, null=True)),
+                ('file', models.ImageField(upload_to='icons')),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MeterPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.BigIntegerField(default=core.references.ReferenceNumber('energy.MeterPoint.identifier'), editable=False, unique=True)),
+                ('lastPublishDttm', models.DateTimeField()),
+                ('nextPublishDttm', models.DateTimeField()),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.address')),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.customeraccount')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UtilityMarket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internalKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('languageKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('iconTbl', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='energy.icontbl')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MeterReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField()),
+                ('fromDttm', models.DateTimeField(default=datetime.date.today)),
+                ('toDttm', models.DateTimeField(default=datetime.datetime(9999, 12, 31, 23, 59, 59, 999999))),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('meterPoint', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='energy.meterpoint')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='meterpoint',
+            name='utilityMarket',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='energy.utilitymarket'),
+        ),
+        migrations.CreateModel(
+            name='BillPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('CLOSED', 'Closed')], default='OPEN', max_length=32)),
+                ('fromDttm', models.DateTimeField()),
+                ('toDttm', models.DateTimeField()),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.customeraccount')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Bill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billedFromDttm', models.DateTimeField()),
+                ('billedToDttm', models.DateTimeField()),
+                ('number', models.BigIntegerField(default=core.references.ReferenceNumber('energy.Bill.number'), editable=False, unique=True)),
+                ('description', models.TextField()),
+                ('versionNumber', models.IntegerField()),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('issueDt', models.DateField()),
+                ('dueDt', models.DateField()),
+                ('netAmount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('grossAmount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('salesTaxAmount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('status', models.CharField(choices=[('ACCEPTED', 'Accepted'), ('DRAFT', 'Draft'), ('READY_FOR_ACCEPTANCE', 'Ready For Acceptance'), ('ACCEPTANCE_PENDING', 'Acceptance Pending')], default='DRAFT', max_length=32)),
+                ('acceptedDttm', models.DateTimeField()),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('billPeriod', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='energy.billperiod')),
+                ('createdUser', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
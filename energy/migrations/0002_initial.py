@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('payment', '0001_initial'),
+        ('accounts', '0002_initial'),
+        ('energy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='currency',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.currency'),
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='customerAccount',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.customeraccount'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bill',
+            name='acceptedDttm',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
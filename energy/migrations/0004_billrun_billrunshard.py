@@ -0,0 +1,52 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0003_alter_bill_accepteddttm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fromDttm', models.DateTimeField()),
+                ('toDttm', models.DateTimeField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=32)),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('completedDttm', models.DateTimeField(blank=True, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('billingCycle', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='billRuns', to='energy.billingcycle')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BillRunShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fromAccountId', models.BigIntegerField()),
+                ('toAccountId', models.BigIntegerField()),
+                ('lastAccountId', models.BigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=32)),
+                ('billsCreated', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('startedDttm', models.DateTimeField(blank=True, null=True)),
+                ('completedDttm', models.DateTimeField(blank=True, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('billRun', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='energy.billrun')),
+            ],
+            options={
+                'ordering': ['billRun', 'fromAccountId'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0004_billrun_billrunshard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meterreading',
+            index=models.Index(fields=['meterPoint', 'fromDttm', 'toDttm', 'deleteFl'], name='energy_reading_asof_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0005_asof_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='meterreading',
+            name='energy_reading_asof_idx',
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount', 'billedFromDttm', 'billedToDttm'], name='energy_bill_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billperiod',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount', 'fromDttm', 'toDttm'], name='energy_billperiod_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meterpoint',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount'], name='energy_meterpoint_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meterreading',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['meterPoint', 'fromDttm', 'toDttm'], name='energy_reading_asof_idx'),
+        ),
+    ]
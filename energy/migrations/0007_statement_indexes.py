@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0006_live_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount', 'createdDttm', 'id'], name='energy_bill_created_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_live_indexes'),
+        ('energy', '0007_statement_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('lastReadingId', models.BigIntegerField(default=0)),
+                ('modifiedDttm', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MeterPointMonthlyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('consumption', models.FloatField(default=0)),
+                ('readingCount', models.IntegerField(default=0)),
+                ('meterPoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthlyUsage', to='energy.meterpoint')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MeterPointDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('consumption', models.FloatField(default=0)),
+                ('readingCount', models.IntegerField(default=0)),
+                ('meterPoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dailyUsage', to='energy.meterpoint')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AccountMonthlyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('consumption', models.FloatField(default=0)),
+                ('readingCount', models.IntegerField(default=0)),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthlyUsage', to='accounts.customeraccount')),
+                ('utilityMarket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='energy.utilitymarket')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='meterpointmonthlyusage',
+            constraint=models.UniqueConstraint(fields=('meterPoint', 'month'), name='energy_monthlyusage_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='meterpointdailyusage',
+            constraint=models.UniqueConstraint(fields=('meterPoint', 'day'), name='energy_dailyusage_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountmonthlyusage',
+            constraint=models.UniqueConstraint(fields=('customerAccount', 'utilityMarket', 'month'), name='energy_accountusage_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0008_consumption_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='paidAmount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0009_reconciliation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meterreading',
+            name='estimated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0010_meterreading_estimated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meterpoint',
+            name='publishClaimToken',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='meterpoint',
+            name='publishClaimedDttm',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='meterpoint',
+            index=models.Index(condition=models.Q(('deleteFl', False), ('publishClaimToken__isnull', True)), fields=['nextPublishDttm', 'id'], name='energy_meterpoint_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meterpoint',
+            index=models.Index(fields=['publishClaimToken'], name='energy_meterpoint_claim_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0011_publish_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReadingMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('segment', models.CharField(max_length=255)),
+                ('readingCount', models.BigIntegerField(default=0)),
+                ('meterPointCount', models.IntegerField(default=0)),
+                ('archivedDttm', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
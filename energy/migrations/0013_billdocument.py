@@ -0,0 +1,29 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0012_archivedreadingmonth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versionNumber', models.IntegerField()),
+                ('digest', models.CharField(max_length=64)),
+                ('size', models.IntegerField(default=0)),
+                ('renderedDttm', models.DateTimeField(auto_now=True)),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='energy.bill')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='billdocument',
+            constraint=models.UniqueConstraint(fields=('bill', 'versionNumber'), name='energy_billdocument_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0013_billdocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meterreading',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['meterPoint', 'createdDttm'], name='energy_reading_created_idx'),
+        ),
+    ]
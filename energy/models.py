@@ -1,110 +1,210 @@
-import datetime
-import random
-
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
-from accounts.models import Address, CustomerAccount
-from payment.models import Currency
-
-
-def generateReferenceNumber():
-    return random.randint(1000000000, 9999999999)
+from core.models import EffectiveDatedModel, SoftDeleteModel, asOfIndex, liveIndex
+from core.references import ReferenceNumber
 
 
-class IconTbl(models.Model):
+class IconTbl(SoftDeleteModel):
     name = models.CharField(max_length=2048, blank=True, null=True)
     file = models.ImageField(upload_to='icons')
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class UtilityMarket(models.Model):
+class UtilityMarket(SoftDeleteModel):
     internalKey = models.CharField(max_length=2048, blank=True, null=True)  # GAS / ELECTRICITY / WATER
     languageKey = models.CharField(max_length=2048, blank=True, null=True)
     iconTbl = models.ForeignKey(IconTbl, on_delete=models.PROTECT)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class MeterPoint(models.Model):
+class MeterPoint(SoftDeleteModel):
     utilityMarket = models.ForeignKey(UtilityMarket, on_delete=models.PROTECT)
-    identifier = models.BigIntegerField(max_length=10, editable=False, unique=True, default=generateReferenceNumber)
+    identifier = models.BigIntegerField(
+        editable=False, unique=True, default=ReferenceNumber('energy.MeterPoint.identifier')
+    )
     lastPublishDttm = models.DateTimeField()
     nextPublishDttm = models.DateTimeField()
-    address = models.ForeignKey(Address, on_delete=models.SET_NULL)
-    customerAccount = models.ForeignKey(CustomerAccount, on_delete=models.PROTECT)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
-
-
-class BillingCycle(models.Model):
+    address = models.ForeignKey('accounts.Address', on_delete=models.SET_NULL, blank=True, null=True)
+    customerAccount = models.ForeignKey('accounts.CustomerAccount', on_delete=models.PROTECT)
+    publishClaimToken = models.CharField(max_length=32, blank=True, null=True)
+    publishClaimedDttm = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            liveIndex(['customerAccount'], 'energy_meterpoint_live_idx'),
+            # Only unclaimed live rows are indexed, so finding the next due batch is a short range scan.
+            models.Index(
+                fields=['nextPublishDttm', 'id'], name='energy_meterpoint_due_idx',
+                condition=Q(deleteFl=False, publishClaimToken__isnull=True),
+            ),
+            models.Index(fields=['publishClaimToken'], name='energy_meterpoint_claim_idx'),
+        ]
+
+
+class BillingCycle(SoftDeleteModel):
     name = models.CharField(max_length=2048, blank=True, null=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class BillPeriod(models.Model):
+class BillPeriod(SoftDeleteModel):
     class Status(models.TextChoices):
         OPEN = 'OPEN', _('Open')
         CLOSED = 'CLOSED', _('Closed')
 
-    customerAccount = models.ForeignKey(CustomerAccount, on_delete=models.PROTECT)
-    status = models.CharField(choices=Status.choices, default=Status.OPEN)
+    customerAccount = models.ForeignKey('accounts.CustomerAccount', on_delete=models.PROTECT)
+    status = models.CharField(max_length=32, choices=Status.choices, default=Status.OPEN)
     fromDttm = models.DateTimeField()
     toDttm = models.DateTimeField()
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
+    class Meta:
+        indexes = [liveIndex(['customerAccount', 'fromDttm', 'toDttm'], 'energy_billperiod_live_idx')]
 
-class Bill(models.Model):
+
+class Bill(SoftDeleteModel):
     class Status(models.TextChoices):
         ACCEPTED = 'ACCEPTED', _('Accepted')
         DRAFT = 'DRAFT', _('Draft')
         READY_FOR_ACCEPTANCE = 'READY_FOR_ACCEPTANCE', _('Ready For Acceptance')
         ACCEPTANCE_PENDING = 'ACCEPTANCE_PENDING', _('Acceptance Pending')
 
-    customerAccount = models.ForeignKey(CustomerAccount, on_delete=models.PROTECT)
+    customerAccount = models.ForeignKey('accounts.CustomerAccount', on_delete=models.PROTECT)
     billPeriod = models.ForeignKey(BillPeriod, on_delete=models.PROTECT)
     billedFromDttm = models.DateTimeField()
     billedToDttm = models.DateTimeField()
-    number = models.BigIntegerField(max_length=10, editable=False, unique=True, default=generateReferenceNumber)
+    number = models.BigIntegerField(
+        editable=False, unique=True, default=ReferenceNumber('energy.Bill.number')
+    )
     description = models.TextField()
     versionNumber = models.IntegerField()
     createdDttm = models.DateTimeField(auto_now_add=True)
-    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL)
+    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
     issueDt = models.DateField()
     dueDt = models.DateField()
-    netAmount = models.DecimalField()
-    grossAmount = models.DecimalField()
-    currency = models.ForeignKey(Currency, on_delete=models.PROTECT)
-    salesTaxAmount = models.DecimalField()
-    status = models.CharField(choices=Status.choices, default=Status.DRAFT)
-    acceptedDttm = models.DateTimeField()
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
-
-
-class MeterReading(models.Model):
+    netAmount = models.DecimalField(max_digits=14, decimal_places=2)
+    grossAmount = models.DecimalField(max_digits=14, decimal_places=2)
+    paidAmount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    currency = models.ForeignKey('payment.Currency', on_delete=models.PROTECT)
+    salesTaxAmount = models.DecimalField(max_digits=14, decimal_places=2)
+    status = models.CharField(max_length=32, choices=Status.choices, default=Status.DRAFT)
+    acceptedDttm = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            liveIndex(['customerAccount', 'billedFromDttm', 'billedToDttm'], 'energy_bill_live_idx'),
+            liveIndex(['customerAccount', 'createdDttm', 'id'], 'energy_bill_created_idx'),
+        ]
+
+
+class MeterReading(EffectiveDatedModel):
     meterPoint = models.ForeignKey(MeterPoint, on_delete=models.PROTECT)
     value = models.FloatField()
-    fromDttm = models.DateTimeField(default=datetime.date.today)
-    toDttm = models.DateTimeField(default=datetime.datetime.max)
+    estimated = models.BooleanField(default=False)
     createdDttm = models.DateTimeField(auto_now_add=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            asOfIndex('meterPoint', 'energy_reading_asof_idx'),
+            # Publishing selects a meter point's readings by when they were recorded.
+            liveIndex(['meterPoint', 'createdDttm'], 'energy_reading_created_idx'),
+        ]
+
+
+class BillRun(SoftDeleteModel):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        COMPLETED = 'COMPLETED', _('Completed')
+        FAILED = 'FAILED', _('Failed')
+
+    billingCycle = models.ForeignKey(BillingCycle, on_delete=models.PROTECT, related_name='billRuns')
+    fromDttm = models.DateTimeField()
+    toDttm = models.DateTimeField()
+    status = models.CharField(max_length=32, choices=Status.choices, default=Status.PENDING)
+    createdDttm = models.DateTimeField(auto_now_add=True)
+    completedDttm = models.DateTimeField(blank=True, null=True)
+
+
+class BillRunShard(SoftDeleteModel):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        COMPLETED = 'COMPLETED', _('Completed')
+        FAILED = 'FAILED', _('Failed')
+
+    billRun = models.ForeignKey(BillRun, on_delete=models.CASCADE, related_name='shards')
+    fromAccountId = models.BigIntegerField()
+    toAccountId = models.BigIntegerField()
+    lastAccountId = models.BigIntegerField(blank=True, null=True)
+    status = models.CharField(max_length=32, choices=Status.choices, default=Status.PENDING)
+    billsCreated = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    startedDttm = models.DateTimeField(blank=True, null=True)
+    completedDttm = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['billRun', 'fromAccountId']
+
+
+class MeterPointDailyUsage(models.Model):
+    # Rollup maintained by energy.rollups; consumption is bucketed by the day of the later reading.
+    meterPoint = models.ForeignKey(MeterPoint, on_delete=models.CASCADE, related_name='dailyUsage')
+    day = models.DateField()
+    consumption = models.FloatField(default=0)
+    readingCount = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['meterPoint', 'day'], name='energy_dailyusage_uniq')]
+
+
+class MeterPointMonthlyUsage(models.Model):
+    meterPoint = models.ForeignKey(MeterPoint, on_delete=models.CASCADE, related_name='monthlyUsage')
+    month = models.DateField()
+    consumption = models.FloatField(default=0)
+    readingCount = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['meterPoint', 'month'], name='energy_monthlyusage_uniq')]
+
+
+class AccountMonthlyUsage(models.Model):
+    customerAccount = models.ForeignKey(
+        'accounts.CustomerAccount', on_delete=models.CASCADE, related_name='monthlyUsage'
+    )
+    utilityMarket = models.ForeignKey(UtilityMarket, on_delete=models.CASCADE)
+    month = models.DateField()
+    consumption = models.FloatField(default=0)
+    readingCount = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['customerAccount', 'utilityMarket', 'month'], name='energy_accountusage_uniq'
+            )
+        ]
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    lastReadingId = models.BigIntegerField(default=0)
+    modifiedDttm = models.DateTimeField(auto_now=True)
+
+
+class ArchivedReadingMonth(models.Model):
+    # A month of MeterReading rows moved into the columnar archive; segment names the directory holding it.
+    month = models.DateField(unique=True)
+    segment = models.CharField(max_length=255)
+    readingCount = models.BigIntegerField(default=0)
+    meterPointCount = models.IntegerField(default=0)
+    archivedDttm = models.DateTimeField(auto_now=True)
+
+
+class BillDocument(models.Model):
+    # The rendered statement of one version of an accepted Bill; digest names its file in the document store.
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='documents')
+    versionNumber = models.IntegerField()
+    digest = models.CharField(max_length=64)
+    size = models.IntegerField(default=0)
+    renderedDttm = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['bill', 'versionNumber'], name='energy_billdocument_uniq')]
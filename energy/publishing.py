@@ -0,0 +1,180 @@
+import datetime
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from energy.billrun import initWorker
+from energy.models import MeterPoint, MeterPointDailyUsage, MeterReading
+from energy.rollups import localDay
+from energy.sinks import PublishMessage, getPublishSink
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class PublishResult:
+
+    def __init__(self):
+        self.published = 0
+        self.batches = 0
+        self.releasedClaims = 0
+        self.error = None
+
+    def merge(self, other):
+        self.published += other.published
+        self.batches += other.batches
+        self.releasedClaims += other.releasedClaims
+        self.error = self.error or other.error
+        return self
+
+
+def getPublishInterval():
+    return datetime.timedelta(seconds=settings.METER_POINT_PUBLISH_INTERVAL_SECONDS)
+
+
+def getPublishCutoff(now):
+    # Readings are stamped with createdDttm at insert but only become visible at commit, so a window is published
+    # only once it closed more than the safety lag before now.
+    return now - datetime.timedelta(seconds=settings.METER_POINT_PUBLISH_SAFETY_LAG_SECONDS)
+
+
+def releaseStalePublishClaims():
+    # Claims held by a worker that died are freed; the same windows are then republished with the same message ids.
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.METER_POINT_PUBLISH_CLAIM_TIMEOUT_SECONDS)
+    return MeterPoint.objects.filter(publishClaimToken__isnull=False, publishClaimedDttm__lt=cutoff).update(
+        publishClaimToken=None, publishClaimedDttm=None
+    )
+
+
+def claimDueMeterPoints(now, batchSize):
+    claimToken = uuid.uuid4().hex
+    due = MeterPoint.objects.filter(nextPublishDttm__lte=now, publishClaimToken__isnull=True).order_by(
+        'nextPublishDttm', 'id'
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:batchSize])
+            claimed = MeterPoint.objects.filter(id__in=ids).update(
+                publishClaimToken=claimToken, publishClaimedDttm=timezone.now()
+            )
+    else:
+        # SQLite has no row locks: one conditional UPDATE picks and claims the batch in a single statement, so a
+        # row another publisher claimed first is not matched and is never claimed twice.
+        claimed = MeterPoint.objects.filter(
+            id__in=due.values('id')[:batchSize], publishClaimToken__isnull=True
+        ).update(publishClaimToken=claimToken, publishClaimedDttm=timezone.now())
+    if not claimed:
+        return claimToken, []
+
+    return claimToken, list(
+        MeterPoint.objects.filter(publishClaimToken=claimToken).order_by('id').values_list(
+            'id', 'identifier', 'lastPublishDttm', 'nextPublishDttm'
+        )
+    )
+
+
+def buildMessages(meterPoints):
+    """
+    One message per meter point with the current readings recorded in its window (lastPublishDttm, nextPublishDttm]
+    and the daily usage for the days those readings fall on. Two queries per batch.
+    """
+    meterPointIds = [meterPoint[0] for meterPoint in meterPoints]
+    windows = {meterPointId: (fromDttm, toDttm) for meterPointId, _, fromDttm, toDttm in meterPoints}
+
+    readings = defaultdict(list)
+    days = defaultdict(set)
+    for meterPointId, fromDttm, value, estimated, createdDttm in MeterReading.objects.asOf(timezone.now()).filter(
+        meterPoint_id__in=meterPointIds,
+        createdDttm__gt=min(window[0] for window in windows.values()),
+        createdDttm__lte=max(window[1] for window in windows.values()),
+    ).order_by('meterPoint_id', 'fromDttm', 'id').values_list(
+        'meterPoint_id', 'fromDttm', 'value', 'estimated', 'createdDttm'
+    ).iterator():
+        windowFromDttm, windowToDttm = windows[meterPointId]
+        if windowFromDttm < createdDttm <= windowToDttm:
+            readings[meterPointId].append({'fromDttm': fromDttm, 'value': value, 'estimated': estimated})
+            days[meterPointId].add(localDay(fromDttm))
+
+    usage = defaultdict(list)
+    allDays = set().union(*days.values()) if days else set()
+    for meterPointId, day, consumption in MeterPointDailyUsage.objects.filter(
+        meterPoint_id__in=list(days), day__in=allDays
+    ).order_by('meterPoint_id', 'day').values_list('meterPoint_id', 'day', 'consumption'):
+        if day in days[meterPointId]:
+            usage[meterPointId].append({'day': day, 'consumption': consumption})
+
+    return [
+        PublishMessage(
+            meterPointId, identifier, fromDttm, toDttm, readings.get(meterPointId, []), usage.get(meterPointId, [])
+        )
+        for meterPointId, identifier, fromDttm, toDttm in meterPoints
+    ]
+
+
+def advanceSchedules(claimToken, meterPoints, now):
+    # The published window becomes lastPublishDttm and the schedule moves on by whole intervals past now, so a
+    # backlog is caught up in one wider window. One UPDATE per distinct step count, normally just one.
+    interval = getPublishInterval()
+    groups = defaultdict(list)
+    for meterPointId, _, _, nextPublishDttm in meterPoints:
+        groups[(now - nextPublishDttm) // interval + 1].append(meterPointId)
+    with transaction.atomic():
+        for steps, ids in groups.items():
+            MeterPoint.objects.filter(id__in=ids, publishClaimToken=claimToken).update(
+                lastPublishDttm=F('nextPublishDttm'),
+                nextPublishDttm=F('nextPublishDttm') + interval * steps,
+                publishClaimToken=None,
+                publishClaimedDttm=None,
+                versionNo=F('versionNo') + 1,
+            )
+
+
+def releaseClaims(claimToken):
+    return MeterPoint.objects.filter(publishClaimToken=claimToken).update(
+        publishClaimToken=None, publishClaimedDttm=None
+    )
+
+
+def runPublisher(now=None, sink=None, batchSize=DEFAULT_BATCH_SIZE):
+    # Publishes every window that closed by the cutoff for `now`. Safe to run in several processes at once: each
+    # batch is claimed first.
+    cutoff = getPublishCutoff(now or timezone.now())
+    sink = sink or getPublishSink()
+    result = PublishResult()
+    result.releasedClaims = releaseStalePublishClaims()
+    try:
+        while True:
+            claimToken, meterPoints = claimDueMeterPoints(cutoff, batchSize)
+            if not meterPoints:
+                break
+            try:
+                sink.publish(buildMessages(meterPoints))
+            except Exception as e:
+                # Leave the schedule where it was so the next run retries the same windows.
+                releaseClaims(claimToken)
+                result.error = repr(e)
+                break
+            advanceSchedules(claimToken, meterPoints, cutoff)
+            result.published += len(meterPoints)
+            result.batches += 1
+    finally:
+        sink.close()
+    return result
+
+
+def publishMeterPoints(now=None, workers=1, batchSize=DEFAULT_BATCH_SIZE):
+    now = now or timezone.now()
+    if workers <= 1:
+        return runPublisher(now, batchSize=batchSize)
+
+    result = PublishResult()
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=initWorker) as executor:
+        futures = [executor.submit(runPublisher, now, None, batchSize) for _ in range(workers)]
+        for future in as_completed(futures):
+            result.merge(future.result())
+    return result
@@ -0,0 +1,171 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from energy.archive import iterReadings
+from energy.models import (
+    AccountMonthlyUsage, MeterPoint, MeterPointDailyUsage, MeterPointMonthlyUsage, MeterReading, RollupWatermark
+)
+
+CONSUMPTION_WATERMARK = 'consumption'
+DEFAULT_CHUNK_SIZE = 500
+
+
+class RollupResult:
+
+    def __init__(self):
+        self.readingsScanned = 0
+        self.meterPointsRefreshed = 0
+        self.dailyRows = 0
+        self.lastReadingId = None
+
+
+def startOfDay(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def localDay(dttm):
+    return timezone.localtime(dttm).date() if timezone.is_aware(dttm) else dttm.date()
+
+
+def getTouchedMeterPoints(afterReadingId, upToReadingId):
+    # Earliest reading day per meter point among readings inserted after the watermark.
+    # Corrections insert a new reading row, so they are picked up here as well.
+    rows = MeterReading.allWithDeleted.filter(
+        id__gt=afterReadingId, id__lte=upToReadingId
+    ).values('meterPoint_id').annotate(firstDttm=Min('fromDttm'), count=Count('id')).values_list(
+        'meterPoint_id', 'firstDttm', 'count'
+    )
+    touched = {}
+    readingCount = 0
+    for meterPointId, firstDttm, count in rows:
+        touched[meterPointId] = localDay(firstDttm)
+        readingCount += count
+    return touched, readingCount
+
+
+def computeDailyUsage(meterPointIds, fromDay):
+    # One query for the register value before fromDay per meter point, one for every current reading after it.
+    fromDttm = startOfDay(fromDay)
+    now = timezone.now()
+    previous = dict(
+        MeterPoint.allWithDeleted.filter(id__in=meterPointIds).annotate(
+            previousValue=Subquery(
+                MeterReading.objects.asOf(now).filter(
+                    meterPoint=OuterRef('pk'), fromDttm__lt=fromDttm
+                ).order_by('-fromDttm', '-id').values('value')[:1]
+            )
+        ).values_list('id', 'previousValue')
+    )
+
+    usage = {}
+    lastValue = dict(previous)
+    # Includes archived months, so rebuilding from a day inside one still sees every reading.
+    for meterPointId, fromDttm, value, _ in iterReadings(meterPointIds, fromDttm, now=now):
+        key = (meterPointId, localDay(fromDttm))
+        consumption, readingCount = usage.get(key, (0.0, 0))
+        previousValue = lastValue.get(meterPointId)
+        if previousValue is not None:
+            # Negative deltas (rollover, bad reads) are left to the estimate engine, not counted as usage.
+            consumption += max(value - previousValue, 0.0)
+        usage[key] = (consumption, readingCount + 1)
+        lastValue[meterPointId] = value
+    return usage
+
+
+def refreshMeterPoints(meterPointIds, fromDay):
+    # Rebuilds every rollup bucket from fromDay onwards for the given meter points. Also usable directly after
+    # changes the watermark cannot see, such as soft deleting a reading in place.
+    fromMonth = fromDay.replace(day=1)
+    usage = computeDailyUsage(meterPointIds, fromDay)
+
+    with transaction.atomic():
+        MeterPointDailyUsage.objects.filter(meterPoint_id__in=meterPointIds, day__gte=fromDay).delete()
+        MeterPointDailyUsage.objects.bulk_create([
+            MeterPointDailyUsage(meterPoint_id=meterPointId, day=day, consumption=consumption, readingCount=count)
+            for (meterPointId, day), (consumption, count) in usage.items()
+        ])
+
+        monthly = MeterPointDailyUsage.objects.filter(
+            meterPoint_id__in=meterPointIds, day__gte=fromMonth
+        ).annotate(bucket=TruncMonth('day')).values('meterPoint_id', 'bucket').annotate(
+            total=Sum('consumption'), count=Sum('readingCount')
+        ).values_list('meterPoint_id', 'bucket', 'total', 'count')
+        MeterPointMonthlyUsage.objects.filter(meterPoint_id__in=meterPointIds, month__gte=fromMonth).delete()
+        MeterPointMonthlyUsage.objects.bulk_create([
+            MeterPointMonthlyUsage(meterPoint_id=meterPointId, month=month, consumption=total, readingCount=count)
+            for meterPointId, month, total, count in monthly
+        ])
+
+        accountIds = set(
+            MeterPoint.allWithDeleted.filter(id__in=meterPointIds).values_list('customerAccount_id', flat=True)
+        )
+        accountMonthly = MeterPointMonthlyUsage.objects.filter(
+            meterPoint__customerAccount_id__in=accountIds, month__gte=fromMonth
+        ).values('meterPoint__customerAccount_id', 'meterPoint__utilityMarket_id', 'month').annotate(
+            total=Sum('consumption'), count=Sum('readingCount')
+        ).values_list('meterPoint__customerAccount_id', 'meterPoint__utilityMarket_id', 'month', 'total', 'count')
+        AccountMonthlyUsage.objects.filter(customerAccount_id__in=accountIds, month__gte=fromMonth).delete()
+        AccountMonthlyUsage.objects.bulk_create([
+            AccountMonthlyUsage(
+                customerAccount_id=accountId, utilityMarket_id=utilityMarketId, month=month, consumption=total,
+                readingCount=count,
+            )
+            for accountId, utilityMarketId, month, total, count in accountMonthly
+        ])
+
+    return len(usage)
+
+
+def getSafeReadingId(now=None):
+    # Ids are allocated at insert but rows only become visible at commit, so a transaction still open may hold ids
+    # below the current max. Stopping at the newest row older than the safety lag leaves those ids for a later run
+    # instead of moving the watermark past them for good.
+    cutoff = (now or timezone.now()) - datetime.timedelta(seconds=settings.ROLLUP_SAFETY_LAG_SECONDS)
+    return MeterReading.allWithDeleted.filter(createdDttm__lte=cutoff).order_by('-id').values_list(
+        'id', flat=True
+    ).first()
+
+
+def updateRollups(chunkSize=DEFAULT_CHUNK_SIZE, now=None):
+    result = RollupResult()
+    watermark, _ = RollupWatermark.objects.get_or_create(name=CONSUMPTION_WATERMARK)
+    upToReadingId = getSafeReadingId(now)
+    if upToReadingId is None or upToReadingId <= watermark.lastReadingId:
+        result.lastReadingId = watermark.lastReadingId
+        return result
+
+    touched, result.readingsScanned = getTouchedMeterPoints(watermark.lastReadingId, upToReadingId)
+
+    # Meter points with similar start days share a chunk so no chunk recomputes a much longer tail than it needs.
+    ordered = sorted(touched.items(), key=lambda item: item[1])
+    for start in range(0, len(ordered), chunkSize):
+        chunk = ordered[start:start + chunkSize]
+        result.dailyRows += refreshMeterPoints([meterPointId for meterPointId, _ in chunk], chunk[0][1])
+        result.meterPointsRefreshed += len(chunk)
+
+    RollupWatermark.objects.filter(pk=watermark.pk).update(lastReadingId=upToReadingId)
+    result.lastReadingId = upToReadingId
+    return result
+
+
+def getDailyUsage(meterPoint, fromDay, toDay):
+    return MeterPointDailyUsage.objects.filter(
+        meterPoint=meterPoint, day__gte=fromDay, day__lte=toDay
+    ).order_by('day').values('day', 'consumption', 'readingCount')
+
+
+def getMonthlyUsage(meterPoint, fromMonth, toMonth):
+    return MeterPointMonthlyUsage.objects.filter(
+        meterPoint=meterPoint, month__gte=fromMonth, month__lte=toMonth
+    ).order_by('month').values('month', 'consumption', 'readingCount')
+
+
+def getAccountMonthlyUsage(customerAccount, fromMonth, toMonth):
+    return AccountMonthlyUsage.objects.filter(
+        customerAccount=customerAccount, month__gte=fromMonth, month__lte=toMonth
+    ).order_by('month', 'utilityMarket_id').values('month', 'utilityMarket__internalKey', 'consumption', 'readingCount')
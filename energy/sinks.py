@@ -0,0 +1,92 @@
+import json
+import os
+import queue
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class PublishMessage:
+    # messageId is derived from the meter point and the end of its window, so a republished window repeats it.
+
+    def __init__(self, meterPointId, identifier, windowFromDttm, windowToDttm, readings, usage):
+        self.messageId = '{}:{}'.format(identifier, windowToDttm.isoformat())
+        self.meterPointId = meterPointId
+        self.identifier = identifier
+        self.windowFromDttm = windowFromDttm
+        self.windowToDttm = windowToDttm
+        self.readings = readings
+        self.usage = usage
+
+    def asDict(self):
+        return {
+            'messageId': self.messageId,
+            'identifier': self.identifier,
+            'windowFromDttm': self.windowFromDttm,
+            'windowToDttm': self.windowToDttm,
+            'readings': self.readings,
+            'usage': self.usage,
+        }
+
+
+def encodeMessages(messages):
+    return ''.join(json.dumps(message.asDict(), cls=DjangoJSONEncoder) + '\n' for message in messages)
+
+
+class PublishSink:
+    # publish() gets a whole batch and must either deliver all of it or raise.
+
+    def publish(self, messages):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonlFileSink(PublishSink):
+    # {pid} in the path gives every worker process its own file, so appends never interleave.
+
+    def __init__(self, path):
+        self.path = Path(str(path).format(pid=os.getpid()))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def publish(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as fileObject:
+            fileObject.write(encodeMessages(messages))
+            fileObject.flush()
+            os.fsync(fileObject.fileno())
+
+
+class SpoolDirectorySink(PublishSink):
+    # A local queue: each batch becomes one file, renamed into place so consumers never see a partial batch.
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        (self.directory / 'tmp').mkdir(parents=True, exist_ok=True)
+
+    def publish(self, messages):
+        name = '{}-{}.jsonl'.format(os.getpid(), uuid.uuid4().hex)
+        temporary = self.directory / 'tmp' / name
+        with open(temporary, 'w', encoding='utf-8') as fileObject:
+            fileObject.write(encodeMessages(messages))
+            fileObject.flush()
+            os.fsync(fileObject.fileno())
+        os.replace(temporary, self.directory / name)
+
+
+class MemoryQueueSink(PublishSink):
+    # In-process queue of message dicts, for consumers running in the same process.
+
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+
+    def publish(self, messages):
+        for message in messages:
+            self.queue.put(message.asDict())
+
+
+def getPublishSink():
+    return import_string(settings.METER_POINT_PUBLISH_SINK)(**settings.METER_POINT_PUBLISH_SINK_OPTIONS)
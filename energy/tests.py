@@ -1,3 +1,161 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomerAccount
+from core.synthetic import generateSyntheticData
+from energy.billing import generateBillsForAccounts
+from energy.estimates import NEGATIVE, ROLLOVER, SECONDS_PER_DAY, SPIKE, ReadingSeries, flagAnomalies
+from energy.ingestion import MeterPointCache, parseRow
+from energy.models import Bill, MeterPoint, MeterReading
+from energy.publishing import runPublisher
+from energy.sinks import MemoryQueueSink
+from payment.models import Charges
+
+
+class ParseRowTests(TestCase):
+
+    def testValidRow(self):
+        identifier, value, fromDttm, toDttm, reference = parseRow({
+            'identifier': ' 1000000008 ', 'value': '12.5', 'fromDttm': '2021-01-01T00:00:00', 'reference': '',
+        })
+        self.assertEqual((identifier, value, toDttm, reference), (1000000008, 12.5, None, None))
+        self.assertEqual(fromDttm, timezone.make_aware(datetime.datetime(2021, 1, 1)))
+
+    def testInvalidRows(self):
+        valid = {'identifier': '1000000008', 'value': '1', 'fromDttm': '2021-01-01T00:00:00'}
+        for change in (
+            {'identifier': 'abc'},
+            {'value': 'nan'},
+            {'value': '-1'},
+            {'value': None},
+            {'fromDttm': ''},
+            {'fromDttm': '2021-13-01'},
+            {'toDttm': '2020-12-31T00:00:00'},
+        ):
+            with self.subTest(change=change), self.assertRaises(ValueError):
+                parseRow(dict(valid, **change))
+
+    def testMalformedRow(self):
+        with self.assertRaises(ValueError):
+            parseRow(None)
+
+
+class MeterPointCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generateSyntheticData(3, 1, datetime.date(2021, 1, 1), 1)
+        cls.meterPoints = dict(MeterPoint.objects.order_by('id').values_list('identifier', 'id')[:3])
+
+    def testResolve(self):
+        pks = MeterPointCache().resolve(list(self.meterPoints) + [1])
+        self.assertEqual({identifier: pks[identifier] for identifier in self.meterPoints}, self.meterPoints)
+        self.assertIsNone(pks[1])
+
+    def testOverflowKeepsTheWholeChunk(self):
+        first, second, third = self.meterPoints
+        cache = MeterPointCache(maxSize=2)
+        cache.resolve([first])
+        # The chunk does not fit next to what is cached, so the cache is cleared; first must be looked up again.
+        pks = cache.resolve([first, second, third])
+        for identifier in (first, second, third):
+            self.assertEqual(pks[identifier], self.meterPoints[identifier])
+
+
+class FlagAnomaliesTests(TestCase):
+
+    def series(self, readings):
+        # readings maps meter point id to daily register values.
+        meterPointIds, times, values = [], [], []
+        for meterPointId, registerValues in readings.items():
+            for day, value in enumerate(registerValues):
+                meterPointIds.append(meterPointId)
+                times.append(day * SECONDS_PER_DAY)
+                values.append(value)
+        return ReadingSeries(meterPointIds, times, values)
+
+    def testFlags(self):
+        flags = flagAnomalies(self.series({
+            1: [0, 10, 20, 5, 15],
+            2: [99000, 99500, 200, 700],
+            3: [0, 10, 20, 30, 530],
+        }))
+        self.assertEqual(flags.tolist(), [
+            0, 0, 0, NEGATIVE, 0,
+            0, 0, ROLLOVER, 0,
+            0, 0, 0, 0, SPIKE,
+        ])
+
+    def testCleanSeries(self):
+        flags = flagAnomalies(self.series({1: [0, 10, 20, 30], 2: [5, 6, 7]}))
+        self.assertFalse(np.any(flags))
+
+    def testShortSeries(self):
+        self.assertEqual(flagAnomalies(self.series({1: [10]})).tolist(), [0])
+
+
+def day(number):
+    return timezone.make_aware(datetime.datetime(2022, 1, number))
+
+
+class GenerateBillsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generateSyntheticData(1, 1, datetime.date(2021, 1, 1), 1)
+        account = CustomerAccount.objects.get()
+        cls.account = (account.pk, account.currency_id, True)
+        meterPoints = MeterPoint.objects.filter(customerAccount=account)
+        MeterReading.objects.filter(meterPoint__in=meterPoints).delete()
+        MeterReading.objects.bulk_create([
+            MeterReading(meterPoint=meterPoints[0], value=value, fromDttm=day(number))
+            for number, value in ((1, 100), (4, 130), (8, 190), (11, 200))
+        ])
+        # The tariff changes on the 6th, halfway through the billing window.
+        Charges.allWithDeleted.filter(customerAccount=account).delete()
+        Charges.objects.bulk_create([
+            Charges(customerAccount=account, standingCharge=Decimal('0.50'), unitRate=Decimal('0.10'),
+                    fromDttm=day(1) - datetime.timedelta(days=30), toDttm=day(6)),
+            Charges(customerAccount=account, standingCharge=Decimal('1.00'), unitRate=Decimal('0.20'), fromDttm=day(6)),
+        ])
+
+    def testTariffChangeIsProrated(self):
+        result = generateBillsForAccounts([self.account], day(1), day(11))
+        self.assertEqual((result.billsCreated, result.missingCharges), (1, []))
+        bill = Bill.objects.get(billedFromDttm=day(1))
+        # Units: 30 at 0.10, then 60 over the change (half at each rate), then 10 at 0.20: 14.00.
+        # Standing charge: five days at 0.50 and five at 1.00: 7.50.
+        self.assertEqual(bill.netAmount, Decimal('21.50'))
+        self.assertEqual(bill.grossAmount, Decimal('21.50'))
+
+    def testNoChargesInWindow(self):
+        before = day(1) - datetime.timedelta(days=60)
+        result = generateBillsForAccounts([self.account], before, before + datetime.timedelta(days=20))
+        self.assertEqual((result.billsCreated, result.missingCharges), (0, [self.account[0]]))
+
+
+class PublishingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generateSyntheticData(1, 1, datetime.date(2021, 1, 1), 1)
+        meterPoint = MeterPoint.objects.order_by('id').first()
+        MeterPoint.objects.exclude(pk=meterPoint.pk).update(nextPublishDttm=day(20))
+        MeterPoint.objects.filter(pk=meterPoint.pk).update(lastPublishDttm=day(1), nextPublishDttm=day(2))
+        reading = MeterReading.objects.create(meterPoint=meterPoint, value=1000, fromDttm=day(1))
+        # Recorded just before the window closed, by a transaction that may still have been open at the time.
+        MeterReading.objects.filter(pk=reading.pk).update(createdDttm=day(2) - datetime.timedelta(seconds=1))
 
-# Create your tests here.
+    def testWaitsForSafetyLag(self):
+        lag = datetime.timedelta(seconds=settings.METER_POINT_PUBLISH_SAFETY_LAG_SECONDS)
+        sink = MemoryQueueSink()
+        self.assertEqual(runPublisher(day(2) + lag / 2, sink).published, 0)
+        self.assertEqual(runPublisher(day(2) + lag, sink).published, 1)
+        message = sink.queue.get_nowait()
+        self.assertEqual(message['windowToDttm'], day(2))
+        self.assertEqual([reading['value'] for reading in message['readings']], [1000])
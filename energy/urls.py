@@ -0,0 +1,19 @@
+from django.urls import path
+
+from energy import views
+
+urlpatterns = [
+    path('<int:accountNumber>/usage/', views.accountUsage, name='accountUsage'),
+    path('<int:accountNumber>/meter-points/', views.meterPoints, name='meterPoints'),
+    path('<int:accountNumber>/meter-points/<int:identifier>/', views.meterPoint, name='meterPoint'),
+    path(
+        '<int:accountNumber>/meter-points/<int:identifier>/readings/', views.meterReadings, name='meterReadings'
+    ),
+    path(
+        '<int:accountNumber>/meter-points/<int:identifier>/readings/export/', views.exportMeterReadings,
+        name='exportMeterReadings'
+    ),
+    path('<int:accountNumber>/meter-points/<int:identifier>/usage/', views.meterPointUsage, name='meterPointUsage'),
+    path('<int:accountNumber>/bills/', views.bills, name='bills'),
+    path('<int:accountNumber>/bills/<int:number>/document/', views.billDocument, name='billDocument'),
+]
@@ -1,3 +1,184 @@
-from django.shortcuts import render
+import csv
+import datetime
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
+
+from accounts.views import getCustomerAccount
+from core.conditional import conditionalResponse, versionSignature
+from core.instrumentation import queryBudget
+from core.pagination import keysetResponse
+from core.routers import replicaReads
+from energy.archive import iterReadings
+from energy.documents import getBillDocumentDigest, getDocumentStore
+from energy.models import Bill, MeterPoint, MeterReading
+from energy.rollups import getAccountMonthlyUsage, getDailyUsage, getMonthlyUsage
+
+
+def getMeterPointId(customerAccount, identifier):
+    meterPointId = MeterPoint.objects.filter(
+        customerAccount=customerAccount, identifier=identifier
+    ).values_list('id', flat=True).first()
+    if meterPointId is None:
+        raise Http404('Meter point not found')
+    return meterPointId
+
+
+@queryBudget(6)
+@login_required
+def meterPoints(request, accountNumber):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    meterPoints = MeterPoint.objects.filter(customerAccount=customerAccount)
+    queryset = meterPoints.values(
+        'id', 'identifier', 'utilityMarket__internalKey', 'lastPublishDttm', 'nextPublishDttm',
+        'address__address1', 'address__postcode',
+    )
+    return conditionalResponse(
+        request, [versionSignature(meterPoints, related=['address'])],
+        lambda: keysetResponse(request, queryset, ['id']),
+    )
+
+
+@queryBudget(6)
+@login_required
+def meterPoint(request, accountNumber, identifier):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    meterPoints = MeterPoint.objects.filter(customerAccount=customerAccount, identifier=identifier)
+
+    def render():
+        return JsonResponse(get_object_or_404(
+            meterPoints.values(
+                'identifier', 'utilityMarket__internalKey', 'lastPublishDttm', 'nextPublishDttm',
+                'address__address1', 'address__address2', 'address__address3', 'address__address4',
+                'address__address5', 'address__postcode',
+            )
+        ))
+
+    return conditionalResponse(request, [versionSignature(meterPoints, related=['address'])], render)
+
+
+@queryBudget(7)
+@login_required
+@replicaReads()
+def meterReadings(request, accountNumber, identifier):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    # Readings are corrected by inserting new rows, so count and max id are enough to notice any change.
+    readings = MeterReading.objects.asOf().filter(
+        meterPoint__customerAccount=customerAccount, meterPoint__identifier=identifier
+    )
+
+    def render():
+        queryset = MeterReading.objects.asOf().filter(
+            meterPoint_id=getMeterPointId(customerAccount, identifier)
+        ).values('id', 'value', 'fromDttm', 'createdDttm')
+        return keysetResponse(request, queryset, ['fromDttm', 'id'])
+
+    return conditionalResponse(request, [versionSignature(readings, appendOnly=True)], render)
+
+
+@queryBudget(6)
+@login_required
+@replicaReads()
+def meterPointUsage(request, accountNumber, identifier):
+    # Served from the rollup tables, so a chart reads one row per bucket instead of every reading.
+    customerAccount = getCustomerAccount(request, accountNumber)
+    meterPointId = getMeterPointId(customerAccount, identifier)
+    today = datetime.date.today()
+    try:
+        fromDay = datetime.date.fromisoformat(request.GET.get('from') or today.replace(day=1).isoformat())
+        toDay = datetime.date.fromisoformat(request.GET.get('to') or today.isoformat())
+    except ValueError:
+        return JsonResponse({'error': 'from and to must be YYYY-MM-DD'}, status=400)
+
+    if request.GET.get('granularity') == 'month':
+        usage = getMonthlyUsage(meterPointId, fromDay.replace(day=1), toDay)
+    else:
+        usage = getDailyUsage(meterPointId, fromDay, toDay)
+    return JsonResponse({'results': list(usage)})
+
+
+@queryBudget(5)
+@login_required
+@replicaReads()
+def accountUsage(request, accountNumber):
+    # Monthly consumption per utility market across all of the account's meter points, from the rollup tables.
+    customerAccount = getCustomerAccount(request, accountNumber)
+    today = datetime.date.today()
+    try:
+        fromDay = datetime.date.fromisoformat(request.GET.get('from') or today.replace(month=1, day=1).isoformat())
+        toDay = datetime.date.fromisoformat(request.GET.get('to') or today.isoformat())
+    except ValueError:
+        return JsonResponse({'error': 'from and to must be YYYY-MM-DD'}, status=400)
+    usage = getAccountMonthlyUsage(customerAccount, fromDay.replace(day=1), toDay)
+    return JsonResponse({'results': list(usage)})
+
+
+class Echo:
+    # csv.writer target that hands each formatted line straight back to the response generator.
+
+    def write(self, value):
+        return value
+
+
+@queryBudget(6)
+@login_required
+@replicaReads()
+def exportMeterReadings(request, accountNumber, identifier):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    meterPointId = getMeterPointId(customerAccount, identifier)
+
+    def rows():
+        # The body is streamed after the view returns, so the replica routing has to wrap the generator itself.
+        writer = csv.writer(Echo())
+        yield writer.writerow(['identifier', 'value', 'fromDttm'])
+        with replicaReads():
+            # Archived months are merged in, so an export always covers the full history.
+            for _, fromDttm, value, _ in iterReadings([meterPointId]):
+                yield writer.writerow([identifier, value, fromDttm.isoformat()])
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="meter-readings-{}.csv"'.format(identifier)
+    return response
+
+
+@queryBudget(6)
+@login_required
+@replicaReads()
+def bills(request, accountNumber):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    bills = Bill.objects.filter(customerAccount=customerAccount)
+    queryset = bills.values(
+        'id', 'number', 'status', 'billedFromDttm', 'billedToDttm', 'issueDt', 'dueDt',
+        'netAmount', 'salesTaxAmount', 'grossAmount', 'currency__isoCode', 'createdDttm',
+    )
+    return conditionalResponse(
+        request, [versionSignature(bills)], lambda: keysetResponse(request, queryset, ['createdDttm', 'id'])
+    )
+
+
+@queryBudget(5)
+@login_required
+@replicaReads()
+def billDocument(request, accountNumber, number):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    digest = getBillDocumentDigest(customerAccount, number)
+    if digest is None:
+        raise Http404('Bill document not found')
+
+    # Stored documents never change, so their digest is a strong ETag and the file is sent straight from disk.
+    etag = quote_etag(digest)
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            documentFile = open(getDocumentStore().path(digest), 'rb')
+        except FileNotFoundError:
+            raise Http404('Bill document not found')
+        response = FileResponse(
+            documentFile, content_type='text/html; charset=utf-8', filename='bill-{}.html'.format(number)
+        )
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -3,6 +3,14 @@
 import os
 import sys
 
+# Batch jobs whose query counts and timings are reported; quick or interactive commands such as check,
+# makemigrations and shell are left alone.
+INSTRUMENTED_COMMANDS = {
+    'archivemeterreadings', 'collectpayments', 'estimatereadings', 'generatebills', 'generatesyntheticdata',
+    'importmeterreadings', 'publishmeterpoints', 'rebuildledger', 'rebuildsearchindex', 'reconcilestatement',
+    'refreshsearchindex', 'renderbilldocuments', 'runbills', 'snapshotbalances', 'updaterollups',
+}
+
 
 def main():
     """Run administrative tasks."""
@@ -15,7 +23,14 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
-    execute_from_command_line(sys.argv)
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in INSTRUMENTED_COMMANDS:
+        execute_from_command_line(sys.argv)
+        return
+
+    from core.instrumentation import instrument
+    with instrument(command):
+        execute_from_command_line(sys.argv)
 
 
 if __name__ == '__main__':
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
+from decimal import Decimal
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,17 +39,20 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'core',
     'accounts',
     'energy',
     'payment',
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,13 +81,33 @@ WSGI_APPLICATION = 'onepower.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# CONN_MAX_AGE keeps one persistent connection per worker thread and alias instead of reconnecting per request.
+# Django has no pool of its own; with PostgreSQL put PgBouncer in front of each alias to pool across processes.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Read replicas for reporting reads, e.g. ONEPOWER_REPLICA_DATABASES=db.replica1.sqlite3,db.replica2.sqlite3.
+# Locally `manage.py syncreplicas` copies the primary over each SQLite replica in place of real replication.
+for i, replicaName in enumerate(filter(None, os.environ.get('ONEPOWER_REPLICA_DATABASES', '').split(','))):
+    DATABASES['replica{}'.format(i + 1)] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / replicaName,
+        'CONN_MAX_AGE': 600,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# How long a client keeps reading from the primary after one of its requests wrote.
+REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -126,3 +151,120 @@ STATIC_URL = '/static/'
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Conditional GET
+
+# Rendered account and meter point responses are cached under their ETag; the ETag changes with the rows.
+RESOURCE_CACHE_TIMEOUT = 300
+
+
+# Customer search
+
+# accounts.search.DatabaseSearchBackend works on any database; the FTS5 backend needs SQLite.
+SEARCH_BACKEND = 'accounts.search.Fts5SearchBackend'
+
+SEARCH_BACKEND_OPTIONS = {}
+
+
+# Billing
+
+SALES_TAX_RATE = Decimal('0.20')
+
+BILL_PAYMENT_TERMS_DAYS = 14
+
+# Cached timelines are checked against the account's Charges on every read; this only bounds how long one is kept.
+CHARGE_TIMELINE_CACHE_TIMEOUT = 300
+
+
+# Reference numbers
+
+REFERENCE_NUMBER_BLOCK_SIZE = 1000
+
+# Alias of a second connection to the primary on which blocks claimed inside a transaction are committed at once,
+# instead of holding the sequence row locked until the caller commits. Leave unset on SQLite: it has a single writer
+# anyway, and a second connection would wait on the caller's own write lock.
+REFERENCE_NUMBER_CLAIM_DATABASE = None
+
+
+# Reference data
+
+# How often a cached lookup table checks its signature for changes made by other processes.
+REFERENCE_DATA_REFRESH_SECONDS = 60
+
+
+# Component navigation
+
+# The cached tree is checked against the tables on every read, so this only bounds how long an unused tree is kept.
+COMPONENT_TREE_CACHE_TIMEOUT = 300
+
+
+# Payment collection
+
+PAYMENT_GATEWAY = 'payment.gateways.FakePaymentGateway'
+
+PAYMENT_GATEWAY_OPTIONS = {}
+
+PAYMENT_COLLECTION_MAX_ATTEMPTS = 4
+
+PAYMENT_COLLECTION_RETRY_BACKOFF_SECONDS = 3600
+
+PAYMENT_COLLECTION_CLAIM_TIMEOUT_SECONDS = 900
+
+# PaymentMethodType.internalKey recorded on payments matched from a bank statement without a PaymentRequest.
+RECONCILIATION_BANK_TRANSFER_METHOD_TYPE = 'DIRECT_BANK_TRANSFER'
+
+
+# Usage rollups
+
+# Readings younger than this are left for the next run, so rows of a transaction still open when the watermark
+# moves are not skipped. Must exceed the longest reading insert transaction.
+ROLLUP_SAFETY_LAG_SECONDS = 300
+
+
+# Meter reading archive
+
+METER_READING_ARCHIVE_DIR = BASE_DIR / 'archive' / 'meter-readings'
+
+# Months whose end is older than this many months are closed and may be archived.
+METER_READING_ARCHIVE_AFTER_MONTHS = 13
+
+
+# Bill documents
+
+# Content-addressed store of rendered bill statements, one file per distinct document.
+BILL_DOCUMENT_DIR = BASE_DIR / 'documents' / 'bills'
+
+BILL_DOCUMENT_TEMPLATE = 'energy/bill.html'
+
+
+# Meter point publishing
+
+METER_POINT_PUBLISH_SINK = 'energy.sinks.JsonlFileSink'
+
+METER_POINT_PUBLISH_SINK_OPTIONS = {'path': str(BASE_DIR / 'publish' / 'meter-points-{pid}.jsonl')}
+
+METER_POINT_PUBLISH_INTERVAL_SECONDS = 86400
+
+METER_POINT_PUBLISH_CLAIM_TIMEOUT_SECONDS = 900
+
+# A window is published only once it closed this long ago, so readings of a transaction still open when it closed
+# are not skipped. Must exceed the longest reading insert transaction.
+METER_POINT_PUBLISH_SAFETY_LAG_SECONDS = 300
+
+
+# Instrumentation
+
+# Clients allowed to scrape /metrics.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'onepower.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
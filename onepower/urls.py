@@ -14,8 +14,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+
+from core import views as coreViews
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', coreViews.metrics, name='metrics'),
+    path('api/accounts/', include('accounts.urls')),
+    path('api/accounts/', include('energy.urls')),
+    path('api/accounts/', include('payment.urls')),
 ]
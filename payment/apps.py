@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class PaymentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payment'
+
+    def ready(self):
+        from core.refdata import referenceData
+        from payment.models import Currency, PaymentMethodType
+
+        referenceData.register(Currency, keyFields=('internalKey', 'isoCode'))
+        referenceData.register(PaymentMethodType)
@@ -0,0 +1,161 @@
+import bisect
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+
+from payment.models import Charges
+
+CHARGE_TIMELINE_CACHE_KEY = 'payment:chargeTimeline:{}'
+SECONDS_PER_DAY = Decimal(86400)
+
+PricedInterval = namedtuple(
+    'PricedInterval', ['fromDttm', 'toDttm', 'units', 'unitAmount', 'standingAmount', 'amount', 'complete']
+)
+
+
+def seconds(fromDttm, toDttm):
+    delta = toDttm - fromDttm
+    return Decimal(delta.days * 86400 + delta.seconds) + Decimal(delta.microseconds) / 1000000
+
+
+class ChargeTimeline:
+    """
+    An account's Charges flattened into disjoint [fromDttm, toDttm) segments, each holding the
+    (standingCharge, unitRate) that asOf() would pick inside it: latest fromDttm, then latest id.
+    Lookups bisect the segment starts.
+    """
+
+    def __init__(self, rows):
+        # rows are (id, fromDttm, toDttm, standingCharge, unitRate)
+        self.starts = []
+        self.ends = []
+        self.charges = []
+        boundaries = sorted({dttm for row in rows for dttm in (row[1], row[2])})
+        for fromDttm, toDttm in zip(boundaries, boundaries[1:]):
+            covering = [row for row in rows if row[1] <= fromDttm and row[2] >= toDttm]
+            if not covering:
+                continue
+            row = max(covering, key=lambda row: (row[1], row[0]))
+            charge = (row[3], row[4])
+            if self.ends and self.ends[-1] == fromDttm and self.charges[-1] == charge:
+                self.ends[-1] = toDttm
+            else:
+                self.starts.append(fromDttm)
+                self.ends.append(toDttm)
+                self.charges.append(charge)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def at(self, dttm):
+        i = bisect.bisect_right(self.starts, dttm) - 1
+        if i >= 0 and dttm < self.ends[i]:
+            return self.charges[i]
+        return None
+
+    def pieces(self, fromDttm, toDttm):
+        # (pieceFrom, pieceTo, charge) covering [fromDttm, toDttm) in order; charge is None where nothing applies.
+        i = max(bisect.bisect_right(self.starts, fromDttm) - 1, 0)
+        dttm = fromDttm
+        while dttm < toDttm:
+            while i < len(self.starts) and self.ends[i] <= dttm:
+                i += 1
+            if i == len(self.starts) or self.starts[i] >= toDttm:
+                yield dttm, toDttm, None
+                return
+            if self.starts[i] > dttm:
+                yield dttm, self.starts[i], None
+                dttm = self.starts[i]
+            pieceTo = min(self.ends[i], toDttm)
+            yield dttm, pieceTo, self.charges[i]
+            dttm = pieceTo
+
+
+def loadChargeTimelines(accountIds):
+    rows = defaultdict(list)
+    for row in Charges.objects.filter(customerAccount_id__in=accountIds).values_list(
+        'customerAccount_id', 'id', 'fromDttm', 'toDttm', 'standingCharge', 'unitRate'
+    ):
+        rows[row[0]].append(row[1:])
+    return {accountId: ChargeTimeline(rows[accountId]) for accountId in accountIds}
+
+
+def getChargeSignatures(accountIds):
+    # (row count, sum of versionNo, max id) of each account's Charges, soft deleted rows included. Any insert, update
+    # or delete by any process moves it; accounts without charges get None.
+    signatures = dict.fromkeys(accountIds)
+    rows = Charges.allWithDeleted.filter(customerAccount_id__in=accountIds).values('customerAccount_id').annotate(
+        count=Count('id'), versionSum=Sum('versionNo'), lastId=Max('id')
+    ).order_by().values_list('customerAccount_id', 'count', 'versionSum', 'lastId')
+    for accountId, *signature in rows:
+        signatures[accountId] = tuple(signature)
+    return signatures
+
+
+def getChargeTimelines(accountIds):
+    """
+    One cache round trip and one signature query for the batch, and one query loading whatever was not cached. A
+    cached timeline is only used while its signature still matches the account's Charges, so edits made in other
+    processes are seen even with a process local cache.
+    """
+    keys = {accountId: CHARGE_TIMELINE_CACHE_KEY.format(accountId) for accountId in set(accountIds)}
+    signatures = getChargeSignatures(list(keys))
+    cached = cache.get_many(keys.values())
+    timelines = {
+        accountId: cached[key][1] for accountId, key in keys.items()
+        if key in cached and cached[key][0] == signatures[accountId]
+    }
+    missing = [accountId for accountId in keys if accountId not in timelines]
+    if missing:
+        loaded = loadChargeTimelines(missing)
+        cache.set_many(
+            {keys[accountId]: (signatures[accountId], timeline) for accountId, timeline in loaded.items()},
+            settings.CHARGE_TIMELINE_CACHE_TIMEOUT,
+        )
+        timelines.update(loaded)
+    return timelines
+
+
+def getChargeTimeline(accountId):
+    return getChargeTimelines([accountId])[accountId]
+
+
+def priceInterval(timeline, fromDttm, toDttm, units):
+    """
+    Prices units consumed between two readings. Units are spread evenly over the interval and each piece is charged
+    at the unit rate in force there; the standing charge accrues per day, prorated to the second. complete is False
+    when part of the interval has no charge, in which case that part is left unpriced.
+    """
+    if fromDttm == toDttm:
+        charge = timeline.at(fromDttm)
+        unitAmount = units * charge[1] if charge else Decimal(0)
+        return PricedInterval(fromDttm, toDttm, units, unitAmount, Decimal(0), unitAmount, charge is not None)
+
+    total = seconds(fromDttm, toDttm)
+    unitAmount = Decimal(0)
+    standingAmount = Decimal(0)
+    complete = True
+    for pieceFrom, pieceTo, charge in timeline.pieces(fromDttm, toDttm):
+        if charge is None:
+            complete = False
+            continue
+        standingCharge, unitRate = charge
+        pieceSeconds = seconds(pieceFrom, pieceTo)
+        unitAmount += units * unitRate * pieceSeconds / total
+        standingAmount += standingCharge * pieceSeconds / SECONDS_PER_DAY
+    return PricedInterval(
+        fromDttm, toDttm, units, unitAmount, standingAmount, unitAmount + standingAmount, complete
+    )
+
+
+def priceReadings(timeline, readings):
+    # readings are (dttm, value) sorted by time; returns one PricedInterval per consecutive pair.
+    priced = []
+    for (previousDttm, previousValue), (dttm, value) in zip(readings, readings[1:]):
+        # Negative deltas (rollover, bad reads) are not charged, the same as in the usage rollups.
+        units = max(Decimal(str(value)) - Decimal(str(previousValue)), Decimal(0))
+        priced.append(priceInterval(timeline, previousDttm, dttm, units))
+    return priced
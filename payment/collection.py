@@ -0,0 +1,162 @@
+import asyncio
+import datetime
+import random
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.refdata import referenceData
+from payment.gateways import CollectionItem, GatewayResult, getPaymentGateway
+from payment.models import Currency, DirectDebit, PaymentRequest
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CONCURRENCY = 100
+
+CLAIMABLE_STATUSES = [PaymentRequest.Status.PENDING, PaymentRequest.Status.FAILED_PENDING_RETRY]
+
+
+class CollectionResult:
+
+    def __init__(self):
+        self.submitted = 0
+        self.statusCounts = defaultdict(int)
+        self.releasedClaims = 0
+
+
+def getRetryDelay(attemptCount):
+    # Exponential backoff with jitter so retried requests do not all land on the gateway at once.
+    base = settings.PAYMENT_COLLECTION_RETRY_BACKOFF_SECONDS * 2 ** max(attemptCount - 1, 0)
+    return datetime.timedelta(seconds=base * random.uniform(0.8, 1.2))
+
+
+def releaseStaleClaims():
+    # Requests claimed by a runner that died are made claimable again. The gateway is expected to treat the
+    # unchanged requestId as an idempotency key, so a resubmission cannot collect twice.
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.PAYMENT_COLLECTION_CLAIM_TIMEOUT_SECONDS)
+    return PaymentRequest.objects.filter(
+        status=PaymentRequest.Status.REQUESTING, claimedDttm__lt=cutoff
+    ).update(status=PaymentRequest.Status.PENDING, claimToken=None, claimedDttm=None, versionNo=F('versionNo') + 1)
+
+
+def claimBatch(collectionDt, batchSize):
+    now = timezone.now()
+    claimToken = uuid.uuid4().hex
+    due = PaymentRequest.objects.filter(
+        status__in=CLAIMABLE_STATUSES, collectionDt__lte=collectionDt
+    ).filter(Q(nextAttemptDttm__isnull=True) | Q(nextAttemptDttm__lte=now)).order_by('collectionDt', 'id')
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent runners skip each other's rows instead of queueing on the row locks.
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:batchSize])
+        else:
+            # SQLite has no row locks; the conditional update below serialises runners on the write lock instead.
+            ids = list(due.values_list('id', flat=True)[:batchSize])
+        if not ids:
+            return claimToken, []
+        PaymentRequest.objects.filter(id__in=ids, status__in=CLAIMABLE_STATUSES).update(
+            status=PaymentRequest.Status.REQUESTING, claimToken=claimToken, claimedDttm=now,
+            versionNo=F('versionNo') + 1,
+        )
+
+    return claimToken, loadCollectionItems(claimToken)
+
+
+def loadCollectionItems(claimToken):
+    requests = list(
+        PaymentRequest.objects.filter(claimToken=claimToken).values_list(
+            'id', 'requestId', 'transactionId', 'amount', 'currency_id', 'paymentMethod_id', 'attemptCount'
+        )
+    )
+    mandates = {
+        mandate[0]: mandate[1:]
+        for mandate in DirectDebit.objects.filter(
+            paymentMethod_id__in={request[5] for request in requests}
+        ).order_by('id').values_list('paymentMethod_id', 'sortCode', 'accountNo', 'accountName', 'referenceNumber')
+    }
+
+    items = []
+    for id, requestId, transactionId, amount, currencyId, paymentMethodId, attemptCount in requests:
+        sortCode, accountNo, accountName, mandateReference = mandates.get(paymentMethodId, (None, None, None, None))
+        items.append(CollectionItem(
+            id, requestId, transactionId, amount, referenceData.get(Currency, currencyId).isoCode,
+            sortCode, accountNo, accountName, mandateReference, attemptCount,
+        ))
+    return items
+
+
+def applyResults(claimToken, results):
+    # One UPDATE per outcome (and per attempt count for retries) rather than one per request.
+    now = timezone.now()
+    groups = defaultdict(list)
+    for item, result in results:
+        status = result.status
+        if status == GatewayResult.RETRY and item.attemptCount + 1 >= settings.PAYMENT_COLLECTION_MAX_ATTEMPTS:
+            status = GatewayResult.FAILED
+        groups[(status, item.attemptCount, result.message)].append(item.id)
+
+    counts = defaultdict(int)
+    with transaction.atomic():
+        for (status, attemptCount, message), ids in groups.items():
+            fields = {
+                'attemptCount': F('attemptCount') + 1,
+                'claimToken': None,
+                'claimedDttm': None,
+                'gatewayResponse': message,
+                'versionNo': F('versionNo') + 1,
+            }
+            if status == GatewayResult.SUCCESSFUL:
+                fields['status'] = PaymentRequest.Status.SUCCESSFUL
+            elif status == GatewayResult.IN_PROGRESS:
+                fields['status'] = PaymentRequest.Status.IN_PROGRESS_PENDING
+            elif status == GatewayResult.RETRY:
+                fields['status'] = PaymentRequest.Status.FAILED_PENDING_RETRY
+                fields['nextAttemptDttm'] = now + getRetryDelay(attemptCount + 1)
+            else:
+                fields['status'] = PaymentRequest.Status.FAILED
+            # Only rows still held by this claim are touched, so a released and reclaimed row is left alone.
+            PaymentRequest.objects.filter(id__in=ids, claimToken=claimToken).update(**fields)
+            counts[fields['status']] += len(ids)
+    return counts
+
+
+async def submitItem(gateway, semaphore, item):
+    async with semaphore:
+        try:
+            return item, await gateway.submit(item)
+        except Exception as e:
+            return item, GatewayResult(GatewayResult.RETRY, repr(e))
+
+
+async def runCollection(collectionDt, gateway=None, batchSize=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY):
+    gateway = gateway or getPaymentGateway()
+    semaphore = asyncio.Semaphore(concurrency)
+    result = CollectionResult()
+    result.releasedClaims = await sync_to_async(releaseStaleClaims)()
+
+    try:
+        nextBatch = asyncio.ensure_future(sync_to_async(claimBatch)(collectionDt, batchSize))
+        while True:
+            claimToken, items = await nextBatch
+            if not items:
+                break
+            # Claim the next batch while this one is with the gateway.
+            nextBatch = asyncio.ensure_future(sync_to_async(claimBatch)(collectionDt, batchSize))
+            results = await asyncio.gather(*(submitItem(gateway, semaphore, item) for item in items))
+            counts = await sync_to_async(applyResults)(claimToken, results)
+            result.submitted += len(items)
+            for status, count in counts.items():
+                result.statusCounts[status] += count
+    finally:
+        await gateway.close()
+
+    return result
+
+
+def collectPayments(collectionDt, gateway=None, batchSize=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY):
+    return asyncio.run(runCollection(collectionDt, gateway, batchSize, concurrency))
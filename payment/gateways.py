@@ -0,0 +1,78 @@
+import asyncio
+import random
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class GatewayResult:
+    SUCCESSFUL = 'SUCCESSFUL'
+    IN_PROGRESS = 'IN_PROGRESS'
+    RETRY = 'RETRY'
+    FAILED = 'FAILED'
+
+    def __init__(self, status, message=''):
+        self.status = status
+        self.message = message
+
+
+class CollectionItem:
+    # Everything a gateway needs to submit one PaymentRequest, loaded in bulk before submission.
+
+    def __init__(self, id, requestId, transactionId, amount, currency, sortCode, accountNo, accountName,
+                 mandateReference, attemptCount):
+        self.id = id
+        self.requestId = requestId
+        self.transactionId = transactionId
+        self.amount = amount
+        self.currency = currency
+        self.sortCode = sortCode
+        self.accountNo = accountNo
+        self.accountName = accountName
+        self.mandateReference = mandateReference
+        self.attemptCount = attemptCount
+
+
+class PaymentGateway:
+    # requestId is stable across retries and should be sent as the idempotency key.
+
+    async def submit(self, item):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class FakePaymentGateway(PaymentGateway):
+    # Local stand-in for development and tests; outcomes are random but reproducible with a seed.
+
+    def __init__(self, latency=0.0, retryRate=0.0, failureRate=0.0, inProgressRate=0.0, seed=None):
+        self.latency = latency
+        self.retryRate = retryRate
+        self.failureRate = failureRate
+        self.inProgressRate = inProgressRate
+        self.random = random.Random(seed)
+        self.submitted = []
+
+    async def submit(self, item):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.submitted.append(item.requestId)
+
+        if item.sortCode is None or item.accountNo is None:
+            return GatewayResult(GatewayResult.FAILED, 'No direct debit mandate')
+
+        draw = self.random.random()
+        if draw < self.failureRate:
+            return GatewayResult(GatewayResult.FAILED, 'Declined')
+        draw -= self.failureRate
+        if draw < self.retryRate:
+            return GatewayResult(GatewayResult.RETRY, 'Temporarily unavailable')
+        draw -= self.retryRate
+        if draw < self.inProgressRate:
+            return GatewayResult(GatewayResult.IN_PROGRESS, 'Accepted')
+        return GatewayResult(GatewayResult.SUCCESSFUL, 'Collected')
+
+
+def getPaymentGateway():
+    return import_string(settings.PAYMENT_GATEWAY)(**settings.PAYMENT_GATEWAY_OPTIONS)
@@ -0,0 +1,279 @@
+import datetime
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Max, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+from accounts.models import CustomerAccount
+from energy.models import Bill
+from payment.models import AccountBalance, BalanceSnapshot, LedgerEntry, Payment
+
+DEFAULT_CHUNK_SIZE = 500
+BALANCE_UPDATE_BATCH_SIZE = 500
+ZERO = Decimal('0.00')
+
+EntryType = LedgerEntry.EntryType
+
+Posting = namedtuple('Posting', ['accountId', 'entryType', 'amount', 'postedDttm', 'billId', 'paymentId'])
+
+
+class LedgerRebuildResult:
+
+    def __init__(self):
+        self.accountsProcessed = 0
+        self.entriesWritten = 0
+
+
+def startOfDay(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def signedAmount(posting):
+    # Bills increase what the customer owes, payments reduce it.
+    return posting.amount if posting.entryType == EntryType.BILL else -posting.amount
+
+
+def buildEntries(postings, balances):
+    # postings must be in posting order per account; balances is updated in place to the closing balance.
+    entries = []
+    for posting in postings:
+        amount = signedAmount(posting)
+        balances[posting.accountId] = balances.get(posting.accountId, ZERO) + amount
+        entries.append(LedgerEntry(
+            customerAccount_id=posting.accountId,
+            entryType=posting.entryType,
+            bill_id=posting.billId,
+            payment_id=posting.paymentId,
+            amount=amount,
+            balance=balances[posting.accountId],
+            postedDttm=posting.postedDttm,
+        ))
+    return entries
+
+
+def setAccountBalances(balances):
+    accountIds = sorted(balances)
+    outputField = DecimalField(max_digits=14, decimal_places=2)
+    for start in range(0, len(accountIds), BALANCE_UPDATE_BATCH_SIZE):
+        batch = accountIds[start:start + BALANCE_UPDATE_BATCH_SIZE]
+        AccountBalance.objects.filter(customerAccount_id__in=batch).update(balance=Case(
+            *[When(customerAccount_id=accountId, then=Value(balances[accountId], outputField)) for accountId in batch],
+            output_field=outputField,
+        ))
+
+
+def splitBackdated(postings, latestDttms):
+    # Postings dated after everything already on their account can take the running balance as it stands; the rest
+    # land between existing entries.
+    current, backdated = [], []
+    for posting in postings:
+        latestDttm = latestDttms.get(posting.accountId)
+        if latestDttm is not None and posting.postedDttm < latestDttm:
+            backdated.append(posting)
+        else:
+            current.append(posting)
+            latestDttms[posting.accountId] = posting.postedDttm
+    return current, backdated
+
+
+def postBackdated(posting, balances):
+    # The entry takes its balance from the one before it in posting order, every later entry moves by its amount, and
+    # snapshots from its day on no longer hold and are dropped until the next takeBalanceSnapshots.
+    amount = signedAmount(posting)
+    entries = LedgerEntry.objects.filter(customerAccount_id=posting.accountId)
+    opening = entries.filter(postedDttm__lte=posting.postedDttm).order_by('-postedDttm', '-id').values_list(
+        'balance', flat=True
+    ).first()
+    entries.filter(postedDttm__gt=posting.postedDttm).update(balance=F('balance') + amount)
+    BalanceSnapshot.objects.filter(
+        customerAccount_id=posting.accountId, snapshotDt__gte=timezone.localdate(posting.postedDttm)
+    ).delete()
+    balances[posting.accountId] = balances.get(posting.accountId, ZERO) + amount
+    return LedgerEntry.objects.create(
+        customerAccount_id=posting.accountId,
+        entryType=posting.entryType,
+        bill_id=posting.billId,
+        payment_id=posting.paymentId,
+        amount=amount,
+        balance=(opening or ZERO) + amount,
+        postedDttm=posting.postedDttm,
+    )
+
+
+def postEntries(postings):
+    if not postings:
+        return []
+    accountIds = sorted({posting.accountId for posting in postings})
+
+    with transaction.atomic():
+        AccountBalance.objects.bulk_create(
+            [AccountBalance(customerAccount_id=accountId) for accountId in accountIds], ignore_conflicts=True
+        )
+        # The balance rows are locked in id order, so concurrent posters queue per account without deadlocking and
+        # each entry's running balance follows from the one posted before it.
+        balances = dict(
+            AccountBalance.objects.select_for_update().filter(customerAccount_id__in=accountIds).order_by(
+                'customerAccount_id'
+            ).values_list('customerAccount_id', 'balance')
+        )
+        latestDttms = dict(
+            LedgerEntry.objects.filter(customerAccount_id__in=accountIds).values('customerAccount_id').annotate(
+                latestDttm=Max('postedDttm')
+            ).values_list('customerAccount_id', 'latestDttm')
+        )
+        current, backdated = splitBackdated(postings, latestDttms)
+        entries = LedgerEntry.objects.bulk_create(buildEntries(current, balances))
+        entries.extend(postBackdated(posting, balances) for posting in backdated)
+        setAccountBalances(balances)
+    return entries
+
+
+def postBills(billIds):
+    return postEntries([
+        Posting(accountId, EntryType.BILL, grossAmount, acceptedDttm, billId, None)
+        for billId, accountId, grossAmount, acceptedDttm in Bill.objects.filter(id__in=billIds).order_by(
+            'acceptedDttm', 'id'
+        ).values_list('id', 'customerAccount_id', 'grossAmount', 'acceptedDttm')
+    ])
+
+
+def postPayments(payments):
+    payments = list(payments)
+    if any(payment.pk is None for payment in payments):
+        # bulk_create does not return primary keys on every backend; transactionId identifies the rows instead.
+        paymentIds = dict(
+            Payment.objects.filter(
+                transactionId__in=[payment.transactionId for payment in payments]
+            ).values_list('transactionId', 'id')
+        )
+        for payment in payments:
+            payment.pk = paymentIds[payment.transactionId]
+    return postEntries([
+        Posting(payment.customerAccount_id, EntryType.PAYMENT, payment.amount, payment.createdDttm, None, payment.pk)
+        for payment in payments
+    ])
+
+
+def getAccountBalance(customerAccount):
+    balance = AccountBalance.objects.filter(customerAccount=customerAccount).values_list('balance', flat=True).first()
+    return ZERO if balance is None else balance
+
+
+def getBalanceAsOf(customerAccount, dttm):
+    # One probe of the (customerAccount, postedDttm, id) index for the last entry at or before dttm.
+    balance = LedgerEntry.objects.filter(customerAccount=customerAccount, postedDttm__lte=dttm).order_by(
+        '-postedDttm', '-id'
+    ).values_list('balance', flat=True).first()
+    return ZERO if balance is None else balance
+
+
+def lastEntryBefore(dttm, field):
+    return Subquery(
+        LedgerEntry.objects.filter(customerAccount=OuterRef('pk'), postedDttm__lt=dttm).order_by(
+            '-postedDttm', '-id'
+        ).values(field)[:1]
+    )
+
+
+def takeBalanceSnapshots(snapshotDt, chunkSize=DEFAULT_CHUNK_SIZE):
+    # Closing balance at the end of snapshotDt for every account with ledger history.
+    endDttm = startOfDay(snapshotDt + datetime.timedelta(days=1))
+    accounts = AccountBalance.objects.order_by('customerAccount_id').values_list('customerAccount_id', flat=True)
+    lastId = None
+    snapshotCount = 0
+    while True:
+        page = accounts if lastId is None else accounts.filter(customerAccount_id__gt=lastId)
+        accountIds = list(page[:chunkSize])
+        if not accountIds:
+            return snapshotCount
+        rows = CustomerAccount.allWithDeleted.filter(id__in=accountIds).annotate(
+            lastEntryId=lastEntryBefore(endDttm, 'id'), closingBalance=lastEntryBefore(endDttm, 'balance'),
+        ).filter(lastEntryId__isnull=False).values_list('id', 'lastEntryId', 'closingBalance')
+        snapshots = [
+            BalanceSnapshot(customerAccount_id=accountId, snapshotDt=snapshotDt, balance=balance, lastEntryId=entryId)
+            for accountId, entryId, balance in rows
+        ]
+        with transaction.atomic():
+            BalanceSnapshot.objects.filter(customerAccount_id__in=accountIds, snapshotDt=snapshotDt).delete()
+            BalanceSnapshot.objects.bulk_create(snapshots)
+        snapshotCount += len(snapshots)
+        lastId = accountIds[-1]
+
+
+def replayFilter(dttmField, fullAccountIds, resumedAccountIds, resumeDttm):
+    condition = Q(customerAccount_id__in=fullAccountIds)
+    if resumedAccountIds:
+        condition |= Q(customerAccount_id__in=resumedAccountIds, **{dttmField + '__gte': resumeDttm})
+    return condition
+
+
+def getReplayPostings(fullAccountIds, resumedAccountIds, resumeDttm):
+    bills = Bill.objects.filter(status=Bill.Status.ACCEPTED, acceptedDttm__isnull=False).filter(
+        replayFilter('acceptedDttm', fullAccountIds, resumedAccountIds, resumeDttm)
+    ).values_list('customerAccount_id', 'grossAmount', 'acceptedDttm', 'id')
+    payments = Payment.objects.filter(
+        replayFilter('createdDttm', fullAccountIds, resumedAccountIds, resumeDttm)
+    ).values_list('customerAccount_id', 'amount', 'createdDttm', 'id')
+
+    postings = [
+        Posting(accountId, EntryType.BILL, amount, postedDttm, billId, None)
+        for accountId, amount, postedDttm, billId in bills
+    ] + [
+        Posting(accountId, EntryType.PAYMENT, amount, postedDttm, None, paymentId)
+        for accountId, amount, postedDttm, paymentId in payments
+    ]
+    postings.sort(key=lambda posting: (posting.accountId, posting.postedDttm, posting.entryType, posting.billId or 0,
+                                       posting.paymentId or 0))
+    return postings
+
+
+def rebuildAccounts(accountIds, fromSnapshotDt=None):
+    # Replays bill acceptances and payments for a chunk of accounts. With fromSnapshotDt, accounts holding a snapshot
+    # for that day keep their entries up to it and only replay what was posted afterwards.
+    openingBalances = {}
+    resumeDttm = None
+    if fromSnapshotDt is not None:
+        resumeDttm = startOfDay(fromSnapshotDt + datetime.timedelta(days=1))
+        openingBalances = dict(
+            BalanceSnapshot.objects.filter(customerAccount_id__in=accountIds, snapshotDt=fromSnapshotDt).values_list(
+                'customerAccount_id', 'balance'
+            )
+        )
+    resumedAccountIds = list(openingBalances)
+    fullAccountIds = [accountId for accountId in accountIds if accountId not in openingBalances]
+    postings = getReplayPostings(fullAccountIds, resumedAccountIds, resumeDttm)
+
+    with transaction.atomic():
+        # Live postings for these accounts wait on their balance rows until the chunk is rebuilt.
+        list(AccountBalance.objects.select_for_update().filter(customerAccount_id__in=accountIds).values_list('pk'))
+        LedgerEntry.objects.filter(replayFilter('postedDttm', fullAccountIds, resumedAccountIds, resumeDttm)).delete()
+        staleSnapshots = BalanceSnapshot.objects.filter(customerAccount_id__in=accountIds)
+        if fromSnapshotDt is not None:
+            staleSnapshots = staleSnapshots.filter(snapshotDt__gt=fromSnapshotDt)
+        staleSnapshots.delete()
+
+        balances = dict(openingBalances)
+        entries = LedgerEntry.objects.bulk_create(buildEntries(postings, balances), batch_size=DEFAULT_CHUNK_SIZE)
+        AccountBalance.objects.filter(customerAccount_id__in=accountIds).delete()
+        AccountBalance.objects.bulk_create([
+            AccountBalance(customerAccount_id=accountId, balance=balance) for accountId, balance in balances.items()
+        ])
+    return len(entries)
+
+
+def rebuildLedger(fromSnapshotDt=None, chunkSize=DEFAULT_CHUNK_SIZE, onChunk=None):
+    result = LedgerRebuildResult()
+    accounts = CustomerAccount.allWithDeleted.order_by('id').values_list('id', flat=True)
+    lastId = None
+    while True:
+        page = accounts if lastId is None else accounts.filter(id__gt=lastId)
+        accountIds = list(page[:chunkSize])
+        if not accountIds:
+            return result
+        result.entriesWritten += rebuildAccounts(accountIds, fromSnapshotDt)
+        result.accountsProcessed += len(accountIds)
+        lastId = accountIds[-1]
+        if onChunk is not None:
+            onChunk(lastId, result)
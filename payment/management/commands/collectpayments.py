@@ -0,0 +1,30 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.collection import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, collectPayments
+
+
+class Command(BaseCommand):
+    help = 'Submit every due PaymentRequest to the configured payment gateway and record the outcomes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', dest='collectionDt', default=None, help='collection date (YYYY-MM-DD), default today'
+        )
+        parser.add_argument('--batch-size', dest='batchSize', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+
+    def handle(self, *args, **options):
+        try:
+            collectionDt = datetime.date.fromisoformat(options['collectionDt'] or datetime.date.today().isoformat())
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD')
+
+        result = collectPayments(collectionDt, batchSize=options['batchSize'], concurrency=options['concurrency'])
+
+        if result.releasedClaims:
+            self.stderr.write('{} stale claims released'.format(result.releasedClaims))
+        for status, count in sorted(result.statusCounts.items()):
+            self.stdout.write('{}: {}'.format(status, count))
+        self.stdout.write(self.style.SUCCESS('{} payment requests submitted.'.format(result.submitted)))
@@ -0,0 +1,42 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.ledger import DEFAULT_CHUNK_SIZE, rebuildLedger
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild LedgerEntry rows and AccountBalance from accepted bills and payments, a chunk of accounts at a '
+        'time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-snapshot', dest='fromSnapshotDt', default=None,
+            help='YYYY-MM-DD; accounts with a BalanceSnapshot on this day only replay history after it',
+        )
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunkSize'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        fromSnapshotDt = None
+        if options['fromSnapshotDt']:
+            try:
+                fromSnapshotDt = datetime.date.fromisoformat(options['fromSnapshotDt'])
+            except ValueError:
+                raise CommandError('--from-snapshot must be YYYY-MM-DD')
+
+        verbosity = options['verbosity']
+
+        def onChunk(lastId, result):
+            if verbosity > 1:
+                self.stdout.write('accounts up to {}: {} entries written'.format(lastId, result.entriesWritten))
+
+        result = rebuildLedger(fromSnapshotDt, options['chunkSize'], onChunk)
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt the ledger for {} accounts, {} entries written.'.format(
+                result.accountsProcessed, result.entriesWritten
+            )
+        ))
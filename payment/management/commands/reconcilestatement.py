@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.reconciliation import DEFAULT_CHUNK_SIZE, reconcileStatementFile
+
+
+class Command(BaseCommand):
+    help = 'Reconcile a bank statement file (CSV or JSONL) against open payment requests and accepted bills.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='fileFormat', choices=['csv', 'jsonl'], default=None)
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunkSize'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        try:
+            reconciliationRun = reconcileStatementFile(options['path'], options['fileFormat'], options['chunkSize'])
+        except OSError as e:
+            raise CommandError(e)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Reconciliation run {}: {} lines, {} matched, {} exceptions.'.format(
+                reconciliationRun.pk, reconciliationRun.lineCount, reconciliationRun.matchedCount,
+                reconciliationRun.exceptionCount,
+            )
+        ))
@@ -0,0 +1,26 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.ledger import DEFAULT_CHUNK_SIZE, takeBalanceSnapshots
+
+
+class Command(BaseCommand):
+    help = 'Record each account\'s closing ledger balance for a day (yesterday by default) as a BalanceSnapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('snapshotDt', nargs='?', default=None, help='YYYY-MM-DD')
+        parser.add_argument('--chunk-size', dest='chunkSize', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunkSize'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        try:
+            snapshotDt = datetime.date.fromisoformat(
+                options['snapshotDt'] or (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+            )
+        except ValueError:
+            raise CommandError('snapshotDt must be YYYY-MM-DD')
+
+        snapshotCount = takeBalanceSnapshots(snapshotDt, options['chunkSize'])
+        self.stdout.write(self.style.SUCCESS('Recorded {} balance snapshots for {}.'.format(snapshotCount, snapshotDt)))
@@ -0,0 +1,157 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:52
+
+import core.references
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('energy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Currency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internalKey', models.CharField(max_length=2048)),
+                ('languageKey', models.CharField(max_length=2048)),
+                ('isoCode', models.CharField(max_length=2048)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PaymentMethod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('paymentMethodStatus', models.CharField(choices=[('PENDING', 'Pending'), ('ACTIVE', 'Active'), ('CANCELLED', 'Cancelled'), ('FAILED', 'Failed'), ('REQUESTING_ACTIVATION', 'RequestingActivation'), ('PENDING_CANCELLATION', 'PendingCancellation'), ('REQUESTING_CANCELLATION', 'RequestingCancellation'), ('FAILED_CANCELLATION', 'FailedCancellation'), ('PAUSED', 'Paused'), ('COOLING_OFF', 'CoolingOff')], default='PENDING', max_length=32)),
+                ('fromDttm', models.DateTimeField(default=datetime.date.today)),
+                ('toDttm', models.DateTimeField(default=datetime.datetime(9999, 12, 31, 23, 59, 59, 999999))),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.customeraccount')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PaymentMethodType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internalKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('languageKey', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('iconTbl', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='energy.icontbl')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PaymentRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requestId', models.PositiveBigIntegerField(default=core.references.ReferenceNumber('payment.PaymentRequest.requestId'))),
+                ('transactionId', models.PositiveBigIntegerField(default=core.references.ReferenceNumber('payment.transactionId'))),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('postedDt', models.DateField()),
+                ('collectionDt', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('REQUESTING', 'Requesting'), ('IN_PROGRESS_PENDING', 'In Progress Pending'), ('IN_PROGRESS_FAILED_PENDING_RETRY', 'In Progress Failed Pending Retry'), ('SUCCESSFUL', 'Successful'), ('CANCELLED', 'Cancelled'), ('FAILED_PENDING_RETRY', 'Failed Pending Retry'), ('FAILED_REQUESTING_AGAIN', 'Failed Requesting Again'), ('PENDING_AUTHORISATION', 'Pending Authorisation'), ('PENDING_FINAL_AUTHORISATION', 'Pending Final Authorisation')], default='PENDING', max_length=32)),
+                ('cancelledDttm', models.DateTimeField()),
+                ('paymentCancellationReason', models.TextField(blank=True, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('createdUser', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.employee')),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.currency')),
+                ('payee', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.customeraccount')),
+                ('paymentMethod', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.paymentmethod')),
+                ('paymentMethodType', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.paymentmethodtype')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='paymentmethod',
+            name='paymentMethodType',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.paymentmethodtype'),
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transactionId', models.PositiveBigIntegerField(default=core.references.ReferenceNumber('payment.transactionId'))),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.currency')),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.customeraccount')),
+                ('paymentMethodType', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.paymentmethodtype')),
+                ('paymentRequest', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.paymentrequest')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DirectDebit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sortCode', models.CharField(blank=True, max_length=2048, null=True)),
+                ('accountNo', models.PositiveBigIntegerField()),
+                ('accountName', models.CharField(blank=True, max_length=2048, null=True)),
+                ('referenceNumber', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('paymentMethod', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.paymentmethod')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Cheque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chequeNo', models.IntegerField()),
+                ('sortCode', models.CharField(blank=True, max_length=2048, null=True)),
+                ('accountNo', models.PositiveBigIntegerField()),
+                ('issueDt', models.DateField()),
+                ('referenceNumber', models.CharField(blank=True, max_length=2048, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('paymentMethod', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='payment.paymentmethod')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Charges',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('standingCharge', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('unitRate', models.DecimalField(decimal_places=6, max_digits=14)),
+                ('fromDttm', models.DateTimeField(default=datetime.date.today)),
+                ('toDttm', models.DateTimeField(default=datetime.datetime(9999, 12, 31, 23, 59, 59, 999999))),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('createdUser', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='accounts.customeraccount')),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='charges',
+            index=models.Index(fields=['customerAccount', 'fromDttm', 'toDttm', 'deleteFl'], name='payment_charges_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentmethod',
+            index=models.Index(fields=['customerAccount', 'fromDttm', 'toDttm', 'deleteFl'], name='payment_paymethod_asof_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_asof_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='charges',
+            name='payment_charges_asof_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='paymentmethod',
+            name='payment_paymethod_asof_idx',
+        ),
+        migrations.AddIndex(
+            model_name='charges',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount', 'fromDttm', 'toDttm'], name='payment_charges_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount'], name='payment_payment_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentmethod',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount', 'fromDttm', 'toDttm'], name='payment_paymethod_asof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentrequest',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['collectionDt', 'status'], name='payment_payreq_due_idx'),
+        ),
+    ]
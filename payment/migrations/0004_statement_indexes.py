@@ -0,0 +1,21 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_live_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='payment',
+            name='payment_payment_live_idx',
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['customerAccount', 'createdDttm', 'id'], name='payment_payment_live_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_statement_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='paymentrequest',
+            name='payment_payreq_due_idx',
+        ),
+        migrations.AddField(
+            model_name='paymentrequest',
+            name='attemptCount',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='paymentrequest',
+            name='claimToken',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentrequest',
+            name='claimedDttm',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentrequest',
+            name='gatewayResponse',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentrequest',
+            name='nextAttemptDttm',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='paymentrequest',
+            name='cancelledDttm',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='paymentrequest',
+            index=models.Index(condition=models.Q(('deleteFl', False)), fields=['status', 'collectionDt'], name='payment_payreq_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentrequest',
+            index=models.Index(fields=['claimToken'], name='payment_payreq_claim_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_live_indexes'),
+        ('energy', '0009_reconciliation'),
+        ('payment', '0005_collection_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billedAmount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paidAmount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('modifiedDttm', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReconciliationException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('lineNo', models.IntegerField()),
+                ('reason', models.CharField(choices=[('MALFORMED', 'Malformed'), ('DUPLICATE', 'Duplicate'), ('AMOUNT_MISMATCH', 'Amount Mismatch'), ('CURRENCY_MISMATCH', 'Currency Mismatch'), ('UNKNOWN_ACCOUNT', 'Unknown Account'), ('NO_OPEN_ITEM', 'No Open Item')], max_length=32)),
+                ('transactionId', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('accountNumber', models.BigIntegerField(blank=True, null=True)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('currencyCode', models.CharField(blank=True, max_length=16, null=True)),
+                ('detail', models.TextField(blank=True, null=True)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deleteFl', models.BooleanField(default=False)),
+                ('fileName', models.CharField(blank=True, max_length=2048, null=True)),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('lineCount', models.IntegerField(default=0)),
+                ('matchedCount', models.IntegerField(default=0)),
+                ('exceptionCount', models.IntegerField(default=0)),
+                ('reference', models.CharField(blank=True, max_length=2048, null=True)),
+                ('orderNo', models.IntegerField(blank=True, default=1, null=True)),
+                ('versionNo', models.IntegerField(blank=True, default=1, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='bill',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='energy.bill'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='paymentRequest',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='payment.paymentrequest'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['transactionId'], name='payment_payment_txn_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentrequest',
+            index=models.Index(fields=['transactionId'], name='payment_payreq_txn_idx'),
+        ),
+        migrations.AddField(
+            model_name='reconciliationexception',
+            name='reconciliationRun',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='payment.reconciliationrun'),
+        ),
+        migrations.AddField(
+            model_name='accountbalance',
+            name='customerAccount',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance', to='accounts.customeraccount'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('energy', '0009_reconciliation'),
+        ('accounts', '0004_live_indexes'),
+        ('payment', '0006_reconciliation'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='accountbalance',
+            name='billedAmount',
+        ),
+        migrations.RemoveField(
+            model_name='accountbalance',
+            name='paidAmount',
+        ),
+        migrations.AddField(
+            model_name='accountbalance',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entryType', models.CharField(choices=[('BILL', 'Bill'), ('PAYMENT', 'Payment')], max_length=16)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('postedDttm', models.DateTimeField()),
+                ('bill', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='energy.bill')),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledgerEntries', to='accounts.customeraccount')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='payment.payment')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshotDt', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('lastEntryId', models.BigIntegerField()),
+                ('createdDttm', models.DateTimeField(auto_now_add=True)),
+                ('customerAccount', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balanceSnapshots', to='accounts.customeraccount')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['customerAccount', 'postedDttm', 'id'], name='payment_ledger_asof_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgerentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('bill__isnull', False)), fields=('bill',), name='payment_ledger_bill_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgerentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('payment__isnull', False)), fields=('payment',), name='payment_ledger_payment_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='balancesnapshot',
+            constraint=models.UniqueConstraint(fields=('customerAccount', 'snapshotDt'), name='payment_snapshot_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.13 on 2026-10-18 10:27
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def markGatewayFailures(apps, schemaEditor):
+    # Collection used to cancel requests the gateway declined, recording its response as the cancellation reason.
+    PaymentRequest = apps.get_model('payment', 'PaymentRequest')
+    PaymentRequest.objects.filter(
+        status='CANCELLED', attemptCount__gt=0, paymentCancellationReason=F('gatewayResponse')
+    ).update(status='FAILED', cancelledDttm=None, paymentCancellationReason=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0007_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentrequest',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('REQUESTING', 'Requesting'), ('IN_PROGRESS_PENDING', 'In Progress Pending'), ('IN_PROGRESS_FAILED_PENDING_RETRY', 'In Progress Failed Pending Retry'), ('SUCCESSFUL', 'Successful'), ('CANCELLED', 'Cancelled'), ('FAILED', 'Failed'), ('FAILED_PENDING_RETRY', 'Failed Pending Retry'), ('FAILED_REQUESTING_AGAIN', 'Failed Requesting Again'), ('PENDING_AUTHORISATION', 'Pending Authorisation'), ('PENDING_FINAL_AUTHORISATION', 'Pending Final Authorisation')], default='PENDING', max_length=32),
+        ),
+        migrations.RunPython(markGatewayFailures, migrations.RunPython.noop),
+    ]
@@ -1,40 +1,26 @@
-import datetime
-import random
-
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
-from accounts.models import CustomerAccount, Employee
-from energy.models import IconTbl
-
+from core.models import EffectiveDatedModel, SoftDeleteModel, asOfIndex, liveIndex
+from core.references import ReferenceNumber
 
-def generateReferenceNumber():
-    return random.randint(1000000000, 9999999999)
 
-
-class Currency(models.Model):
+class Currency(SoftDeleteModel):
     internalKey = models.CharField(max_length=2048)
     languageKey = models.CharField(max_length=2048)
     isoCode = models.CharField(max_length=2048)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class PaymentMethodType(models.Model):
+class PaymentMethodType(SoftDeleteModel):
     # For example Direct Debit, Credit/Debit Card, Cheque, Cash, Direct Bank Transfer
     internalKey = models.CharField(max_length=2048, blank=True, null=True)
     languageKey = models.CharField(max_length=2048, blank=True, null=True)
-    iconTbl = models.ForeignKey(IconTbl, on_delete=models.PROTECT)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+    iconTbl = models.ForeignKey('energy.IconTbl', on_delete=models.PROTECT)
 
 
-class PaymentMethod(models.Model):
+class PaymentMethod(EffectiveDatedModel):
     # An existing method of payment against an Account
 
     class PaymentMethodStatus(models.TextChoices):
@@ -50,43 +36,34 @@ class PaymentMethod(models.Model):
         COOLING_OFF = 'COOLING_OFF', _('CoolingOff')
 
     paymentMethodType = models.ForeignKey(PaymentMethodType, on_delete=models.PROTECT)
-    customerAccount = models.ForeignKey(CustomerAccount, on_delete=models.PROTECT)
-    paymentMethodStatus = models.CharField(choices=PaymentMethodStatus.choices, default=PaymentMethodStatus.PENDING)
-    fromDttm = models.DateTimeField(default=datetime.date.today)
-    toDttm = models.DateTimeField(default=datetime.datetime.max)
+    customerAccount = models.ForeignKey('accounts.CustomerAccount', on_delete=models.PROTECT)
+    paymentMethodStatus = models.CharField(
+        max_length=32, choices=PaymentMethodStatus.choices, default=PaymentMethodStatus.PENDING
+    )
     createdDttm = models.DateTimeField(auto_now_add=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+
+    class Meta:
+        indexes = [asOfIndex('customerAccount', 'payment_paymethod_asof_idx')]
 
 
-class DirectDebit(models.Model):
+class DirectDebit(SoftDeleteModel):
     paymentMethod = models.ForeignKey(PaymentMethod, on_delete=models.PROTECT)
     sortCode = models.CharField(max_length=2048, blank=True, null=True)
     accountNo = models.PositiveBigIntegerField()
     accountName = models.CharField(max_length=2048, blank=True, null=True)
     referenceNumber = models.CharField(max_length=2048, blank=True, null=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class Cheque(models.Model):
+class Cheque(SoftDeleteModel):
     paymentMethod = models.ForeignKey(PaymentMethod, on_delete=models.PROTECT)
     chequeNo = models.IntegerField()
     sortCode = models.CharField(max_length=2048, blank=True, null=True)
     accountNo = models.PositiveBigIntegerField()
     issueDt = models.DateField()
     referenceNumber = models.CharField(max_length=2048, blank=True, null=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
 
 
-class PaymentRequest(models.Model):
+class PaymentRequest(SoftDeleteModel):
     class Status(models.TextChoices):
         PENDING = 'PENDING', _('Pending')
         REQUESTING = 'REQUESTING', _('Requesting')
@@ -94,55 +71,142 @@ class PaymentRequest(models.Model):
         IN_PROGRESS_FAILED_PENDING_RETRY = 'IN_PROGRESS_FAILED_PENDING_RETRY', _('In Progress Failed Pending Retry')
         SUCCESSFUL = 'SUCCESSFUL', _('Successful')
         CANCELLED = 'CANCELLED', _('Cancelled')
+        # Declined by the gateway, or out of retries; gatewayResponse says why.
+        FAILED = 'FAILED', _('Failed')
         FAILED_PENDING_RETRY = 'FAILED_PENDING_RETRY', _('Failed Pending Retry')
         FAILED_REQUESTING_AGAIN = 'FAILED_REQUESTING_AGAIN', _('Failed Requesting Again')
         PENDING_AUTHORISATION = 'PENDING_AUTHORISATION', _('Pending Authorisation')
         PENDING_FINAL_AUTHORISATION = 'PENDING_FINAL_AUTHORISATION', _('Pending Final Authorisation')
 
     paymentMethodType = models.ForeignKey(PaymentMethodType, on_delete=models.PROTECT)
-    requestId = models.PositiveBigIntegerField(default=generateReferenceNumber)
-    transactionId = models.PositiveBigIntegerField(default=generateReferenceNumber)
+    requestId = models.PositiveBigIntegerField(default=ReferenceNumber('payment.PaymentRequest.requestId'))
+    transactionId = models.PositiveBigIntegerField(default=ReferenceNumber('payment.transactionId'))
     paymentMethod = models.ForeignKey(PaymentMethod, on_delete=models.PROTECT)
-    createdUser = models.ForeignKey(Employee, on_delete=models.SET_NULL)
+    createdUser = models.ForeignKey('accounts.Employee', on_delete=models.SET_NULL, blank=True, null=True)
     createdDttm = models.DateTimeField(auto_now_add=True)
     postedDt = models.DateField()
     collectionDt = models.DateField()
-    status = models.CharField(choices=Status.choices, default=Status.PENDING)
+    status = models.CharField(max_length=32, choices=Status.choices, default=Status.PENDING)
     currency = models.ForeignKey(Currency, on_delete=models.PROTECT)
-    cancelledDttm = models.DateTimeField()
+    cancelledDttm = models.DateTimeField(blank=True, null=True)
     paymentCancellationReason = models.TextField(blank=True, null=True)
-    amount = models.DecimalField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
     description = models.TextField(blank=True, null=True)
-    payee = models.ForeignKey(CustomerAccount, on_delete=models.PROTECT)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
-
-
-class Payment(models.Model):
+    payee = models.ForeignKey('accounts.CustomerAccount', on_delete=models.PROTECT)
+    attemptCount = models.IntegerField(default=0)
+    nextAttemptDttm = models.DateTimeField(blank=True, null=True)
+    claimToken = models.CharField(max_length=32, blank=True, null=True)
+    claimedDttm = models.DateTimeField(blank=True, null=True)
+    gatewayResponse = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            liveIndex(['status', 'collectionDt'], 'payment_payreq_due_idx'),
+            models.Index(fields=['claimToken'], name='payment_payreq_claim_idx'),
+            models.Index(fields=['transactionId'], name='payment_payreq_txn_idx'),
+        ]
+
+
+class Payment(SoftDeleteModel):
     paymentMethodType = models.ForeignKey(PaymentMethodType, on_delete=models.PROTECT)
-    paymentRequest = models.ForeignKey(PaymentRequest, on_delete=models.PROTECT)
-    transactionId = models.PositiveBigIntegerField(default=generateReferenceNumber)
-    customerAccount = models.ForeignKey(CustomerAccount, on_delete=models.PROTECT)
+    paymentRequest = models.ForeignKey(PaymentRequest, on_delete=models.PROTECT, blank=True, null=True)
+    bill = models.ForeignKey('energy.Bill', on_delete=models.PROTECT, blank=True, null=True, related_name='payments')
+    transactionId = models.PositiveBigIntegerField(default=ReferenceNumber('payment.transactionId'))
+    customerAccount = models.ForeignKey('accounts.CustomerAccount', on_delete=models.PROTECT)
     createdDttm = models.DateTimeField(auto_now_add=True)
     currency = models.ForeignKey(Currency, on_delete=models.PROTECT)
-    amount = models.DecimalField()
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
-
-
-class Charges(models.Model):
-    customerAccount = models.ForeignKey(CustomerAccount, on_delete=models.PROTECT)
-    standingCharge = models.DecimalField()
-    unitRate = models.DecimalField()
-    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL)
-    fromDttm = models.DateTimeField(default=datetime.date.today)
-    toDttm = models.DateTimeField(default=datetime.datetime.max)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            liveIndex(['customerAccount', 'createdDttm', 'id'], 'payment_payment_live_idx'),
+            models.Index(fields=['transactionId'], name='payment_payment_txn_idx'),
+        ]
+
+
+class Charges(EffectiveDatedModel):
+    customerAccount = models.ForeignKey('accounts.CustomerAccount', on_delete=models.PROTECT)
+    standingCharge = models.DecimalField(max_digits=14, decimal_places=2)
+    # Per-unit rates need more precision than money amounts.
+    unitRate = models.DecimalField(max_digits=14, decimal_places=6)
+    createdUser = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    createdDttm = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [asOfIndex('customerAccount', 'payment_charges_asof_idx')]
+
+
+class AccountBalance(models.Model):
+    # Current balance per account, maintained by the ledger so it never needs a scan of bill/payment history.
+    customerAccount = models.OneToOneField('accounts.CustomerAccount', on_delete=models.CASCADE, related_name='balance')
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    modifiedDttm = models.DateTimeField(auto_now=True)
+
+
+class LedgerEntry(models.Model):
+    # Append-only: corrections are posted as new entries. A backdated posting moves the balance of the entries after
+    # it; otherwise only rebuildLedger rewrites existing rows.
+    class EntryType(models.TextChoices):
+        BILL = 'BILL', _('Bill')
+        PAYMENT = 'PAYMENT', _('Payment')
+
+    customerAccount = models.ForeignKey(
+        'accounts.CustomerAccount', on_delete=models.PROTECT, related_name='ledgerEntries'
+    )
+    entryType = models.CharField(max_length=16, choices=EntryType.choices)
+    bill = models.ForeignKey('energy.Bill', on_delete=models.PROTECT, blank=True, null=True)
+    payment = models.ForeignKey(Payment, on_delete=models.PROTECT, blank=True, null=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    postedDttm = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['customerAccount', 'postedDttm', 'id'], name='payment_ledger_asof_idx')]
+        constraints = [
+            models.UniqueConstraint(fields=['bill'], condition=Q(bill__isnull=False), name='payment_ledger_bill_uniq'),
+            models.UniqueConstraint(
+                fields=['payment'], condition=Q(payment__isnull=False), name='payment_ledger_payment_uniq'
+            ),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    customerAccount = models.ForeignKey(
+        'accounts.CustomerAccount', on_delete=models.CASCADE, related_name='balanceSnapshots'
+    )
+    snapshotDt = models.DateField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    lastEntryId = models.BigIntegerField()
+    createdDttm = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['customerAccount', 'snapshotDt'], name='payment_snapshot_uniq'),
+        ]
+
+
+class ReconciliationRun(SoftDeleteModel):
+    fileName = models.CharField(max_length=2048, blank=True, null=True)
     createdDttm = models.DateTimeField(auto_now_add=True)
-    reference = models.CharField(max_length=2048, blank=True, null=True)
-    deleteFl = models.BooleanField(default=False)
-    orderNo = models.IntegerField(default=1, blank=True, null=True)
-    versionNo = models.IntegerField(default=1, blank=True, null=True)
+    lineCount = models.IntegerField(default=0)
+    matchedCount = models.IntegerField(default=0)
+    exceptionCount = models.IntegerField(default=0)
+
+
+class ReconciliationException(SoftDeleteModel):
+    class Reason(models.TextChoices):
+        MALFORMED = 'MALFORMED', _('Malformed')
+        DUPLICATE = 'DUPLICATE', _('Duplicate')
+        AMOUNT_MISMATCH = 'AMOUNT_MISMATCH', _('Amount Mismatch')
+        CURRENCY_MISMATCH = 'CURRENCY_MISMATCH', _('Currency Mismatch')
+        UNKNOWN_ACCOUNT = 'UNKNOWN_ACCOUNT', _('Unknown Account')
+        NO_OPEN_ITEM = 'NO_OPEN_ITEM', _('No Open Item')
+
+    reconciliationRun = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='exceptions')
+    lineNo = models.IntegerField()
+    reason = models.CharField(max_length=32, choices=Reason.choices)
+    transactionId = models.PositiveBigIntegerField(blank=True, null=True)
+    accountNumber = models.BigIntegerField(blank=True, null=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    currencyCode = models.CharField(max_length=16, blank=True, null=True)
+    detail = models.TextField(blank=True, null=True)
@@ -0,0 +1,210 @@
+from collections import defaultdict, deque
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from accounts.models import CustomerAccount
+from core.files import chunked, detectFileFormat, iterRows
+from core.refdata import referenceData
+from energy.models import Bill
+from payment.ledger import postPayments
+from payment.models import (
+    Currency, Payment, PaymentMethodType, PaymentRequest, ReconciliationException, ReconciliationRun
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+PENNY = Decimal('0.01')
+
+Reason = ReconciliationException.Reason
+
+
+class StatementLine:
+
+    def __init__(self, lineNo, transactionId, amount, currencyCode, accountNumber, reference):
+        self.lineNo = lineNo
+        self.transactionId = transactionId
+        self.amount = amount
+        self.currencyCode = currencyCode
+        self.accountNumber = accountNumber
+        self.reference = reference
+
+
+def parseOptionalInt(value):
+    value = str(value or '').strip()
+    return int(value) if value else None
+
+
+def parseStatementLine(lineNo, row):
+    if not isinstance(row, dict):
+        raise ValueError('malformed row')
+    try:
+        amount = Decimal(str(row.get('amount')).strip()).quantize(PENNY)
+    except InvalidOperation:
+        raise ValueError('invalid amount {!r}'.format(row.get('amount')))
+    currencyCode = str(row.get('currency') or '').strip()
+    if not currencyCode:
+        raise ValueError('currency is required')
+    return StatementLine(
+        lineNo, parseOptionalInt(row.get('transactionId')), amount, currencyCode,
+        parseOptionalInt(row.get('accountNumber')), row.get('reference') or None,
+    )
+
+
+class OpenItems:
+    # Hash indexes over the open requests and bills touched by one chunk of statement lines.
+
+    def __init__(self, lines):
+        transactionIds = {line.transactionId for line in lines if line.transactionId is not None}
+        accountNumbers = {line.accountNumber for line in lines if line.accountNumber is not None}
+
+        self.requests = {
+            request[0]: request[1:]
+            for request in PaymentRequest.objects.filter(transactionId__in=transactionIds).exclude(
+                status__in=[PaymentRequest.Status.CANCELLED, PaymentRequest.Status.FAILED]
+            ).values_list('transactionId', 'id', 'payee_id', 'amount', 'currency_id', 'paymentMethodType_id')
+        }
+        self.paidTransactionIds = set(
+            Payment.objects.filter(transactionId__in=transactionIds).values_list('transactionId', flat=True)
+        )
+        self.accounts = dict(
+            CustomerAccount.objects.filter(number__in=accountNumbers).values_list('number', 'id')
+        )
+
+        accountIds = set(self.accounts.values()) | {request[1] for request in self.requests.values()}
+        self.bills = defaultdict(deque)
+        for billId, accountId, currencyId, grossAmount, paidAmount in Bill.objects.filter(
+            customerAccount_id__in=accountIds, status=Bill.Status.ACCEPTED, paidAmount__lt=F('grossAmount')
+        ).order_by('dueDt', 'id').values_list('id', 'customerAccount_id', 'currency_id', 'grossAmount', 'paidAmount'):
+            self.bills[(accountId, currencyId, (grossAmount - paidAmount).quantize(PENNY))].append(billId)
+
+    def takeBill(self, accountId, currencyId, amount):
+        bills = self.bills.get((accountId, currencyId, amount))
+        return bills.popleft() if bills else None
+
+
+class ReconciliationChunk:
+
+    def __init__(self, reconciliationRun):
+        self.reconciliationRun = reconciliationRun
+        self.payments = []
+        self.requestIds = []
+        self.billIds = []
+        self.exceptions = []
+
+    def addException(self, lineNo, reason, line=None, detail=None):
+        self.exceptions.append(ReconciliationException(
+            reconciliationRun=self.reconciliationRun,
+            lineNo=lineNo,
+            reason=reason,
+            transactionId=line.transactionId if line else None,
+            accountNumber=line.accountNumber if line else None,
+            amount=line.amount if line else None,
+            currencyCode=line.currencyCode if line else None,
+            detail=detail,
+        ))
+
+    def addPayment(self, line, accountId, currencyId, paymentMethodTypeId, requestId=None, billId=None):
+        payment = Payment(
+            paymentMethodType_id=paymentMethodTypeId,
+            paymentRequest_id=requestId,
+            bill_id=billId,
+            customerAccount_id=accountId,
+            currency_id=currencyId,
+            amount=line.amount,
+            reference=line.reference,
+        )
+        if line.transactionId is not None:
+            payment.transactionId = line.transactionId
+        self.payments.append(payment)
+        if requestId is not None:
+            self.requestIds.append(requestId)
+        if billId is not None:
+            self.billIds.append(billId)
+
+    def save(self):
+        with transaction.atomic():
+            Payment.objects.bulk_create(self.payments)
+            PaymentRequest.objects.filter(id__in=self.requestIds).update(
+                status=PaymentRequest.Status.SUCCESSFUL, versionNo=F('versionNo') + 1
+            )
+            # Only exact matches are allocated to a bill, so a matched bill is now fully paid.
+            Bill.objects.filter(id__in=self.billIds).update(paidAmount=F('grossAmount'), versionNo=F('versionNo') + 1)
+            ReconciliationException.objects.bulk_create(self.exceptions)
+            postPayments(self.payments)
+
+
+def matchLine(line, openItems, chunk, seenTransactionIds, bankTransferTypeId):
+    try:
+        currencyId = referenceData.getByKey(Currency, line.currencyCode, 'isoCode').pk
+    except Currency.DoesNotExist:
+        return chunk.addException(line.lineNo, Reason.MALFORMED, line, 'unknown currency')
+
+    if line.transactionId is not None:
+        if line.transactionId in openItems.paidTransactionIds or line.transactionId in seenTransactionIds:
+            return chunk.addException(line.lineNo, Reason.DUPLICATE, line)
+        seenTransactionIds.add(line.transactionId)
+
+        request = openItems.requests.get(line.transactionId)
+        if request is not None:
+            requestId, accountId, amount, requestCurrencyId, paymentMethodTypeId = request
+            if requestCurrencyId != currencyId:
+                return chunk.addException(line.lineNo, Reason.CURRENCY_MISMATCH, line)
+            if amount.quantize(PENNY) != line.amount:
+                return chunk.addException(line.lineNo, Reason.AMOUNT_MISMATCH, line, 'expected {}'.format(amount))
+            billId = openItems.takeBill(accountId, currencyId, line.amount)
+            return chunk.addPayment(line, accountId, currencyId, paymentMethodTypeId, requestId, billId)
+
+    if line.accountNumber is None:
+        return chunk.addException(line.lineNo, Reason.NO_OPEN_ITEM, line)
+    accountId = openItems.accounts.get(line.accountNumber)
+    if accountId is None:
+        return chunk.addException(line.lineNo, Reason.UNKNOWN_ACCOUNT, line)
+
+    billId = openItems.takeBill(accountId, currencyId, line.amount)
+    if billId is None or bankTransferTypeId is None:
+        return chunk.addException(line.lineNo, Reason.NO_OPEN_ITEM, line)
+    return chunk.addPayment(line, accountId, currencyId, bankTransferTypeId, billId=billId)
+
+
+def reconcileStatement(fileObject, fileFormat='csv', fileName=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    reconciliationRun = ReconciliationRun.objects.create(fileName=fileName)
+    try:
+        bankTransferTypeId = referenceData.getByKey(
+            PaymentMethodType, settings.RECONCILIATION_BANK_TRANSFER_METHOD_TYPE
+        ).pk
+    except PaymentMethodType.DoesNotExist:
+        bankTransferTypeId = None
+
+    lineCount = matchedCount = exceptionCount = 0
+    for rows in chunked(iterRows(fileObject, fileFormat), chunkSize):
+        chunk = ReconciliationChunk(reconciliationRun)
+        lines = []
+        for lineNo, row in rows:
+            try:
+                lines.append(parseStatementLine(lineNo, row))
+            except ValueError as e:
+                chunk.addException(lineNo, Reason.MALFORMED, detail=str(e))
+
+        openItems = OpenItems(lines)
+        seenTransactionIds = set()
+        for line in lines:
+            matchLine(line, openItems, chunk, seenTransactionIds, bankTransferTypeId)
+        chunk.save()
+
+        lineCount += len(rows)
+        matchedCount += len(chunk.payments)
+        exceptionCount += len(chunk.exceptions)
+
+    ReconciliationRun.objects.filter(pk=reconciliationRun.pk).update(
+        lineCount=lineCount, matchedCount=matchedCount, exceptionCount=exceptionCount
+    )
+    reconciliationRun.refresh_from_db()
+    return reconciliationRun
+
+
+def reconcileStatementFile(path, fileFormat=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    fileFormat = fileFormat or detectFileFormat(path)
+    with open(path, newline='', encoding='utf-8') as fileObject:
+        return reconcileStatement(fileObject, fileFormat, str(path), chunkSize)
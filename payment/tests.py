@@ -1,3 +1,203 @@
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
 from django.test import TestCase
+from django.utils import timezone
+
+from core.synthetic import generateSyntheticData
+from energy.models import Bill
+from payment.charges import ChargeTimeline, priceInterval
+from payment.collection import applyResults
+from payment.gateways import CollectionItem, GatewayResult
+from payment.ledger import EntryType, Posting, getAccountBalance, getBalanceAsOf, postEntries
+from payment.models import BalanceSnapshot, Currency, Payment, PaymentRequest, ReconciliationRun
+from payment.reconciliation import OpenItems, Reason, ReconciliationChunk, StatementLine, matchLine
+
+
+def day(number):
+    return timezone.make_aware(datetime.datetime(2021, 1, number))
+
+
+class ChargeTimelineTests(TestCase):
+
+    def setUp(self):
+        # (id, fromDttm, toDttm, standingCharge, unitRate); the later row wins where they overlap.
+        self.timeline = ChargeTimeline([
+            (1, day(1), day(11), Decimal('0.50'), Decimal('0.10')),
+            (2, day(5), day(8), Decimal('0.50'), Decimal('0.20')),
+            (3, day(15), day(20), Decimal('1.00'), Decimal('0.30')),
+        ])
+
+    def testAt(self):
+        self.assertEqual(self.timeline.at(day(2)), (Decimal('0.50'), Decimal('0.10')))
+        self.assertEqual(self.timeline.at(day(5)), (Decimal('0.50'), Decimal('0.20')))
+        self.assertEqual(self.timeline.at(day(8)), (Decimal('0.50'), Decimal('0.10')))
+        self.assertIsNone(self.timeline.at(day(12)))
+        self.assertIsNone(self.timeline.at(day(20)))
+
+    def testPieces(self):
+        self.assertEqual(list(self.timeline.pieces(day(3), day(17))), [
+            (day(3), day(5), (Decimal('0.50'), Decimal('0.10'))),
+            (day(5), day(8), (Decimal('0.50'), Decimal('0.20'))),
+            (day(8), day(11), (Decimal('0.50'), Decimal('0.10'))),
+            (day(11), day(15), None),
+            (day(15), day(17), (Decimal('1.00'), Decimal('0.30'))),
+        ])
+
+    def testPiecesOutsideEverything(self):
+        self.assertEqual(list(self.timeline.pieces(day(21), day(22))), [(day(21), day(22), None)])
+
+    def testPriceInterval(self):
+        priced = priceInterval(self.timeline, day(4), day(6), Decimal('20'))
+        # Ten units at 0.10 on the 4th and ten at 0.20 on the 5th, plus two days of standing charge.
+        self.assertEqual(priced.unitAmount, Decimal('3.00'))
+        self.assertEqual(priced.standingAmount, Decimal('1.00'))
+        self.assertEqual(priced.amount, Decimal('4.00'))
+        self.assertTrue(priced.complete)
+
+    def testPriceIntervalWithGap(self):
+        priced = priceInterval(self.timeline, day(10), day(12), Decimal('10'))
+        self.assertEqual(priced.unitAmount, Decimal('0.50'))
+        self.assertEqual(priced.standingAmount, Decimal('0.50'))
+        self.assertFalse(priced.complete)
+
+    def testPriceInstant(self):
+        priced = priceInterval(self.timeline, day(6), day(6), Decimal('10'))
+        self.assertEqual((priced.amount, priced.complete), (Decimal('2.00'), True))
+
+
+class MatchLineTests(TestCase):
+    accountNumber = 1000000018
+    transactionId = 555
+    bankTransferTypeId = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.currencyId = Currency.objects.create(internalKey='GBP', languageKey='GBP', isoCode='GBP').pk
+
+    def setUp(self):
+        # Open items are filled in by hand: account 7 has request 11 (paid by method type 3) and bills 21 and 22.
+        self.openItems = OpenItems([])
+        self.openItems.accounts = {self.accountNumber: 7}
+        self.openItems.requests = {self.transactionId: (11, 7, Decimal('42.00'), self.currencyId, 3)}
+        self.openItems.bills[(7, self.currencyId, Decimal('42.00'))].extend([21, 22])
+
+    def match(self, *lines):
+        chunk = ReconciliationChunk(ReconciliationRun())
+        seenTransactionIds = set()
+        for line in lines:
+            matchLine(line, self.openItems, chunk, seenTransactionIds, self.bankTransferTypeId)
+        return chunk
+
+    def line(self, lineNo=1, transactionId=None, amount='42.00', currencyCode='GBP', accountNumber=None):
+        return StatementLine(lineNo, transactionId, Decimal(amount), currencyCode, accountNumber, None)
+
+    def reasons(self, chunk):
+        return [(exception.lineNo, exception.reason) for exception in chunk.exceptions]
+
+    def testMatchesRequestByTransactionId(self):
+        chunk = self.match(self.line(transactionId=self.transactionId))
+        self.assertEqual(chunk.exceptions, [])
+        self.assertEqual((chunk.requestIds, chunk.billIds), ([11], [21]))
+        self.assertEqual((chunk.payments[0].customerAccount_id, chunk.payments[0].paymentMethodType_id), (7, 3))
+
+    def testRequestAmountMismatch(self):
+        chunk = self.match(self.line(transactionId=self.transactionId, amount='43.00'))
+        self.assertEqual(self.reasons(chunk), [(1, Reason.AMOUNT_MISMATCH)])
+        self.assertEqual(chunk.payments, [])
+
+    def testDuplicateTransactionId(self):
+        chunk = self.match(self.line(1, self.transactionId), self.line(2, self.transactionId))
+        self.assertEqual(len(chunk.payments), 1)
+        self.assertEqual(self.reasons(chunk), [(2, Reason.DUPLICATE)])
+
+    def testAlreadyPaidTransactionId(self):
+        self.openItems.paidTransactionIds.add(self.transactionId)
+        chunk = self.match(self.line(transactionId=self.transactionId))
+        self.assertEqual(self.reasons(chunk), [(1, Reason.DUPLICATE)])
+
+    def testMatchesBillsByAccountAndAmountInDueOrder(self):
+        chunk = self.match(*(self.line(lineNo, accountNumber=self.accountNumber) for lineNo in (1, 2, 3)))
+        self.assertEqual(chunk.billIds, [21, 22])
+        self.assertEqual({payment.paymentMethodType_id for payment in chunk.payments}, {self.bankTransferTypeId})
+        self.assertEqual(self.reasons(chunk), [(3, Reason.NO_OPEN_ITEM)])
+
+    def testExceptions(self):
+        for line, reason in (
+            (self.line(currencyCode='XXX', accountNumber=self.accountNumber), Reason.MALFORMED),
+            (self.line(accountNumber=1), Reason.UNKNOWN_ACCOUNT),
+            (self.line(), Reason.NO_OPEN_ITEM),
+            (self.line(amount='0.01', accountNumber=self.accountNumber), Reason.NO_OPEN_ITEM),
+        ):
+            with self.subTest(reason=reason):
+                chunk = self.match(line)
+                self.assertEqual(self.reasons(chunk), [(1, reason)])
+                self.assertEqual(chunk.payments, [])
+
+
+class LedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generateSyntheticData(1, 1, datetime.date(2021, 1, 1), 1)
+        cls.accountId = Bill.objects.values_list('customerAccount_id', flat=True).first()
+
+    def testSyntheticHistoryIsPosted(self):
+        bills = Bill.objects.filter(customerAccount_id=self.accountId).order_by('billedFromDttm')
+        latest = bills.last()
+        self.assertEqual(Payment.objects.filter(customerAccount_id=self.accountId).count(), bills.count() - 1)
+        self.assertFalse(Payment.objects.filter(bill=latest).exists())
+        # Every bill but the latest has been paid, so that is what the account owes.
+        self.assertEqual(getAccountBalance(self.accountId), latest.grossAmount)
+        self.assertEqual(getBalanceAsOf(self.accountId, latest.acceptedDttm), latest.grossAmount)
+
+    def post(self, entryType, amount, postedDttm):
+        return postEntries([Posting(self.accountId, entryType, Decimal(amount), postedDttm, None, None)])
+
+    def testBackdatedPosting(self):
+        start = timezone.now() - datetime.timedelta(days=30)
+        opening = getAccountBalance(self.accountId)
+        self.post(EntryType.BILL, '100.00', start)
+        self.post(EntryType.BILL, '50.00', start + datetime.timedelta(days=10))
+        BalanceSnapshot.objects.create(
+            customerAccount_id=self.accountId, snapshotDt=timezone.localdate(start + datetime.timedelta(days=12)),
+            balance=opening + 150, lastEntryId=0,
+        )
+        self.post(EntryType.PAYMENT, '30.00', start + datetime.timedelta(days=5))
+
+        def balanceAt(days):
+            return getBalanceAsOf(self.accountId, start + datetime.timedelta(days=days, hours=1)) - opening
+
+        self.assertEqual([balanceAt(0), balanceAt(5), balanceAt(10)], [100, 70, 120])
+        self.assertEqual(getAccountBalance(self.accountId) - opening, 120)
+        self.assertFalse(BalanceSnapshot.objects.filter(customerAccount_id=self.accountId).exists())
+
+
+class ApplyResultsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generateSyntheticData(1, 1, datetime.date(2021, 1, 1), 1)
+        cls.requestId = PaymentRequest.objects.get(status=PaymentRequest.Status.PENDING).pk
+
+    def apply(self, gatewayStatus, attemptCount=0):
+        PaymentRequest.objects.filter(pk=self.requestId).update(claimToken='token', attemptCount=attemptCount)
+        item = CollectionItem(self.requestId, None, None, None, 'GBP', None, None, None, None, attemptCount)
+        applyResults('token', [(item, GatewayResult(gatewayStatus, 'Declined'))])
+        return PaymentRequest.objects.get(pk=self.requestId)
+
+    def testDeclinedRequestFails(self):
+        request = self.apply(GatewayResult.FAILED)
+        self.assertEqual((request.status, request.gatewayResponse), (PaymentRequest.Status.FAILED, 'Declined'))
+        self.assertIsNone(request.cancelledDttm)
+        self.assertIsNone(request.paymentCancellationReason)
+
+    def testLastRetryFails(self):
+        request = self.apply(GatewayResult.RETRY, settings.PAYMENT_COLLECTION_MAX_ATTEMPTS - 1)
+        self.assertEqual(request.status, PaymentRequest.Status.FAILED)
 
-# Create your tests here.
+    def testRetry(self):
+        request = self.apply(GatewayResult.RETRY)
+        self.assertEqual(request.status, PaymentRequest.Status.FAILED_PENDING_RETRY)
+        self.assertIsNotNone(request.nextAttemptDttm)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from payment import views
+
+urlpatterns = [
+    path('<int:accountNumber>/payments/', views.payments, name='payments'),
+    path('<int:accountNumber>/balance/', views.balance, name='balance'),
+]
@@ -1,3 +1,36 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 
-# Create your views here.
+from accounts.views import getCustomerAccount
+from core.instrumentation import queryBudget
+from core.pagination import keysetResponse
+from core.routers import replicaReads
+from energy.ingestion import parseDttm
+from payment.ledger import getAccountBalance, getBalanceAsOf
+from payment.models import Payment
+
+
+@queryBudget(5)
+@login_required
+@replicaReads()
+def payments(request, accountNumber):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    queryset = Payment.objects.filter(customerAccount=customerAccount).values(
+        'id', 'transactionId', 'amount', 'currency__isoCode', 'paymentMethodType__internalKey', 'createdDttm',
+    )
+    return keysetResponse(request, queryset, ['createdDttm', 'id'])
+
+
+@queryBudget(5)
+@login_required
+@replicaReads()
+def balance(request, accountNumber):
+    customerAccount = getCustomerAccount(request, accountNumber)
+    try:
+        asOfDttm = parseDttm(request.GET.get('asOf'))
+    except ValueError:
+        return JsonResponse({'error': 'asOf must be an ISO 8601 datetime'}, status=400)
+
+    if asOfDttm is None:
+        return JsonResponse({'balance': getAccountBalance(customerAccount)})
+    return JsonResponse({'balance': getBalanceAsOf(customerAccount, asOfDttm), 'asOf': asOfDttm})